@@ -0,0 +1,69 @@
+import numpy as np
+from event_processor import ArraySessionFSM, parse_exhibit_id, parse_item_id
+
+class ActionVocabulary:
+    """
+    Interned action strings with pre-parsed attributes.
+
+    Every distinct action gets an integer code (its position in ``actions``)
+    and its attributes are parsed once:
+
+    - ``fsm_category``: ArraySessionFSM category (exhibit, content, ctrl, ...)
+    - ``exhibit_id`` / ``item_id``: ``ExhibitID_<n>`` / ``ItemID_<n>`` as strings, None if absent
+
+    Hot loops then index these arrays by code instead of matching strings.
+    """
+
+    def __init__(self, actions=()):
+        self.actions = []
+        self.codes = {}
+        self._fsm_category = []
+        self._exhibit_id = []
+        self._item_id = []
+        for action in actions:
+            self.add(action)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def add(self, action) -> int:
+        """Code of ``action``, interning it if unseen."""
+        code = self.codes.get(action)
+        if code is None:
+            code = self.codes[action] = len(self.actions)
+            self.actions.append(action)
+            self._fsm_category.append(ArraySessionFSM.action_category(action))
+            self._exhibit_id.append(parse_exhibit_id(action))
+            self._item_id.append(parse_item_id(action))
+            self._arrays = None
+        return code
+
+    def encode(self, actions) -> np.ndarray:
+        """Codes of an action column, interning unseen actions."""
+        return np.fromiter((self.add(action) for action in actions), dtype=np.int32, count=len(actions))
+
+    def attributes(self) -> dict:
+        """Action strings and attribute arrays indexed by code, rebuilt only after new actions are interned."""
+        if getattr(self, "_arrays", None) is None:
+            self._arrays = {
+                "action": np.asarray(self.actions, dtype=object),
+                "fsm_category": np.asarray(self._fsm_category, dtype=np.int8),
+                "exhibit_id": np.asarray(self._exhibit_id, dtype=object),
+                "item_id": np.asarray(self._item_id, dtype=object),
+            }
+        return self._arrays
+
+    def decode(self, codes) -> np.ndarray:
+        return self.attributes()["action"][np.asarray(codes)]
+
+    @property
+    def fsm_category(self) -> np.ndarray:
+        return self.attributes()["fsm_category"]
+
+    @property
+    def exhibit_id(self) -> np.ndarray:
+        return self.attributes()["exhibit_id"]
+
+    @property
+    def item_id(self) -> np.ndarray:
+        return self.attributes()["item_id"]
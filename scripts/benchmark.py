@@ -0,0 +1,146 @@
+import os
+import time
+import argparse
+import tempfile
+import datetime
+import subprocess
+import tracemalloc
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from synthetic_logs import generate_logs
+from preprocess_logs import get_json_files, read_json_files, good_log_mask
+from session_flags import classify_actions
+from event_processor import SessionFSM, ArraySessionFSM
+from heatmap import TouchHeatmap
+from generate_plots import plot_footprint, time_metrics
+from panel6_stats.rollups import RollupCubes
+
+# Define paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_DIR = os.path.join(SCRIPT_DIR, "../data/benchmarks")
+RESULTS_FILE = "results.csv"
+
+SCALES = [1, 10, 100]
+BASE_FILES = 20  # Log files at scale 1x
+REGRESSION_RATIO = 1.25  # Slower than the previous run by this factor is reported
+
+def measure(function, *args, memory: bool = True):
+    """
+    Run ``function(*args)`` and return ``(result, seconds, peak bytes)``.
+
+    The peak of Python and NumPy allocations is measured with tracemalloc in a
+    second run, so tracing does not distort the timing. It is NaN without ``memory``.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+
+    peak = np.nan
+    if memory:
+        tracemalloc.start()
+        function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+def synthetic_log_dir(n_files: int, seed: int) -> str:
+    """Synthetic logs for a scale, generated once and reused by later runs."""
+    log_dir = os.path.join(BENCHMARK_DIR, "logs", f"files_{n_files}_seed_{seed}")
+    if not os.path.isdir(log_dir) or len(get_json_files(log_dir)) != n_files:
+        generate_logs(log_dir, n_files, seed=seed)
+    return log_dir
+
+def _flags(logs):
+    return [classify_actions(log.action) for log in logs]
+
+def _fsm_input(logs, good) -> pd.DataFrame:
+    good_logs = [log for log, is_good in zip(logs, good) if is_good]
+    return pd.DataFrame({
+        "Action": np.concatenate([log.action for log in good_logs]) if good_logs else [],
+        "Timestamp": np.concatenate([log.time for log in good_logs]) if good_logs else [],
+    })
+
+def _footprint(logs, output_dir):
+    heatmap = TouchHeatmap()
+    for log in logs:
+        heatmap.add(log.x, log.y)
+    plot_footprint(heatmap, output_dir=output_dir, overwrite=True)
+
+def _time_metrics(action_df, output_dir):
+    return time_metrics(RollupCubes.from_actions(action_df), output_dir)
+
+def run_scale(scale: int, seed: int, workers: int, memory: bool, reference_max_scale: int) -> list:
+    """Time every pipeline stage on ``BASE_FILES * scale`` synthetic logs."""
+    files = get_json_files(synthetic_log_dir(BASE_FILES * scale, seed))
+    rows = []
+
+    def record(stage, function, *args, rows_out=len):
+        result, seconds, peak = measure(function, *args, memory=memory)
+        rows.append({"scale": scale, "files": len(files), "stage": stage, "seconds": seconds,
+                     "peak_mb": peak / 2**20, "rows_out": rows_out(result)})
+        print(f"{scale:>4}x {stage:<28} {seconds:9.3f} s {peak / 2**20:9.1f} MB")
+        return result
+
+    logs, df_metrics = record("read_json_files", read_json_files, files, workers, rows_out=lambda result: sum(map(len, result[0])))
+    record("session_flags", _flags, logs)
+
+    fsm_input = _fsm_input(logs, good_log_mask(df_metrics))
+    if scale <= reference_max_scale:
+        record("SessionFSM", SessionFSM, fsm_input, rows_out=lambda fsm: len(fsm.sessions))
+    fsm = record("ArraySessionFSM", ArraySessionFSM, fsm_input, rows_out=lambda fsm: len(fsm.sessions))
+    session_df, action_df = record("generate_session_dataframe", fsm.generate_session_dataframe, rows_out=lambda result: len(result[1]))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        record("plot_footprint", _footprint, logs, output_dir, rows_out=lambda _: sum(map(len, logs)))
+        record("time_metrics", _time_metrics, action_df, Path(output_dir))
+
+    return rows
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def compare_with_previous(results: pd.DataFrame, previous: pd.DataFrame) -> pd.DataFrame:
+    """Ratio of each stage's time to the last earlier run at the same scale."""
+    if previous is None or previous.empty:
+        return pd.DataFrame()
+    last = previous.sort_values("run").groupby(["scale", "stage"]).last()[["seconds"]]
+    merged = results.join(last, on=["scale", "stage"], rsuffix="_previous").dropna(subset=["seconds_previous"])
+    merged["ratio"] = merged["seconds"] / merged["seconds_previous"]
+    return merged[["scale", "stage", "seconds_previous", "seconds", "ratio"]]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Panel6 pipeline on synthetic logs.")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES, help=f"Multiples of {BASE_FILES} log files")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic logs")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse log files")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run of each stage")
+    parser.add_argument("--reference-max-scale", type=int, default=10,
+                        help="Largest scale at which the reference SessionFSM (no array engine) is timed")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+
+    rows = []
+    for scale in args.scales:
+        rows += run_scale(scale, args.seed, args.workers, not args.no_memory, args.reference_max_scale)
+
+    results = pd.DataFrame(rows)
+    results.insert(0, "run", datetime.datetime.now().isoformat(timespec="seconds"))
+    results.insert(1, "revision", git_revision())
+
+    results_path = os.path.join(BENCHMARK_DIR, RESULTS_FILE)
+    previous = pd.read_csv(results_path) if os.path.exists(results_path) else None
+    results.to_csv(results_path, mode="a", header=previous is None, index=False)
+
+    comparison = compare_with_previous(results, previous)
+    regressions = comparison[comparison["ratio"] > REGRESSION_RATIO] if not comparison.empty else comparison
+    if not regressions.empty:
+        print(f"\nStages slower than the previous run by more than {REGRESSION_RATIO}x:")
+        print(regressions.to_string(index=False))
+    print(f"\nResults appended to {results_path}")
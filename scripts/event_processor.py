@@ -2,6 +2,17 @@ import pandas as pd
 import numpy as np
 import re
 from automaton import machines
+from instrumentation import instrumented
+
+def parse_exhibit_id(action):
+    """``<n>`` of an ``ExhibitID_<n>`` action as a string, None if absent."""
+    match = re.search(r"ExhibitID_(\d+)", action)
+    return match.group(1) if match else None
+
+def parse_item_id(action):
+    """``<n>`` of an ``ItemID_<n>`` action as a string, None if absent."""
+    match = re.search(r"ItemID_(\d+)", action)
+    return match.group(1) if match else None
 
 class SessionFSM:
     START_EVENT = "Button_close_Instructions"
@@ -13,6 +24,9 @@ class SessionFSM:
     UI_CLOSE = "UI_ClosePanoPagePanelClose_Button"
     SESSION_END = "Finish_virtualNavigation"
 
+    # Bump whenever segmentation rules change, forces incremental ingestion to start over
+    VERSION = 2
+
     states = [
         'IDLE',           # Waiting for Button_close_Instructions
         'SESSION_ACTIVE', # Inside a session, tracking interactions
@@ -53,9 +67,10 @@ class SessionFSM:
         # Process session data
         self.process_sessions(session_data)
 
+    @instrumented("SessionFSM.process_sessions", rows=lambda self, df: len(df))
     def process_sessions(self, df):
         """Iterate through session data and process each row."""
-        for _, row in df.iterrows():
+        for index, row in df.iterrows():
             action, timestamp = row["Action"], row["Timestamp"]
 
             if action == self.SESSION_END:
@@ -64,7 +79,7 @@ class SessionFSM:
                 continue
 
             if self.fsm.current_state == 'IDLE' and action == self.START_EVENT:
-                self._start_session(action, timestamp)
+                self._start_session(action, timestamp, index)
 
             elif self.fsm.current_state == 'SESSION_ACTIVE':
                 # Exhibition
@@ -93,10 +108,10 @@ class SessionFSM:
                 elif action.startswith(self.UI_CLOSE):
                     self._exit_exhibit(timestamp)
 
-    def _start_session(self, action, timestamp):
-        """Handles the start of a session."""
+    def _start_session(self, action, timestamp, index=None):
+        """Handles the start of a session, ``index`` is the row label of the start event."""
         self.fsm.process_event('start_session')
-        self.current_session = {"start_time": timestamp, "events": [], "end_time": None}
+        self.current_session = {"start_time": timestamp, "start_index": index, "events": [], "end_time": None}
 
         start_event = {"state": self.fsm.current_state, "type": "START", "exhibit": None, "exhibit_id": None, "start_time": timestamp, "end_time": timestamp, "actions": [(action, timestamp)]}
         self.current_session["events"].append(start_event)
@@ -129,9 +144,9 @@ class SessionFSM:
     def _view_content(self, action, timestamp):
         """Handles viewing content inside an exhibit."""
         self.fsm.process_event('view_content')
-        match = re.search(r"ExhibitID_(\d+)", action)
-        if match:
-            self.current_event["exhibit_id"] = match.group(1)
+        exhibit_id = parse_exhibit_id(action)
+        if exhibit_id is not None:
+            self.current_event["exhibit_id"] = exhibit_id
         self.current_event["actions"].append((action, timestamp))
 
     def _exit_exhibit(self, timestamp):
@@ -153,12 +168,22 @@ class SessionFSM:
             self.current_session = None
         self.fsm.process_event("close_session")
 
-    def generate_session_dataframe(self):
-        """Converts sessions into a DataFrame."""
+    @instrumented("SessionFSM.generate_session_dataframe", rows=lambda self, session_ids=None, sessions=None: len(self.sessions if sessions is None else sessions))
+    def generate_session_dataframe(self, session_ids=None, sessions=None):
+        """
+        Converts sessions into a DataFrame, numbering sessions from 0 unless ``session_ids`` are given.
+
+        ``sessions`` defaults to the sessions collected by this FSM.
+        """
         session_data = []
         action_data = []
 
-        for session_id, session in enumerate(self.sessions):
+        if sessions is None:
+            sessions = self.sessions
+        if session_ids is None:
+            session_ids = range(len(sessions))
+
+        for session_id, session in zip(session_ids, sessions):
             session_start = session["start_time"]
             session_end = session["end_time"]
             session_duration = session_end - session_start if session_end else None
@@ -177,10 +202,7 @@ class SessionFSM:
 
                 action_timestamps = [action[1] for action in event["actions"]]
                 action_types = [action[0] for action in event["actions"]]
-                action_ids = [
-                    (match.group(1) if (match := re.search(r"ItemID_(\d+)", action[0])) else None)
-                    for action in event["actions"]
-                ]
+                action_ids = self._item_ids(event)
 
                 action_durations = np.diff(action_timestamps + [event_end]) if action_timestamps else [None] * len(action_timestamps)
 
@@ -230,3 +252,279 @@ class SessionFSM:
         )
 
         return df_sessions, df_actions
+
+    def _item_ids(self, event) -> list:
+        """ItemID of every action of an event."""
+        return [parse_item_id(action) for action, _ in event["actions"]]
+
+
+class ArraySessionFSM(SessionFSM):
+    """
+    Table-driven SessionFSM engine running over integer action codes.
+
+    ``states``/``transitions`` and the prefix rules of ``process_sessions`` are
+    compiled into two tables indexed by ``[state, action category]``: the
+    handler to run and the next state. Actions are codes of an
+    ActionVocabulary, whose attribute arrays give the category, ExhibitID and
+    ItemID of each code, so the main loop and ``generate_session_dataframe``
+    only do integer lookups. Produces the same ``generate_session_dataframe``
+    output as SessionFSM; its events also carry the ``codes`` of their actions.
+    """
+
+    # Action categories
+    CAT_OTHER, CAT_START, CAT_END, CAT_EXHIBIT, CAT_MENUEXHIBIT, CAT_CONTENT, CAT_CTRL, CAT_UI_CLOSE = range(8)
+    N_CATEGORIES = 8
+
+    # Handlers
+    NOOP, START_SESSION, ENTER_EXHIBIT, TRACK_EXPLORATION, CHANGE_EXHIBIT, VIEW_CONTENT, APPEND_ACTION, EXIT_EXHIBIT, CLOSE_SESSION = range(9)
+
+    # FSM event fired by each handler, used to derive the next-state table from ``transitions``
+    HANDLER_EVENTS = {
+        START_SESSION: 'start_session',
+        ENTER_EXHIBIT: 'enter_exhibit',
+        VIEW_CONTENT: 'view_content',
+        EXIT_EXHIBIT: 'exit_exhibit',
+        CLOSE_SESSION: 'close_session',
+    }
+
+    def __init__(self, session_data=None, vocabulary=None):
+        # Shared by every file of a store so attributes are parsed once per distinct action
+        if vocabulary is None:
+            from action_vocab import ActionVocabulary  # action_vocab imports this module
+            vocabulary = ActionVocabulary()
+        self.vocabulary = vocabulary
+        self.handlers, self.next_states = self.compile_tables()
+        super().__init__(session_data)
+
+    @classmethod
+    def action_category(cls, action) -> int:
+        """Category of an action string, following the checks of ``process_sessions``."""
+        if action == cls.SESSION_END:
+            return cls.CAT_END
+        if action == cls.START_EVENT:
+            return cls.CAT_START
+        if action.startswith(cls.EXHIBIT_PREFIX):
+            return cls.CAT_EXHIBIT
+        if action.startswith(cls.MENUEXHIBIT_PREFIX):
+            return cls.CAT_MENUEXHIBIT
+        if action.startswith(cls.CONTENT_PREFIX):
+            return cls.CAT_CONTENT
+        if action.startswith(cls.CTRL_PREFIX) or action.startswith(cls.IMAGE_ZOOM):
+            return cls.CAT_CTRL
+        if action.startswith(cls.UI_CLOSE):
+            return cls.CAT_UI_CLOSE
+        return cls.CAT_OTHER
+
+    @classmethod
+    def compile_tables(cls):
+        """
+        Build the ``[state][category]`` handler and next-state tables.
+
+        Returns:
+        - list: Handler id per state and category.
+        - list: Next state index per state and category.
+        """
+        n_states = len(cls.states)
+        state_index = {state: index for index, state in enumerate(cls.states)}
+        handlers = [[cls.NOOP] * cls.N_CATEGORIES for _ in range(n_states)]
+
+        for category in range(cls.N_CATEGORIES):
+            handlers[state_index['IDLE']][category] = cls.START_SESSION if category == cls.CAT_START else cls.NOOP
+            handlers[state_index['SESSION_ACTIVE']][category] = (
+                cls.ENTER_EXHIBIT if category in (cls.CAT_EXHIBIT, cls.CAT_MENUEXHIBIT) else cls.TRACK_EXPLORATION
+            )
+            handlers[state_index['EXHIBIT_VIEW']][category] = {
+                cls.CAT_EXHIBIT: cls.CHANGE_EXHIBIT,
+                cls.CAT_CONTENT: cls.VIEW_CONTENT
+            }.get(category, cls.NOOP)
+            handlers[state_index['CONTENT_VIEW']][category] = {
+                cls.CAT_CTRL: cls.APPEND_ACTION,
+                cls.CAT_UI_CLOSE: cls.EXIT_EXHIBIT
+            }.get(category, cls.NOOP)
+
+        # Session end closes the session from any state
+        for state in range(n_states):
+            handlers[state][cls.CAT_END] = cls.CLOSE_SESSION
+
+        transition_table = {(source, event): target for source, target, event in cls.transitions}
+        next_states = [[state] * cls.N_CATEGORIES for state in range(n_states)]
+        for state in range(n_states):
+            for category in range(cls.N_CATEGORIES):
+                event = cls.HANDLER_EVENTS.get(handlers[state][category])
+                if event is not None:
+                    next_states[state][category] = state_index[transition_table[(cls.states[state], event)]]
+
+        return handlers, next_states
+
+    def process_sessions(self, df):
+        """Process session data through the array engine."""
+        if df is None:
+            return
+        codes = self.vocabulary.encode(df["Action"].tolist())
+        self.process_codes(codes, df["Timestamp"].to_numpy(dtype=np.float64), index=df.index.tolist())
+
+    @instrumented("ArraySessionFSM.process_codes", rows=lambda self, codes, *args, **kwargs: len(codes))
+    def process_codes(self, codes, timestamps, index=None):
+        """
+        Process parallel arrays of action codes of ``self.vocabulary`` and timestamps.
+
+        Parameters:
+        - codes (numpy.ndarray): Action codes.
+        - timestamps (numpy.ndarray): Float timestamps.
+        - index (sequence, optional): Row labels recorded as ``start_index``, defaults to positions.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        if index is None:
+            index = range(len(codes))
+
+        vocabulary = self.vocabulary
+        actions = vocabulary.decode(codes).tolist()
+        categories = vocabulary.fsm_category[codes].tolist()
+        exhibit_ids = vocabulary.exhibit_id
+        handlers, next_states = self.handlers, self.next_states
+        state = self.states.index(self.fsm.current_state)
+
+        for row, code, action, timestamp, category in zip(index, codes.tolist(), actions, np.asarray(timestamps, dtype=np.float64).tolist(), categories):
+            handler = handlers[state][category]
+            state = next_states[state][category]
+
+            if handler == self.NOOP:
+                continue
+            elif handler == self.TRACK_EXPLORATION:
+                if self.exploration_event:
+                    self.exploration_event["actions"].append((action, timestamp))
+                    self.exploration_event["codes"].append(code)
+                else:
+                    self.exploration_event = {"type": "MAP", "exhibit": None, "exhibit_id": None, "start_time": timestamp, "end_time": None, "actions": [], "codes": []}
+            elif handler == self.APPEND_ACTION:
+                self.current_event["actions"].append((action, timestamp))
+                self.current_event["codes"].append(code)
+            elif handler == self.CLOSE_SESSION:
+                self._end_exploration(timestamp)
+                self._close_session_event(action, code, timestamp)
+            elif handler == self.START_SESSION:
+                self.current_session = {"start_time": timestamp, "start_index": row, "events": [], "end_time": None}
+                self.current_session["events"].append({"state": self.states[state], "type": "START", "exhibit": None, "exhibit_id": None, "start_time": timestamp, "end_time": timestamp, "actions": [(action, timestamp)], "codes": [code]})
+            elif handler == self.ENTER_EXHIBIT:
+                self._end_exploration(timestamp)
+                self.current_event = {"state": self.states[state], "type": "CONTENT", "exhibit": action, "exhibit_id": None, "start_time": timestamp, "end_time": None, "actions": [], "codes": []}
+            elif handler == self.CHANGE_EXHIBIT:
+                self.current_event["end_time"] = timestamp
+                self.current_session["events"].append(self.current_event)
+                self.current_event = {"state": self.states[state], "type": "CONTENT", "exhibit": action, "exhibit_id": None, "start_time": timestamp, "end_time": None, "actions": [], "codes": []}
+            elif handler == self.VIEW_CONTENT:
+                exhibit_id = exhibit_ids[code]
+                if exhibit_id is not None:
+                    self.current_event["exhibit_id"] = exhibit_id
+                self.current_event["actions"].append((action, timestamp))
+                self.current_event["codes"].append(code)
+            elif handler == self.EXIT_EXHIBIT:
+                self.current_event["end_time"] = timestamp
+                self.current_session["events"].append(self.current_event)
+                self.current_event = None
+
+        # Keep the automaton in sync, the next batch of a streaming feed starts from it
+        self.fsm.initialize(start_state=self.states[state])
+
+    def _item_ids(self, event) -> list:
+        """ItemIDs looked up by action code."""
+        return self.vocabulary.item_id[event["codes"]].tolist()
+
+    def _close_session_event(self, action, code, timestamp):
+        if self.current_session:
+            self.current_session["end_time"] = timestamp
+
+            end_event = {"type": "END", "exhibit": None, "exhibit_id": None, "start_time": timestamp, "end_time": timestamp, "actions": [(action, timestamp)], "codes": [code]}
+            self.current_session["events"].append(end_event)
+
+            self.sessions.append(self.current_session)
+            self.current_session = None
+
+
+class StreamingSessionFSM(ArraySessionFSM):
+    """
+    Push-based session segmentation for live event feeds.
+
+    Events are pushed with ``feed``/``feed_batch`` and every session is handed
+    back as soon as ``Finish_virtualNavigation`` closes it, instead of being
+    kept in ``self.sessions``. Memory is bounded by the open session.
+
+    With ``idle_timeout`` (seconds), a session with no events for longer than
+    the timeout is flushed as abandoned: it ends at its last event and is
+    marked ``"abandoned": True``. A timestamp going backwards (app restart)
+    also flushes the open session.
+    """
+
+    def __init__(self, idle_timeout=None):
+        self.idle_timeout = idle_timeout
+        self.last_timestamp = None
+        self.events_seen = 0  # Running event position, recorded as the session start_index
+        super().__init__(pd.DataFrame({"Action": [], "Timestamp": []}))
+
+    def feed(self, action, timestamp) -> list:
+        """Push one event, returning the sessions it closed (usually none)."""
+        return self.feed_batch([action], [timestamp])
+
+    def feed_batch(self, actions, timestamps) -> list:
+        """
+        Push a batch of events, returning the sessions it closed in order.
+
+        Parameters:
+        - actions (sequence): Action strings.
+        - timestamps (sequence): Float timestamps.
+        """
+        closed = []
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(timestamps) == 0:
+            return closed
+        codes = self.vocabulary.encode(actions)
+
+        # Split the batch wherever the feed was idle for too long
+        breaks = []
+        if self.idle_timeout is not None:
+            previous = self.last_timestamp if self.last_timestamp is not None else timestamps[0]
+            gaps = np.diff(timestamps, prepend=previous)
+            breaks = np.flatnonzero((gaps > self.idle_timeout) | (gaps < 0)).tolist()
+
+        start = 0
+        for end in breaks + [len(timestamps)]:
+            if end > start:
+                index = range(self.events_seen, self.events_seen + end - start)
+                self.process_codes(codes[start:end], timestamps[start:end], index)
+                self.events_seen += end - start
+                self.last_timestamp = float(timestamps[end - 1])
+                closed += self._drain()
+            if end < len(timestamps):
+                closed += self.flush()
+            start = end
+        return closed
+
+    def flush_idle(self, now) -> list:
+        """Flush the open session if no event arrived within ``idle_timeout`` of ``now``."""
+        if self.idle_timeout is None or self.last_timestamp is None or now - self.last_timestamp <= self.idle_timeout:
+            return []
+        return self.flush()
+
+    def flush(self) -> list:
+        """Close the open session as abandoned at its last event and return it (none if no session was open)."""
+        closed = []
+        if self.current_session:
+            end_time = self.last_timestamp
+            self._end_exploration(end_time)
+            if self.current_event:
+                self.current_event["end_time"] = end_time
+                self.current_session["events"].append(self.current_event)
+
+            self.current_session["end_time"] = end_time
+            self.current_session["abandoned"] = True
+            closed.append(self.current_session)
+
+        self.current_session = None
+        self.current_event = None
+        self.exploration_event = None
+        self.fsm.initialize(start_state='IDLE')
+        return closed
+
+    def _drain(self) -> list:
+        sessions, self.sessions = self.sessions, []
+        return sessions
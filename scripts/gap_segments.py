@@ -0,0 +1,131 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from log_store import LogStore
+
+# Define paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "../data")
+VERSION = "new"
+
+# Inactivity thresholds (seconds) and session duration histogram bins (seconds)
+DEFAULT_THRESHOLDS = np.array([30, 45, 60, 90, 120, 180, 240, 300], dtype=np.float64)
+DURATION_BINS = np.array([0, 30, 60, 120, 300, 600, 1200, 1800, 3600, np.inf])
+
+def log_gaps(times, offsets):
+    """
+    Inter-event gaps of every log, computed with one ``np.diff`` over the concatenated timestamps.
+
+    Returns:
+    - numpy.ndarray: ``len(times) - 1`` gaps, 0 where the next row starts another log or the clock went backwards.
+    - numpy.ndarray: Bool mask of forced splits (log boundaries and negative gaps).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    gaps = np.diff(times)
+
+    forced = gaps < 0
+    boundaries = offsets[1:-1] - 1
+    forced[boundaries[(boundaries >= 0) & (boundaries < len(gaps))]] = True
+    gaps[forced] = 0.0
+    return gaps, forced
+
+def _segment_durations(gaps, splits, prefix):
+    """Durations of the segments between split gaps, from the gap prefix sums."""
+    positions = np.flatnonzero(splits)
+    starts = np.concatenate([[0], positions + 1])
+    ends = np.concatenate([positions, [len(gaps)]])
+    return prefix[ends] - prefix[starts]
+
+def gap_segments(times, offsets, threshold: float) -> pd.DataFrame:
+    """
+    Split logs into sessions wherever no event happened for more than ``threshold`` seconds.
+
+    Returns one row per session with its first and last row in ``times`` and its duration.
+    """
+    if len(times) == 0:
+        return pd.DataFrame({"START_ROW": np.zeros(0, dtype=np.int64), "END_ROW": np.zeros(0, dtype=np.int64), "DURATION": np.zeros(0)})
+
+    gaps, forced = log_gaps(times, offsets)
+    splits = forced | (gaps > threshold)
+    positions = np.flatnonzero(splits)
+    prefix = np.concatenate([[0.0], np.cumsum(gaps)])
+
+    return pd.DataFrame({
+        "START_ROW": np.concatenate([[0], positions + 1]),
+        "END_ROW": np.concatenate([positions, [len(gaps)]]),
+        "DURATION": _segment_durations(gaps, splits, prefix),
+    })
+
+def threshold_sweep(times, offsets, thresholds=DEFAULT_THRESHOLDS, bins=DURATION_BINS) -> pd.DataFrame:
+    """
+    Evaluate a whole range of inactivity thresholds without resegmenting.
+
+    Every gap is binned once into the first threshold that merges it (a gap
+    splits sessions at all thresholds below its own value). The sessions of the
+    smallest threshold are cut from the gap prefix sums; raising the threshold
+    then only merges the neighbouring sessions of the gaps it absorbs, summing
+    their durations and the gap between them. Each threshold costs a pass over
+    the sessions left at that threshold, not over the events.
+
+    Returns:
+    - pandas.DataFrame: One row per threshold with session count, total, mean,
+      median and 90th percentile duration and a histogram over ``bins``.
+    """
+    thresholds = np.sort(np.asarray(thresholds, dtype=np.float64))
+    labels = [f"DURATION_{low:g}-{high:g}s" for low, high in zip(bins[:-1], bins[1:])]
+
+    if len(times) == 0:
+        empty = pd.DataFrame(0, index=pd.Index(thresholds, name="THRESHOLD"), columns=["SESSIONS", *labels])
+        return empty.assign(TOTAL_DURATION=0.0, MEAN_DURATION=np.nan, MEDIAN_DURATION=np.nan, P90_DURATION=np.nan)
+
+    gaps, forced = log_gaps(times, offsets)
+    prefix = np.concatenate([[0.0], np.cumsum(gaps)])
+
+    # Index of the first threshold at which each gap stops splitting, forced splits never do
+    merged_at = np.searchsorted(thresholds, gaps, side="left")
+    merged_at[forced] = len(thresholds)
+
+    # Sessions of the smallest threshold; boundary i separates session i and i + 1
+    boundaries = merged_at > 0
+    durations = _segment_durations(gaps, boundaries, prefix)
+    boundary_gaps = gaps[boundaries]
+    boundary_levels = merged_at[boundaries]
+
+    rows = []
+    for level in range(len(thresholds)):
+        if level > 0:
+            absorbed = boundary_levels == level
+            session = np.concatenate([[0], np.cumsum(~absorbed)])
+            durations = np.bincount(session, weights=durations) + np.bincount(session[1:][absorbed], weights=boundary_gaps[absorbed], minlength=session[-1] + 1)
+            boundary_gaps, boundary_levels = boundary_gaps[~absorbed], boundary_levels[~absorbed]
+
+        median, p90 = np.percentile(durations, [50, 90])
+        rows.append([len(durations), durations.sum(), median, p90, *np.histogram(durations, bins=bins)[0]])
+
+    sweep = pd.DataFrame(rows, columns=["SESSIONS", "TOTAL_DURATION", "MEDIAN_DURATION", "P90_DURATION", *labels], index=pd.Index(thresholds, name="THRESHOLD"))
+    sweep.insert(2, "MEAN_DURATION", sweep["TOTAL_DURATION"] / sweep["SESSIONS"])
+    return sweep
+
+def store_threshold_sweep(store: LogStore, thresholds=DEFAULT_THRESHOLDS, good_only: bool = False) -> pd.DataFrame:
+    """Threshold sweep over every log of a LogStore, including logs without a Finish event by default."""
+    return threshold_sweep(store.column("time", good_only), store.offsets(good_only), thresholds)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Segment Panel6 logs by inactivity and sweep thresholds.")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=DEFAULT_THRESHOLDS.tolist(),
+                        help="Inactivity thresholds in seconds")
+    parser.add_argument("--good-only", action="store_true", help="Only use complete logs from the new app version")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    store = LogStore(os.path.join(DATA_DIR, f"logs_{VERSION}"))
+    sweep = store_threshold_sweep(store, args.thresholds, good_only=args.good_only)
+
+    output_path = os.path.join(DATA_DIR, f"gap_threshold_sweep_{VERSION}.csv")
+    sweep.to_csv(output_path)
+    print(sweep[["SESSIONS", "MEAN_DURATION", "MEDIAN_DURATION", "P90_DURATION"]].to_string())
+    print(f"Threshold sweep saved to {output_path}")
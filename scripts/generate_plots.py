@@ -1,6 +1,12 @@
 import os
-import sys
-import pickle
+import argparse
+from log_store import LogStore
+from heatmap import store_footprint
+from plot_jobs import PlotJob, run_plot_jobs
+from panel6_stats.rollups import RollupCubes
+from panel6_stats.session_store import SessionStore
+from panel6_stats.sketches import DailySketches, log_sketches, SHORT_SESSION_SECONDS
+from report_builder import write_table_report
 from pathlib import Path
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -10,21 +16,29 @@ import numpy as np
 # Define paths
 DATA_DIR = Path("../data")
 ASSETS_DIR = Path("assets")
-LOG_FILE = "good_logs.pkl"
-LOG_FILE_GOOD = "good_logs.pkl"
-LOG_METRICS_FILE = "logs_metrics.csv"
-
-def plot_session_hist(session_duration, output_dir="outputs/plots", filename="session_duration_hist.png", x_label='Time (seconds)', hist_color='blue', overwrite=False):
+VERSION = "new"  # Outputs of preprocess_logs
+LOG_STORE = f"logs_{VERSION}"
+LOG_METRICS_FILE = f"logs_metrics_{VERSION}.csv"
+ROLLUPS = f"rollups_{VERSION}"
+LOG_SKETCHES = f"sketches_{VERSION}/logs.json"
+
+def plot_session_hist(histogram, output_dir="outputs/plots", filename="session_duration_hist.png", x_label='Time (seconds)', hist_color='blue', upper=None, scale=1, overwrite=False):
+    """Plot a sketch Histogram (values below ``upper`` only, x values multiplied by ``scale``) in 25 bins."""
     os.makedirs(output_dir, exist_ok=True)  # Ensure output directory exists
 
     if not overwrite and os.path.exists(os.path.join(output_dir, filename)):
         print(f"Plot {filename} already exists. Skipping...")
         return
 
+    # Fine sketch bins regrouped, each bin weighted by its count instead of one point per session
+    edges, counts = histogram.bins(25, upper=upper)
+    edges = edges * scale
+    centers = (edges[:-1] + edges[1:]) / 2
+
     # Plot histogram
     plt.figure(figsize=(8, 6))
-    sns.histplot(session_duration,
-                bins=25, color=hist_color, kde=True)  # Adjust bins as needed
+    bins = pd.DataFrame({"value": centers, "count": counts})
+    sns.histplot(bins, x="value", weights="count", bins=list(edges), color=hist_color, kde=len(counts) > 1)
 
     # Add labels
     plt.xlabel(f"{x_label}")
@@ -33,9 +47,9 @@ def plot_session_hist(session_duration, output_dir="outputs/plots", filename="se
 
     # Add text at the top right
     plt.text(
-        x=max(session_duration) * 0.95,  # X position (90% of max value)
+        x=edges[-1] * 0.95,  # X position (90% of max value)
         y=plt.gca().get_ylim()[1] * 0.95,  # Y position (90% of max height)
-        s=f"N={session_duration.shape[0]}",  # The text to display
+        s=f"N={int(counts.sum())}",  # The text to display
         fontsize=12,
         ha='right',  # Align text to the right
         va='top',  # Align text to the top
@@ -50,135 +64,111 @@ def plot_session_hist(session_duration, output_dir="outputs/plots", filename="se
     plt.close()
     print(f"Plot saved to {save_path}")
 
-def plot_footprint(logs, output_dir="outputs/plots", filename="footprint_heatmap.png", overwrite=False):
+def plot_footprint(heatmap, output_dir="outputs/plots", filename="footprint_heatmap.png", overwrite=False):
+    """Render a TouchHeatmap accumulator (see ``heatmap.store_footprint``)."""
     os.makedirs(output_dir, exist_ok=True)  # Ensure output directory exists
 
     if not overwrite and os.path.exists(os.path.join(output_dir, filename)):
         print(f"Plot {filename} already exists. Skipping...")
         return
 
-    # Define the screen resolution
-    SCREEN_WIDTH = 1921
-    SCREEN_HEIGHT = 1081
-
-    # Extract x, y coordinates and convert them to integers (pixel positions)
-    x_coords = logs[:, 1].astype(int)
-    y_coords = logs[:, 2].astype(int)
-
-    # Create a 2D array representing the screen
-    heatmap_matrix = np.zeros((SCREEN_HEIGHT, SCREEN_WIDTH))  # (height, width)
-
-    # Count occurrences of (x, y) positions
-    for x, y in zip(x_coords, y_coords):
-        if 0 <= x <= SCREEN_WIDTH and 0 <= y <= SCREEN_HEIGHT:  # Ensure coordinates are within screen bounds
-            heatmap_matrix[y, x] += 1  # Note: y comes first because NumPy follows (row, col)
-        else:
-            print(f"Bad Resolution ({x},{y})")
+    # Out-of-screen touches are reported once instead of per point
+    print(heatmap.summary())
 
     # Set custom saturation range
-    V_MIN = 0   # Minimum intensity (usually 0)
-    # V_MAX = np.max(heatmap_matrix) * 0.5 # 50% of the max value (adjust as needed)
+    # V_MAX = np.max(heatmap.counts) * 0.5 # 50% of the max value (adjust as needed)
     V_MAX = 0.25 # 50% of the max value (adjust as needed)
 
-    # Plot heatmap
-    plt.figure(figsize=(10, 6))
-    sns.heatmap(
-        heatmap_matrix,
-        cmap="Reds",
-        cbar=True,
-        square=False,
-        xticklabels=1920,
-        yticklabels=1080,
-        vmin=V_MIN,  # Set lower saturation level
-        vmax=V_MAX   # Set upper saturation level
-    )
-
-    # Labels and title
-    plt.xlabel("X Coordinate (Pixels)")
-    plt.ylabel("Y Coordinate (Pixels)")
-    plt.title("Touch Interaction Heatmap")
-
-    # Flip the Y-axis (because images start from top-left)
-    plt.gca().invert_yaxis()
-
     # Save plot
     save_path = os.path.join(output_dir, filename)
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
-
-    # Close the plot to free memory
-    plt.close()
+    heatmap.render(save_path, vmax=V_MAX)
     print(f"Plot saved to {save_path}")
 
-def time_metrics(df, output_dir: Path):
+def time_metrics(cubes: RollupCubes, output_dir: Path):
+    # Served from the rollup cubes, raw actions are not rescanned
+    os.makedirs(output_dir, exist_ok=True)
+    items = cubes.items()
+    sessions = cubes.sessions()
+
     # Time per Item
-    time_per_item = df.groupby("ITEM_ID")["ACTION_DURATION"].sum().dropna()
-    time_per_item.plot(kind="bar", title="Total Time Spent per Item", xlabel="Item ID", ylabel="Time Spent (seconds)")
+    plt.figure()
+    items["ACTION_DURATION"].plot(kind="bar", title="Total Time Spent per Item", xlabel="Item ID", ylabel="Time Spent (seconds)")
     plt.savefig(output_dir / "item_duration.png", dpi=300, bbox_inches="tight")
+    plt.close()
 
     # Number of Interactions per Item
-    interactions_per_item = df.groupby("ITEM_ID")["ACTION"].count().dropna()
-    interactions_per_item.plot(kind="bar", title="Number of Interactions per Item", xlabel="Item ID", ylabel="Interaction Count")
+    plt.figure()
+    items["ACTION_COUNT"].plot(kind="bar", title="Number of Interactions per Item", xlabel="Item ID", ylabel="Interaction Count")
     plt.savefig(output_dir / "item_action.png", dpi=300, bbox_inches="tight")
+    plt.close()
 
     # Overall Time per Session
-    session_durations = df.groupby("SESSION_ID")["SESSION_DURATION"].first()
-    session_durations.plot(kind="bar", title="Total Session Durations", xlabel="Session ID", ylabel="Duration (seconds)")
+    plt.figure()
+    sessions["SESSION_DURATION"].plot(kind="bar", title="Total Session Durations", xlabel="Session ID", ylabel="Duration (seconds)")
     plt.savefig(output_dir / "session_duration.png", dpi=300, bbox_inches="tight")
-
+    plt.close()
 
     # Display numeric results in a table
-    result_df = pd.DataFrame({
-        "Total Time Spent (s)": time_per_item,
-        "Number of Interactions": interactions_per_item
-    }).fillna(0)
-
+    result_df = cubes.time_metrics()
     result_df.to_csv(output_dir / "time_metrics.csv")
 
     return result_df
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate Panel6 plots.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used to render plots")
+    parser.add_argument("--overwrite", action="store_true", help="Render every plot even if its inputs did not change")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    # # Load session data from pickle file
-    # with open(f"{OUTPUT_DIR}/{LOG_FILE}", "rb") as file:
-    #     sessions = pickle.load(file)
+    args = parse_args()
 
     metrics = pd.read_csv(DATA_DIR / LOG_METRICS_FILE)
-    session_duration = np.array(metrics['duration'])
-    session_interaction = np.array(metrics['num_actions'])
 
-    # Plot session time
-
-    overwrite_plots = False  # Set to True to overwrite existing plots
-    plot_session_hist(session_duration / 60, filename="session_duration_hist_minutes.png", x_label='Time (minutes)', overwrite=overwrite_plots)
-    plot_session_hist(session_duration[session_duration < 1500] / 60, filename="session_duration_hist_minutes_filtered.png", x_label='Time (minutes)', overwrite=overwrite_plots)
-    plot_session_hist(session_duration, filename="session_duration_hist_seconds.png", overwrite=overwrite_plots)
-    plot_session_hist(session_duration[session_duration < 1500], filename="session_duration_hist_seconds_filtered.png", overwrite=overwrite_plots)
+    # Histograms come from the daily sketches kept by preprocess_logs, built here only if missing
+    log_days = DailySketches.load(DATA_DIR / LOG_SKETCHES)
+    if not log_days.days:
+        log_days = DailySketches().update(log_sketches(metrics))
+    logs = log_days.total()
+    session_duration = logs["duration_histogram"]
 
     # Create html table with session metrics ordered by duration descending
     metrics = metrics.sort_values('duration', ascending=False)
     # Add column duration in minutes
     metrics['duration_minutes'] = metrics['duration'] / 60
     metrics['duration_hours'] = metrics['duration'] / 60 / 60
-    metrics.to_html(DATA_DIR / "session_metrics.html", index=False)
-
-    # Plot session actions
-    plot_session_hist(session_interaction, filename="session_events_hist.png", x_label='Number of Events', hist_color='orange', overwrite=overwrite_plots)
-    plot_session_hist(session_interaction[session_duration < 1500], filename="session_events_hist_filtered.png", x_label='Number of Events', hist_color='orange', overwrite=overwrite_plots)
+    write_table_report(DATA_DIR / "session_metrics.html", "Session Metrics", metrics)
+
+    # Footprint is merged from per-partition accumulators, binned once per partition
+    store = LogStore(DATA_DIR / LOG_STORE)
+
+    # Each plot is keyed on its inputs, only plots whose inputs changed are rendered
+    jobs = [
+        # Plot session time
+        PlotJob(plot_session_hist, session_duration, scale=1 / 60, filename="session_duration_hist_minutes.png", x_label='Time (minutes)'),
+        PlotJob(plot_session_hist, session_duration, upper=SHORT_SESSION_SECONDS, scale=1 / 60, filename="session_duration_hist_minutes_filtered.png", x_label='Time (minutes)'),
+        PlotJob(plot_session_hist, session_duration, filename="session_duration_hist_seconds.png"),
+        PlotJob(plot_session_hist, session_duration, upper=SHORT_SESSION_SECONDS, filename="session_duration_hist_seconds_filtered.png"),
+        # Plot session actions
+        PlotJob(plot_session_hist, logs["actions_histogram"], filename="session_events_hist.png", x_label='Number of Events', hist_color='orange'),
+        PlotJob(plot_session_hist, logs["short_actions_histogram"], filename="session_events_hist_filtered.png", x_label='Number of Events', hist_color='orange'),
+        PlotJob(plot_footprint, store_footprint(store, good_only=True), filename="footprint_heatmap.png"),
+    ]
+    run_plot_jobs(jobs, workers=args.workers, force=args.overwrite)
+
+    # Session tables indexed once, the duration order is an index instead of a re-sort
+    sessions = SessionStore.load(DATA_DIR, VERSION)
 
-    sessions = pickle.load(DATA_DIR / LOG_FILE)
-    sessions_all = np.concatenate(sessions)
-    print(sessions_all.shape)
-    plot_footprint(sessions_all, overwrite=overwrite_plots)
-
-    # Open action data csv
-    actions = pd.read_csv(DATA_DIR / "action_data.csv")
-
-    # actions["ITEM_ID"] = actions["ITEM_ID"].astype('int64')
     # Create html table with item_id ordered by action duration descending
-    actions = actions.sort_values('ACTION_DURATION', ascending=False)
-    actions = actions.dropna(subset=["ITEM_ID"])
-    actions.to_html(DATA_DIR / "session_actions.html", index=False)
-
-    df_time_metrics = time_metrics(actions, output_dir=ASSETS_DIR)
+    actions = sessions.frame("actions", sessions.actions_by_duration(with_item=True))
+    write_table_report(DATA_DIR / "session_actions.html", "Session Actions", actions)
+
+    # Cubes are kept up to date by preprocess_logs, built here only if missing
+    if (DATA_DIR / ROLLUPS).exists():
+        cubes = RollupCubes.load(DATA_DIR / ROLLUPS)
+    else:
+        cubes = RollupCubes.from_actions(sessions.actions)
+    df_time_metrics = time_metrics(cubes, output_dir=ASSETS_DIR)
 
     # Plot session time
     # plot_session_time(sessions)
\ No newline at end of file
@@ -0,0 +1,143 @@
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+
+# Screen resolution of the Panel6 kiosk
+SCREEN_WIDTH = 1921
+SCREEN_HEIGHT = 1081
+
+class TouchHeatmap:
+    """
+    Integer touch-count accumulator over the screen.
+
+    Touches are binned into ``bin_size`` x ``bin_size`` pixel cells with a
+    single ``np.bincount``. Accumulators with the same shape can be merged, so
+    per-file or per-day heatmaps add up to the archive footprint. Points
+    outside the screen are only counted (with their bounding box), not printed.
+    """
+
+    def __init__(self, width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT, bin_size: int = 1):
+        self.width = width
+        self.height = height
+        self.bin_size = bin_size
+        self.counts = np.zeros((-(-height // bin_size), -(-width // bin_size)), dtype=np.int64)
+        self.out_of_bounds = 0
+        self.out_of_bounds_box = None  # (x_min, y_min, x_max, y_max)
+
+    @classmethod
+    def from_points(cls, x_coords, y_coords, **kwargs) -> "TouchHeatmap":
+        heatmap = cls(**kwargs)
+        heatmap.add(x_coords, y_coords)
+        return heatmap
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def add(self, x_coords, y_coords):
+        """Accumulate touches at integer pixel positions (fractions are truncated)."""
+        x_coords = np.asarray(x_coords).astype(np.int64)
+        y_coords = np.asarray(y_coords).astype(np.int64)
+
+        inside = (x_coords >= 0) & (x_coords < self.width) & (y_coords >= 0) & (y_coords < self.height)
+        if not inside.all():
+            self._add_out_of_bounds(x_coords[~inside], y_coords[~inside])
+
+        n_rows, n_cols = self.counts.shape
+        cells = (y_coords[inside] // self.bin_size) * n_cols + x_coords[inside] // self.bin_size
+        self.counts += np.bincount(cells, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+        return self
+
+    def _add_out_of_bounds(self, x_coords, y_coords):
+        self._extend_box((x_coords.min(), y_coords.min(), x_coords.max(), y_coords.max()))
+        self.out_of_bounds += len(x_coords)
+
+    def _extend_box(self, box):
+        if self.out_of_bounds_box is not None:
+            old = self.out_of_bounds_box
+            box = (min(old[0], box[0]), min(old[1], box[1]), max(old[2], box[2]), max(old[3], box[3]))
+        self.out_of_bounds_box = tuple(int(value) for value in box)
+
+    def merge(self, other: "TouchHeatmap") -> "TouchHeatmap":
+        """Add another accumulator of the same geometry into this one."""
+        if (self.width, self.height, self.bin_size) != (other.width, other.height, other.bin_size):
+            raise ValueError("Cannot merge heatmaps with different screen size or bin size")
+
+        self.counts += other.counts
+        if other.out_of_bounds:
+            self._extend_box(other.out_of_bounds_box)
+            self.out_of_bounds += other.out_of_bounds
+        return self
+
+    def summary(self) -> str:
+        text = f"{self.total} touches in {self.counts.shape[1]}x{self.counts.shape[0]} bins of {self.bin_size}px"
+        if self.out_of_bounds:
+            x_min, y_min, x_max, y_max = self.out_of_bounds_box
+            text += f", {self.out_of_bounds} out of bounds (x {x_min}..{x_max}, y {y_min}..{y_max})"
+        return text
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            counts=self.counts,
+            geometry=np.array([self.width, self.height, self.bin_size]),
+            out_of_bounds=np.array([self.out_of_bounds, *(self.out_of_bounds_box or (0, 0, 0, 0))])
+        )
+
+    @classmethod
+    def load(cls, path) -> "TouchHeatmap":
+        with np.load(path) as data:
+            width, height, bin_size = data["geometry"].tolist()
+            heatmap = cls(width, height, bin_size)
+            heatmap.counts = data["counts"]
+            out_of_bounds, *box = data["out_of_bounds"].tolist()
+        heatmap.out_of_bounds = out_of_bounds
+        heatmap.out_of_bounds_box = tuple(box) if out_of_bounds else None
+        return heatmap
+
+    def render(self, save_path, vmax: float = None, cmap: str = "Reds", dpi: int = 300):
+        """Render the counts as a raster image, origin at the bottom-left like the screen plot."""
+        plt.figure(figsize=(10, 6))
+        plt.imshow(
+            self.counts,
+            cmap=cmap,
+            vmin=0,
+            vmax=vmax,
+            origin="lower",
+            interpolation="nearest",
+            aspect="auto",
+            extent=(0, self.counts.shape[1] * self.bin_size, 0, self.counts.shape[0] * self.bin_size)
+        )
+        plt.colorbar()
+
+        plt.xlabel("X Coordinate (Pixels)")
+        plt.ylabel("Y Coordinate (Pixels)")
+        plt.title("Touch Interaction Heatmap")
+
+        plt.savefig(save_path, dpi=dpi, bbox_inches="tight")
+        plt.close()
+
+def store_footprint(store, good_only: bool = True, bin_size: int = 1) -> TouchHeatmap:
+    """
+    Footprint of a LogStore, merged from one cached accumulator per partition.
+
+    Partitions are immutable once written, so each one is binned only the
+    first time it is seen and later runs just merge the cached counts.
+    """
+    heatmap = TouchHeatmap(bin_size=bin_size)
+    suffix = "good" if good_only else "all"
+
+    for partition in store.partitions:
+        cache_path = os.path.join(store.path, partition, f"footprint_{suffix}_{bin_size}.npz")
+        if os.path.exists(cache_path):
+            partition_heatmap = TouchHeatmap.load(cache_path)
+        else:
+            partition_heatmap = TouchHeatmap.from_points(
+                store.partition_column(partition, "x", good_only),
+                store.partition_column(partition, "y", good_only),
+                bin_size=bin_size
+            )
+            partition_heatmap.save(cache_path)
+        heatmap.merge(partition_heatmap)
+
+    return heatmap
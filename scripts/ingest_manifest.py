@@ -0,0 +1,90 @@
+import os
+import json
+import hashlib
+
+HASH_CHUNK_SIZE = 1 << 20
+
+def file_hash(path) -> str:
+    """SHA-1 of the file contents."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_fingerprint(path, previous: dict = None) -> dict:
+    """
+    Fingerprint a log file by size, mtime and content hash.
+
+    The hash of ``previous`` is reused when size and mtime are unchanged, so
+    unchanged files are never read again.
+    """
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    if previous and previous["size"] == fingerprint["size"] and previous["mtime_ns"] == fingerprint["mtime_ns"]:
+        fingerprint["sha1"] = previous["sha1"]
+    else:
+        fingerprint["sha1"] = file_hash(path)
+    return fingerprint
+
+def load_manifest(path, fsm_version: int, version: str, metrics_format: int = 1):
+    """Load the ingestion manifest, or None if it is missing or was written by another FSM/output version."""
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+
+    if (
+        manifest.get("fsm_version") != fsm_version
+        or manifest.get("version") != version
+        or manifest.get("metrics_format", 1) != metrics_format
+    ):
+        return None
+    return manifest
+
+def save_manifest(path, files: dict, fsm_version: int, version: str, metrics_format: int = 1, state: dict = None):
+    """Write the manifest atomically, ``state`` holds run settings and counters needed to resume."""
+    manifest = {"fsm_version": fsm_version, "version": version, "metrics_format": metrics_format, "files": files, "state": state or {}}
+    save_state(path, manifest)
+
+def load_state(path) -> dict:
+    """Load a JSON state file, empty if it does not exist yet."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def save_state(path, state: dict):
+    """Write a JSON state file atomically."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def diff_manifest(manifest, files):
+    """
+    Compare the log files on disk against the manifest.
+
+    Returns:
+    - dict: Fingerprints of all current files, keyed by filename.
+    - list: Paths of files not in the manifest.
+    - list: Paths of files whose content hash changed.
+    - list: Filenames in the manifest that are no longer on disk.
+    """
+    known = manifest["files"] if manifest else {}
+    fingerprints, new, changed = {}, [], []
+
+    for path in files:
+        filename = os.path.basename(path)
+        previous = known.get(filename)
+        fingerprints[filename] = file_fingerprint(path, previous)
+
+        if previous is None:
+            new.append(path)
+        elif previous["sha1"] != fingerprints[filename]["sha1"]:
+            changed.append(path)
+
+    removed = sorted(set(known) - set(fingerprints))
+    return fingerprints, new, changed, removed
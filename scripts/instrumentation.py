@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import datetime
+import functools
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, RSS is then not reported
+    resource = None
+
+def _peak_rss_mb(who=None) -> float:
+    """High-water mark of the resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    return usage.ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+
+class StageStats:
+    """Totals of one stage over all the times it ran."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rows = None
+        self.peak_rss_growth_mb = None
+        self.process_peak_rss_mb = None
+        self.children_peak_rss_mb = None
+
+    def add_rows(self, rows):
+        if rows is not None:
+            self.rows = (self.rows or 0) + int(rows)
+
+    def add_peak_rss(self, growth, process_peak, children_peak=None):
+        """Keep the largest peak RSS growth of a call and the latest process-wide peaks."""
+        if growth is not None:
+            self.peak_rss_growth_mb = max(self.peak_rss_growth_mb or 0.0, growth)
+        if process_peak is not None:
+            self.process_peak_rss_mb = max(self.process_peak_rss_mb or 0.0, process_peak)
+        if children_peak is not None:
+            self.children_peak_rss_mb = children_peak
+
+    def merge(self, other: "StageStats"):
+        """Add the totals of the same stage recorded in another process."""
+        self.calls += other.calls
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.add_rows(other.rows)
+        self.add_peak_rss(other.peak_rss_growth_mb, other.process_peak_rss_mb)
+
+    def as_dict(self) -> dict:
+        return {key: value for key, value in vars(self).items()}
+
+class Instrumentation:
+    """
+    Per-stage wall time, CPU time, peak RSS and row counts of a pipeline run.
+
+    Stages nest: a stage opened inside another is recorded as ``outer/inner``.
+    A stage that runs many times (e.g. once per log file) is aggregated into
+    one entry with its number of calls. ``peak_rss_growth_mb`` is how far a
+    call raised the process peak RSS above its value at stage entry (the
+    largest over all calls); ``process_peak_rss_mb`` is the peak so far of the
+    process running the stage, at stage exit. RSS of worker processes is reported separately once they
+    have exited (``children_peak_rss_mb``). Stages recorded inside workers are
+    merged into the parent under the stage the work was fanned out from when
+    the task runs through ``run_recorded``.
+
+    With ``profile_stage`` set, that stage runs under cProfile and its
+    statistics are dumped to ``profile_<stage>.prof`` next to the run report.
+    """
+
+    def __init__(self, profile_stage: str = None):
+        self.profile_stage = profile_stage
+        self.stages = {}
+        self._stack = []
+        self._profile = None
+        self._profiling = False
+        self.started = datetime.datetime.now()
+
+    @contextmanager
+    def stage(self, name: str, rows=None):
+        """
+        Record the enclosed block as stage ``name``.
+
+        Yields the StageStats entry, so the row count can be set once known
+        with ``stats.add_rows(n)``.
+        """
+        path = "/".join(self._stack + [name])
+        stats = self.stages.get(path)
+        if stats is None:
+            stats = self.stages[path] = StageStats(path)
+
+        # Every call of the profiled stage accumulates into one profile
+        profile = None
+        if self.profile_stage in (name, path) and not self._profiling:
+            if self._profile is None:
+                self._profile = cProfile.Profile()
+            profile = self._profile
+            self._profiling = True
+            profile.enable()
+
+        self._stack.append(name)
+        entry_rss = _peak_rss_mb()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stats
+        finally:
+            stats.wall_seconds += time.perf_counter() - wall
+            stats.cpu_seconds += time.process_time() - cpu
+            stats.calls += 1
+            stats.add_rows(rows)
+            if resource is not None:
+                process_peak = _peak_rss_mb()
+                stats.add_peak_rss(process_peak - entry_rss, process_peak, _peak_rss_mb(resource.RUSAGE_CHILDREN))
+            self._stack.pop()
+            if profile is not None:
+                profile.disable()
+                self._profiling = False
+
+    def merge(self, stages: list):
+        """Add stages recorded in a worker process, nested under the currently open stage."""
+        for other in stages:
+            path = "/".join(self._stack + [other.name])
+            stats = self.stages.get(path)
+            if stats is None:
+                stats = self.stages[path] = StageStats(path)
+            stats.merge(other)
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<48} {'calls':>6} {'wall s':>9} {'cpu s':>9} {'rows':>10} {'peak +MB':>9} {'proc MB':>9}"]
+        for stats in self.stages.values():
+            rows = "" if stats.rows is None else stats.rows
+            growth = "" if stats.peak_rss_growth_mb is None else f"{stats.peak_rss_growth_mb:.0f}"
+            rss = "" if stats.process_peak_rss_mb is None else f"{stats.process_peak_rss_mb:.0f}"
+            lines.append(f"{stats.name:<48} {stats.calls:>6} {stats.wall_seconds:>9.3f} {stats.cpu_seconds:>9.3f} {rows:>10} {growth:>9} {rss:>9}")
+        return "\n".join(lines)
+
+    def write_report(self, path, **extra) -> str:
+        """
+        Write the run report as JSON, plus the cProfile dump if a stage was profiled.
+
+        ``extra`` (e.g. file counts or arguments) is stored under ``run``.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        profile_path = None
+        if self._profile is not None:
+            profile_path = os.path.join(directory, f"profile_{self.profile_stage.replace('/', '_')}.prof")
+            self._profile.dump_stats(profile_path)
+
+        report = {
+            "run": {
+                "started": self.started.isoformat(timespec="seconds"),
+                "finished": datetime.datetime.now().isoformat(timespec="seconds"),
+                "argv": sys.argv,
+                "pid": os.getpid(),
+                "profile": profile_path,
+                **extra,
+            },
+            "stages": [stats.as_dict() for stats in self.stages.values()],
+        }
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=1, default=str)
+        os.replace(f"{path}.tmp", path)
+        return path
+
+# Process-wide recorder used by the pipeline scripts and the FSM internals
+RECORDER = Instrumentation()
+
+def stage(name: str, rows=None):
+    """``RECORDER.stage``, e.g. ``with stage("parse", rows=len(files)):``."""
+    return RECORDER.stage(name, rows)
+
+def run_recorded(function, *args, **kwargs):
+    """
+    Call ``function`` in a worker process and return ``(result, stages)``.
+
+    The call is recorded by a fresh recorder, a forked worker would otherwise
+    carry the stages and open stage of the parent; ``stages`` are for
+    ``RECORDER.merge`` in the parent.
+    """
+    global RECORDER
+    parent, RECORDER = RECORDER, Instrumentation()
+    try:
+        result = function(*args, **kwargs)
+        return result, list(RECORDER.stages.values())
+    finally:
+        RECORDER = parent
+
+def instrumented(name: str, rows=None):
+    """
+    Decorator recording every call of a function as stage ``name``.
+
+    ``rows`` is an optional callable receiving the call arguments and
+    returning the row count of the call.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with RECORDER.stage(name, rows(*args, **kwargs) if rows is not None else None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,122 @@
+import json
+import functools
+from typing import NamedTuple
+import numpy as np
+
+READ_CHUNK_SIZE = 1 << 20  # Characters read from disk per refill of the decode buffer
+
+class LogColumns(NamedTuple):
+    """Typed columns of a single Interactions log."""
+    action: list
+    x: np.ndarray
+    y: np.ndarray
+    time: np.ndarray
+
+    def __len__(self):
+        return len(self.action)
+
+def parse_number(token: str):
+    """Parse a numeric literal the way ``ast.literal_eval`` would (int if integral, else float)."""
+    token = token.strip()
+    if token.lstrip("+-").isdigit():
+        return int(token)
+    return float(token)
+
+@functools.lru_cache(maxsize=1 << 16)
+def parse_position(text: str):
+    """
+    Parse a ``positionScreen`` string such as ``"(1029.0, 546.0)"`` into an ``(x, y)`` tuple.
+
+    Touches repeat the same position for every Down/Up/Click event, so parsed
+    positions are memoised on the raw string, keeping the most recent ones.
+    """
+    tokens = text.strip().strip("()").split(",")
+    return parse_number(tokens[0]), parse_number(tokens[1])
+
+def iter_log_events(path, chunk_size: int = READ_CHUNK_SIZE):
+    """
+    Stream the events of a JSON log file one object at a time.
+
+    The file is decoded incrementally with ``JSONDecoder.raw_decode`` so the
+    whole list of event dicts is never materialised.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as file:
+        buffer = file.read(chunk_size)
+        eof = len(buffer) < chunk_size
+        pos = len(buffer) - len(buffer.lstrip())
+
+        if buffer[pos:pos + 1] != "[":
+            raise ValueError(f"{path} is not a JSON array of events")
+        pos += 1
+
+        while True:
+            # Skip separators between array elements
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+
+            item = None
+            if pos < len(buffer):
+                try:
+                    item, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+
+            if item is None:
+                if eof:
+                    raise ValueError(f"{path} ends before the closing bracket")
+                # Element crosses the buffer boundary, refill and retry
+                chunk = file.read(chunk_size)
+                eof = len(chunk) < chunk_size
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            yield item
+
+            if pos >= chunk_size:
+                buffer = buffer[pos:]
+                pos = 0
+
+def read_log_columns(path) -> LogColumns:
+    """Read a log file into typed (action, x, y, time) columns in a single pass."""
+    actions, xs, ys, times = [], [], [], []
+
+    for item in iter_log_events(path):
+        x, y = parse_position(item["positionScreen"])
+        actions.append(item["action"])
+        xs.append(x)
+        ys.append(y)
+        times.append(float(item["time"]))
+
+    return LogColumns(
+        action=actions,
+        x=np.array(xs, dtype=np.float64),
+        y=np.array(ys, dtype=np.float64),
+        time=np.array(times, dtype=np.float64),
+    )
+
+def columns_to_array(columns: LogColumns) -> np.ndarray:
+    """
+    Convert typed columns back to the legacy ``(action, x, y, time)`` object array.
+
+    Produces the same array as ``np.array(rows, dtype=object)`` over the parsed
+    rows, i.e. shape ``(0,)`` for an empty log and Python floats in the numeric columns.
+    """
+    if len(columns) == 0:
+        return np.array([], dtype=object)
+
+    log_session = np.empty((len(columns), 4), dtype=object)
+    log_session[:, 0] = columns.action
+    log_session[:, 1] = columns.x
+    log_session[:, 2] = columns.y
+    log_session[:, 3] = columns.time
+    return log_session
+
+def read_log(path) -> np.ndarray:
+    """Read a log file into the legacy object array used by ``preprocess_logs``."""
+    return columns_to_array(read_log_columns(path))
@@ -0,0 +1,241 @@
+import os
+import json
+import shutil
+import numpy as np
+from log_parser import LogColumns
+from panel6_stats.log_names import device_tag
+
+# Touch coordinates are stored as whole pixels (truncated, as plot_footprint did)
+COORD_DTYPE = np.int16
+COLUMNS = ("action", "x", "y", "time")
+VOCAB_FILE = "vocab.json"
+
+class LogStore:
+    """
+    Partitioned columnar store of interaction logs.
+
+    Layout of a store directory::
+
+        vocab.json              action strings, the position is the action code
+        part-<DEVICE>-00000/
+            files.json          source filenames of the partition
+            offsets.npy         int64, row offsets of each file (len(files) + 1)
+            good.npy            bool, file is complete and from the new app version
+            action.npy          int32 codes into vocab.json
+            x.npy, y.npy        int16 pixel coordinates
+            time.npy            float64 timestamps
+
+    Partitions are sharded by device (the kiosk tag of the log filenames) and
+    numbered per device, so listing them in name order gives the files of
+    each device together and in time order. A device's shard can be read on
+    its own (``device_partitions``).
+
+    Columns are memory-mapped, so readers only touch the columns they use.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+
+        with open(os.path.join(self.path, VOCAB_FILE), "r", encoding="utf-8") as file:
+            self.vocab = json.load(file)
+
+        self.partitions = sorted(
+            entry for entry in os.listdir(self.path)
+            if entry.startswith("part-") and not entry.endswith(".tmp") and os.path.isdir(os.path.join(self.path, entry))
+        )
+
+    def _load(self, partition, name):
+        return np.load(os.path.join(self.path, partition, f"{name}.npy"), mmap_mode="r")
+
+    def _files(self, partition):
+        with open(os.path.join(self.path, partition, "files.json"), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def partition_files(self, partition: str) -> list:
+        return self._files(partition)
+
+    @property
+    def devices(self) -> list:
+        return sorted({partition_device(partition) for partition in self.partitions})
+
+    def device_partitions(self, device: str) -> list:
+        """Partitions holding the files of one device."""
+        return [partition for partition in self.partitions if partition_device(partition) == device]
+
+    @property
+    def files(self) -> list:
+        return [filename for partition in self.partitions for filename in self._files(partition)]
+
+    def good(self) -> np.ndarray:
+        return np.concatenate([self._load(partition, "good") for partition in self.partitions]) if self.partitions else np.zeros(0, dtype=bool)
+
+    def _row_mask(self, partition):
+        """Row mask selecting the good files of a partition."""
+        offsets = self._load(partition, "offsets")
+        good = self._load(partition, "good")
+        return np.repeat(good, np.diff(offsets))
+
+    def partition_column(self, partition: str, name: str, good_only: bool = False) -> np.ndarray:
+        """One column of a single partition, memory-mapped unless filtered to good files."""
+        values = self._load(partition, name)
+        return values[self._row_mask(partition)] if good_only else values
+
+    def column(self, name: str, good_only: bool = False) -> np.ndarray:
+        """
+        Read one column across all partitions.
+
+        A single partition is returned as a read-only memory map without copying.
+        """
+        parts = [self.partition_column(partition, name, good_only) for partition in self.partitions]
+
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return np.zeros(0, dtype=COORD_DTYPE if name in ("x", "y") else (np.int32 if name == "action" else np.float64))
+        return np.concatenate(parts)
+
+    def actions(self, good_only: bool = False) -> np.ndarray:
+        """Decoded action strings as an object array."""
+        return np.asarray(self.vocab, dtype=object)[self.column("action", good_only)]
+
+    def offsets(self, good_only: bool = False) -> np.ndarray:
+        """Row offsets of each file in the concatenated columns (``len(files) + 1`` entries)."""
+        sizes = []
+        for partition in self.partitions:
+            partition_sizes = np.diff(self._load(partition, "offsets"))
+            sizes.append(partition_sizes[self._load(partition, "good")] if good_only else partition_sizes)
+
+        sizes = np.concatenate(sizes) if sizes else np.zeros(0, dtype=np.int64)
+        return np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+
+    def file_durations(self, good_only: bool = False) -> np.ndarray:
+        """Duration of every file (last minus first timestamp, 0 for empty files)."""
+        time = self.column("time", good_only)
+        offsets = self.offsets(good_only)
+        durations = np.zeros(len(offsets) - 1)
+        non_empty = offsets[1:] > offsets[:-1]
+        durations[non_empty] = time[offsets[1:][non_empty] - 1] - time[offsets[:-1][non_empty]]
+        return durations
+
+    def iter_logs(self, good_only: bool = False):
+        """Yield ``(filename, LogColumns)`` per file, decoding actions through the vocabulary."""
+        vocab = np.asarray(self.vocab, dtype=object)
+
+        for partition in self.partitions:
+            offsets = self._load(partition, "offsets")
+            good = self._load(partition, "good")
+            columns = {name: self._load(partition, name) for name in COLUMNS}
+
+            for index, filename in enumerate(self._files(partition)):
+                if good_only and not good[index]:
+                    continue
+                start, end = offsets[index], offsets[index + 1]
+                yield filename, LogColumns(
+                    action=vocab[columns["action"][start:end]].tolist(),
+                    x=np.asarray(columns["x"][start:end], dtype=np.float64),
+                    y=np.asarray(columns["y"][start:end], dtype=np.float64),
+                    time=np.array(columns["time"][start:end]),
+                )
+
+    def iter_codes(self, good_only: bool = False, partitions=None):
+        """
+        Yield ``(filename, action codes, times)`` per file without decoding actions.
+
+        ``partitions`` restricts the scan, e.g. to the partition appended last.
+        """
+        for partition in self.partitions if partitions is None else partitions:
+            offsets = self._load(partition, "offsets")
+            good = self._load(partition, "good")
+            codes = self._load(partition, "action")
+            time = self._load(partition, "time")
+
+            for index, filename in enumerate(self._files(partition)):
+                if good_only and not good[index]:
+                    continue
+                start, end = offsets[index], offsets[index + 1]
+                yield filename, np.array(codes[start:end]), np.array(time[start:end])
+
+def partition_device(partition: str) -> str:
+    """Device of a partition named ``part-<DEVICE>-<index>``."""
+    return partition.split("-")[1]
+
+def _by_device(logs, filenames, good) -> list:
+    """Split files into ``(device, logs, filenames, good)`` shards in device order, keeping the file order within each shard."""
+    shards = {}
+    for log, filename, is_good in zip(logs, filenames, good):
+        shard = shards.setdefault(device_tag(filename), ([], [], []))
+        shard[0].append(log)
+        shard[1].append(filename)
+        shard[2].append(is_good)
+    return [(device, *shard) for device, shard in sorted(shards.items())]
+
+def _encode_actions(logs, vocab):
+    """Dictionary-encode the action column, extending ``vocab`` in place."""
+    index = {action: code for code, action in enumerate(vocab)}
+    codes = []
+    for log in logs:
+        for action in log.action:
+            code = index.get(action)
+            if code is None:
+                code = index[action] = len(vocab)
+                vocab.append(action)
+            codes.append(code)
+    return np.array(codes, dtype=np.int32)
+
+def _to_pixels(values):
+    info = np.iinfo(COORD_DTYPE)
+    return np.clip(np.trunc(values), info.min, info.max).astype(COORD_DTYPE)
+
+def _write_partition(path, logs, filenames, good, vocab):
+    os.makedirs(path)
+    sizes = [len(log) for log in logs]
+
+    np.save(os.path.join(path, "offsets.npy"), np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)]).astype(np.int64))
+    np.save(os.path.join(path, "good.npy"), np.asarray(good, dtype=bool))
+    np.save(os.path.join(path, "action.npy"), _encode_actions(logs, vocab))
+    np.save(os.path.join(path, "x.npy"), _to_pixels(np.concatenate([log.x for log in logs])) if logs else np.zeros(0, dtype=COORD_DTYPE))
+    np.save(os.path.join(path, "y.npy"), _to_pixels(np.concatenate([log.y for log in logs])) if logs else np.zeros(0, dtype=COORD_DTYPE))
+    np.save(os.path.join(path, "time.npy"), np.concatenate([log.time for log in logs]) if logs else np.zeros(0))
+
+    with open(os.path.join(path, "files.json"), "w", encoding="utf-8") as file:
+        json.dump(list(filenames), file)
+
+def _write_vocab(path, vocab):
+    tmp_path = os.path.join(path, f"{VOCAB_FILE}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(vocab, file)
+    os.replace(tmp_path, os.path.join(path, VOCAB_FILE))
+
+def write_store(path, logs, filenames, good):
+    """Write ``logs`` (a list of LogColumns) as a fresh store with one partition per device, replacing any existing one."""
+    path = str(path)
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    vocab = []
+    for device, device_logs, device_filenames, device_good in _by_device(logs, filenames, good):
+        _write_partition(os.path.join(tmp_path, f"part-{device}-00000"), device_logs, device_filenames, device_good, vocab)
+    _write_vocab(tmp_path, vocab)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+def append_store(path, logs, filenames, good):
+    """Append ``logs`` to an existing store as one new partition per device."""
+    path = str(path)
+    store = LogStore(path)
+    vocab = list(store.vocab)
+
+    shards = []
+    for device, device_logs, device_filenames, device_good in _by_device(logs, filenames, good):
+        partition = f"part-{device}-{len(store.device_partitions(device)):05d}"
+        tmp_path = os.path.join(path, f"{partition}.tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        _write_partition(tmp_path, device_logs, device_filenames, device_good, vocab)
+        shards.append((tmp_path, os.path.join(path, partition)))
+
+    # Vocabulary only grows, so it is safe to publish before the partitions
+    _write_vocab(path, vocab)
+    for tmp_path, partition_path in shards:
+        os.replace(tmp_path, partition_path)
@@ -0,0 +1,226 @@
+import os
+import time
+import asyncio
+import argparse
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from ingest_manifest import file_fingerprint, load_state, save_state
+from preprocess_logs import (
+    LOG_DIR, LOG_TYPE, OUTPUT_DIR, VERSION, output_paths, process_log_file,
+    load_ingest_manifest, store_parsed_logs, ingest_logs, segment_store, rollup_tables,
+)
+from panel6_stats.sketches import DailySketches
+
+CHECKPOINT_FILE = f"{OUTPUT_DIR}/watch_checkpoint_{VERSION}.json"
+
+def list_log_files(directory, word: str = LOG_TYPE) -> dict:
+    """Size and mtime of the log files of a given type, keyed by path."""
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and word in entry.name and entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+def is_complete(path) -> bool:
+    """A log is written as one JSON array, so it is complete once it ends with the closing bracket."""
+    with open(path, "rb") as file:
+        file.seek(0, os.SEEK_END)
+        file.seek(max(0, file.tell() - 64))
+        return file.read().rstrip().endswith(b"]")
+
+def parse_log_file(path):
+    """Fingerprint and parse one log file, run in a worker process."""
+    fingerprint = file_fingerprint(path)
+    columns, session_info = process_log_file(path)
+    return fingerprint, columns, session_info
+
+class LogWatcher:
+    """
+    Long-running ingestion of the log directory.
+
+    Three asyncio tasks connected by bounded queues:
+
+    - scan: polls the directory every ``poll_seconds``. A file is ready once
+      its size and mtime have not changed for ``settle_seconds`` and it ends
+      with the closing bracket of its JSON array. Files recorded in the
+      manifest with the same size and mtime are skipped.
+    - parse: parses and classifies ready files in a process pool, off the event loop.
+    - commit: groups parsed files into batches of up to ``batch_size`` files,
+      or whatever arrived within ``batch_seconds`` of the first one, and
+      commits each batch in a thread: store, metrics, sketches and manifest
+      (``store_parsed_logs``), then segmentation and rollups of the new partition.
+
+    The queues give backpressure: when commits fall behind, parsing waits, and
+    when parsing falls behind, the scan stops queuing files and picks them up
+    on a later poll. A file waits at most about ``settle_seconds +
+    batch_seconds`` plus one commit before its sessions are in the tables.
+
+    The manifest records the ingested files and is written last in a commit,
+    so a restart skips everything committed before. The files of the batch
+    being committed are written to a checkpoint first; if the service stopped
+    during a commit, the next start resynchronises with a full ingestion run
+    instead of appending the batch twice. Deleted files are left to the batch run.
+    """
+
+    def __init__(self, log_dir=LOG_DIR, tables: str = "wide", workers: int = 1, poll_seconds: float = 5,
+                 settle_seconds: float = 10, batch_size: int = 50, batch_seconds: float = 30):
+        self.log_dir = log_dir
+        self.tables = tables
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.paths = output_paths(tables)
+
+        self.ready = asyncio.Queue(maxsize=2 * workers)
+        self.parsed = asyncio.Queue(maxsize=batch_size)
+        self._known = {}  # Manifest fingerprints of the ingested files
+        self._changing = {}  # path -> (size, mtime_ns), time first seen with that signature
+        self._in_flight = {}  # filename -> time it was queued, until its batch is committed
+        self._failed = {}  # filename -> signature of a file that could not be parsed
+
+    def recover(self):
+        """Finish an interrupted commit, then load the fingerprints of the ingested files."""
+        checkpoint = load_state(CHECKPOINT_FILE)
+        if checkpoint.get("pending"):
+            print(f"Commit of {len(checkpoint['pending'])} files was interrupted, reingesting every log file")
+            ingest_logs(self.paths, workers=self.workers, full=True, log_dir=self.log_dir)
+            result, _ = segment_store(self.paths, self.tables, workers=self.workers)
+            rollup_tables(self.paths, self.tables, result)
+            save_state(CHECKPOINT_FILE, {"pending": []})
+
+        manifest = load_ingest_manifest(self.paths)
+        self._known = manifest["files"] if manifest else {}
+
+    def _is_new(self, filename: str, signature) -> bool:
+        known = self._known.get(filename)
+        return (
+            filename not in self._in_flight
+            and self._failed.get(filename) != signature
+            and (known is None or (known["size"], known["mtime_ns"]) != signature)
+        )
+
+    async def scan(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            files = await loop.run_in_executor(None, list_log_files, self.log_dir)
+            now = time.monotonic()
+            self._changing = {path: seen for path, seen in self._changing.items() if path in files}
+
+            for path, signature in sorted(files.items()):
+                filename = os.path.basename(path)
+                if not self._is_new(filename, signature):
+                    continue
+                seen = self._changing.get(path)
+                if seen is None or seen[0] != signature:
+                    self._changing[path] = (signature, now)
+                    continue
+                if now - seen[1] < self.settle_seconds or not await loop.run_in_executor(None, is_complete, path):
+                    continue
+                if self.ready.full():
+                    break  # Parsing is behind, the rest is picked up by a later poll
+
+                del self._changing[path]
+                self._in_flight[filename] = now
+                self.ready.put_nowait((path, signature))
+
+            await asyncio.sleep(self.poll_seconds)
+
+    async def parse(self, pool):
+        loop = asyncio.get_running_loop()
+        while True:
+            path, signature = await self.ready.get()
+            filename = os.path.basename(path)
+            try:
+                result = await loop.run_in_executor(pool, parse_log_file, path)
+            except Exception as error:
+                # Retried only once the file changes again
+                print(f"Could not parse {filename}: {error}")
+                self._failed[filename] = signature
+                self._in_flight.pop(filename, None)
+                continue
+            await self.parsed.put((filename, *result))
+
+    async def commit(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.parsed.get()]
+            deadline = loop.time() + self.batch_seconds
+            while len(batch) < self.batch_size and loop.time() < deadline:
+                try:
+                    batch.append(await asyncio.wait_for(self.parsed.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+
+            started = time.monotonic()
+            filenames = sorted(filename for filename, *_ in batch)
+            appended = await asyncio.to_thread(self.commit_batch, sorted(batch, key=lambda parsed: parsed[0]))
+            waited = time.monotonic() - min(self._in_flight.pop(filename) for filename in filenames)
+            print(
+                f"Committed {len(batch)} files ({'appended' if appended else 'store rewritten'}) "
+                f"in {time.monotonic() - started:.1f}s, {waited:.0f}s after the first was ready. {self.today_summary()}"
+            )
+
+    def commit_batch(self, batch: list) -> bool:
+        """Commit parsed files ``(filename, fingerprint, columns, session_info)`` to every output, returns whether they were appended."""
+        filenames = [filename for filename, *_ in batch]
+        save_state(CHECKPOINT_FILE, {"pending": filenames})
+
+        manifest = load_ingest_manifest(self.paths)
+        fingerprints = {**(manifest["files"] if manifest else {}), **{filename: fingerprint for filename, fingerprint, _, _ in batch}}
+        parsed_logs = [columns for _, _, columns, _ in batch]
+        parsed_metrics = pd.DataFrame([session_info for *_, session_info in batch])
+
+        appended = store_parsed_logs(self.paths, manifest, fingerprints, parsed_logs, parsed_metrics)
+        result, _ = segment_store(self.paths, self.tables, workers=self.workers)
+        rollup_tables(self.paths, self.tables, result)
+
+        save_state(CHECKPOINT_FILE, {"pending": []})
+        self._known = fingerprints
+        return appended
+
+    def today_summary(self) -> str:
+        today = DailySketches.load(self.paths["log_sketches"]).total(days=[datetime.date.today().isoformat()])
+        if "files" not in today:
+            return "No sessions today yet."
+        files = today["files"]
+        return (
+            f"Today: {files['total']} sessions, {files['complete']} complete, "
+            f"median duration {today['duration'].quantile(0.5):.0f} s."
+        )
+
+    async def run(self):
+        await asyncio.to_thread(self.recover)
+        print(f"Watching {self.log_dir} ({len(self._known)} files ingested)")
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            tasks = [self.scan(), self.commit(), *(self.parse(pool) for _ in range(self.workers))]
+            await asyncio.gather(*tasks)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ingest Panel6 log files as they are written.")
+    parser.add_argument("--log-dir", default=LOG_DIR, help="Directory the kiosks write their logs to")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used to parse and segment log files")
+    parser.add_argument("--tables", choices=["wide", "normalized"], default="wide",
+                        help="Write wide session/action data or normalized session/event/action tables")
+    parser.add_argument("--poll-seconds", type=float, default=5, help="Interval between two scans of the log directory")
+    parser.add_argument("--settle-seconds", type=float, default=10, help="Time a file must stay unchanged before it is parsed")
+    parser.add_argument("--batch-size", type=int, default=50, help="Maximum number of files committed at once")
+    parser.add_argument("--batch-seconds", type=float, default=30, help="Time to wait for more files before committing a batch")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    watcher = LogWatcher(
+        args.log_dir, tables=args.tables, workers=args.workers, poll_seconds=args.poll_seconds,
+        settle_seconds=args.settle_seconds, batch_size=args.batch_size, batch_seconds=args.batch_seconds,
+    )
+    try:
+        asyncio.run(watcher.run())
+    except KeyboardInterrupt:
+        print("Stopped")
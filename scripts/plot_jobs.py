@@ -0,0 +1,132 @@
+import os
+import json
+import inspect
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+CACHE_FILE = ".plot_cache.json"
+
+class PlotJob:
+    """
+    One figure to render: ``function(*args, output_dir=..., filename=..., overwrite=True, **kwargs)``.
+
+    ``function`` must be a module-level plotting function taking the
+    ``output_dir``/``filename``/``overwrite`` keywords of generate_plots.
+    """
+
+    def __init__(self, function, *args, output_dir="outputs/plots", filename, **kwargs):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.output_dir = output_dir
+        self.filename = filename
+
+    @property
+    def path(self):
+        return os.path.join(self.output_dir, self.filename)
+
+    def key(self) -> str:
+        """Hash of the plotting function and its source, its input arrays and parameters."""
+        digest = hashlib.sha1()
+        digest.update(f"{self.function.__module__}.{self.function.__qualname__}".encode())
+        digest.update(_function_source(self.function))
+        _update_hash(digest, self.args)
+        _update_hash(digest, self.kwargs)
+        return digest.hexdigest()
+
+    def run(self):
+        self.function(*self.args, output_dir=self.output_dir, filename=self.filename, overwrite=True, **self.kwargs)
+
+def _function_source(function) -> bytes:
+    """Source of a function, so editing a plot redraws it; its bytecode when the source is not available."""
+    try:
+        return inspect.getsource(function).encode()
+    except (OSError, TypeError):
+        return function.__code__.co_code
+
+def _update_hash(digest, value):
+    """Feed a value into ``digest``, hashing arrays by content instead of repr."""
+    if isinstance(value, (pd.Series, pd.Index)):
+        value = value.to_numpy()
+
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest.update(f"ndarray{value.dtype.str}{value.shape}".encode())
+        digest.update(value.tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, pd.DataFrame):
+        digest.update(f"DataFrame{list(value.columns)}".encode())
+        for column in value.columns:
+            _update_hash(digest, value[column])
+    elif isinstance(value, dict):
+        for name in sorted(value):
+            digest.update(f"{name}=".encode())
+            _update_hash(digest, value[name])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_hash(digest, item)
+    elif hasattr(value, "__dict__"):
+        # Accumulator objects such as TouchHeatmap
+        digest.update(type(value).__qualname__.encode())
+        _update_hash(digest, vars(value))
+    else:
+        digest.update(repr(value).encode())
+
+def _load_cache(output_dir) -> dict:
+    path = os.path.join(output_dir, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def _save_cache(output_dir, cache: dict):
+    path = os.path.join(output_dir, CACHE_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+        json.dump(cache, file, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+def _run_job(job: PlotJob):
+    job.run()
+    return job.path
+
+def run_plot_jobs(jobs: list, workers: int = 1, force: bool = False) -> list:
+    """
+    Render only the jobs whose inputs changed since the last run.
+
+    Each output directory keeps a ``.plot_cache.json`` mapping filename to the
+    job key that produced it. Stale jobs render in a process pool on the
+    headless Agg backend when ``workers > 1``.
+
+    Returns:
+    - list: Paths of the figures that were rendered.
+    """
+    keys = {job.path: job.key() for job in jobs}
+    caches = {}
+    stale = []
+    for job in jobs:
+        cache = caches.setdefault(job.output_dir, _load_cache(job.output_dir))
+        if force or cache.get(job.filename) != keys[job.path] or not os.path.exists(job.path):
+            stale.append(job)
+        else:
+            print(f"Plot {job.filename} is up to date. Skipping...")
+
+    if workers > 1 and len(stale) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            rendered = list(executor.map(_run_job, stale))
+    else:
+        # Rendered with the caller's backend, only pool workers are switched to Agg
+        rendered = [_run_job(job) for job in stale]
+
+    for job in stale:
+        caches[job.output_dir][job.filename] = keys[job.path]
+    for output_dir, cache in caches.items():
+        os.makedirs(output_dir, exist_ok=True)
+        _save_cache(output_dir, cache)
+
+    return rendered
@@ -1,79 +1,80 @@
 import os
 import numpy as np
-import seaborn as sns
 import pandas as pd
-import ast
-import re
-import json
-import pickle
-from event_processor import SessionFSM
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from event_processor import SessionFSM, ArraySessionFSM
+from log_parser import read_log_columns
+from session_flags import classify_actions
+from action_vocab import ActionVocabulary
+from session_tables import SessionTables, build_session_tables
+from log_store import LogStore, write_store, append_store
+from ingest_manifest import load_manifest, save_manifest, diff_manifest, load_state, save_state
+from panel6_stats.rollups import RollupCubes
+from panel6_stats.log_names import device_tag
+from panel6_stats.sketches import DailySketches, log_sketches, table_sketches
+from instrumentation import RECORDER, stage, run_recorded
 
 def get_json_files(directory, word: str = "Interactions"):
-    return [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.json') and word in f]
+    """List the log files of a given type, sorted by filename so every run sees the same order."""
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.json') and word in f)
 
-def read_json_files(files):
-    logs = []
-    all_sessions = []
-
-    for log in files:
-        with open(log, "r", encoding="utf-8") as file:
-            data = json.load(file)
+def process_log_file(log):
+    """Parse one log file into typed columns plus its ``session_info`` metrics row."""
+    columns = read_log_columns(log)
+    flags = classify_actions(columns.action)
 
-            processed_logs = [
-                (item["action"], *ast.literal_eval(item["positionScreen"]), float(item["time"]))
-                for item in data
-            ]
+    session_info = {
+        "filename": os.path.basename(log),
+        "device": device_tag(os.path.basename(log)),
+        "num_actions": len(columns),
+        "is_complete": flags["is_complete"],
+        "is_new": flags["is_new"],
+        "duration": float(columns.time[-1] - columns.time[0]) if len(columns) > 0 else 0,
+        "start_pos": flags["start_pos"],
+        "end_pos": flags["end_pos"],
+        "is_truncated": flags["is_truncated"],
+        "is_out_of_order": flags["is_out_of_order"]
+    }
+    return columns, session_info
 
-            log_session = np.array(processed_logs, dtype=object)
-            logs.append(log_session)
-
-            session_info = {
-                "filename": os.path.basename(log),
-                "num_actions": len(log_session),
-                "is_complete": is_session_complete(log_session),
-                "is_new": is_session_new(log_session),
-                "duration": log_session[-1][-1] - log_session[0][-1] if len(log_session) > 0 else 0
-            }
-
-            all_sessions.append(session_info)
-    return logs, pd.DataFrame(all_sessions)
+def read_json_files(files, workers: int = 1):
+    """
+    Read log files into typed columns and a per-file metrics DataFrame.
 
-def find_indices(array, regex_pattern):
+    With ``workers > 1`` files are parsed in a process pool. Results are merged
+    in the order of ``files``, so the output is identical to the serial run.
     """
-    Find indices of rows in a NumPy array where the first column matches a given regex pattern.
+    logs = []
+    all_sessions = []
 
-    Parameters:
-    - array (numpy.ndarray): 2D NumPy array where the first column contains strings.
-    - regex_pattern (str): Regular expression pattern to match.
+    if workers > 1:
+        chunksize = max(1, len(files) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(process_log_file, files, chunksize=chunksize)
+            for columns, session_info in results:
+                logs.append(columns)
+                all_sessions.append(session_info)
+    else:
+        for log in files:
+            columns, session_info = process_log_file(log)
+            logs.append(columns)
+            all_sessions.append(session_info)
 
-    Returns:
-    - numpy.ndarray: Indices of matching rows.
-    """
-    pattern = re.compile(fr"{regex_pattern}")
-    matching_indices = np.where(np.vectorize(lambda x: bool(pattern.match(str(x))))(array))[0]
-    return matching_indices
+    return logs, pd.DataFrame(all_sessions)
 
 def is_session_complete(array)-> bool:
-    try:
-        start_label = "Button_close_Instructions"
-        end_label   = "Finish_virtualNavigation"
-        _ = find_indices(array, start_label)[0]
-        _ = find_indices(array, end_label)[0]
-        return True
-
-    except:
-        # No Start and End signal in array
-        return False
+    """Log contains both the start (``Button_close_Instructions``) and end (``Finish_virtualNavigation``) signal."""
+    return classify_actions(_action_column(array))["is_complete"]
 
 def is_session_new(array)-> bool:
-    try:
-        end_signal = "UI_ClosePanoPage"
-        _ = find_indices(array, end_signal)[0]
-        return True
+    """Log comes from the Panel6 version emitting ``UI_ClosePanoPage``."""
+    return classify_actions(_action_column(array))["is_new"]
 
-    except:
-        # No Start and End signal in array
-        return False
+def _action_column(array):
+    array = np.asarray(array, dtype=object)
+    return array[:, 0] if array.ndim == 2 else array
 
 # Define paths
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))  # Get current script directory
@@ -81,37 +82,404 @@ OUTPUT_DIR = os.path.join(SCRIPT_DIR, "../data")  # Store outputs within project
 LOG_DIR = "../data/logs"
 LOG_TYPE = "Interactions"
 VERSION = "new"
+METRICS_FORMAT = 3  # Bump when logs_metrics columns change, forces a full rebuild
 
-if __name__ == "__main__":
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    os.makedirs(f"{OUTPUT_DIR}/plots", exist_ok=True)
+def session_id(filename, start_index) -> str:
+    """Stable session ID from the source log file and the row offset of the session start."""
+    return f"{os.path.splitext(filename)[0]}:{start_index}"
+
+def segment_log(log, vocabulary, normalized: bool = False):
+    """
+    Segment one ``(filename, action codes, times)`` log from the store into sessions.
+
+    Returns its wide (sessions, actions) DataFrames, or ``SessionTables`` when ``normalized``.
+    """
+    filename, codes, times = log
+    session_fsm = ArraySessionFSM(vocabulary=vocabulary)
+    session_fsm.process_codes(codes, times)
+    session_ids = [session_id(filename, session["start_index"]) for session in session_fsm.sessions]
+
+    if normalized:
+        return build_session_tables(session_fsm.sessions, session_ids, vocabulary)
+    return session_fsm.generate_session_dataframe(session_ids=session_ids)
+
+def segment_good_logs(store, partitions=None, workers: int = 1, normalized: bool = False):
+    """
+    Segment every good log of a LogStore independently and merge the results in file order.
+
+    Sessions never span files, so files are fanned out to a process pool when
+    ``workers > 1`` and session IDs do not depend on which other files are processed.
+    The FSM runs over action codes, with categories and IDs from one shared ActionVocabulary.
+    FSM stages recorded in the workers are merged into the run report.
+    """
+    vocabulary = ActionVocabulary(store.vocab)
+    vocabulary.attributes()  # Lookup arrays built once here and shipped to the workers with the vocabulary
+    with stage("good_logs") as stats:
+        good_logs = list(store.iter_codes(good_only=True, partitions=partitions))
+        stats.add_rows(sum(len(codes) for _, codes, _ in good_logs))
+    segment = functools.partial(segment_log, vocabulary=vocabulary, normalized=normalized)
+
+    if workers > 1 and len(good_logs) > 1:
+        chunksize = max(1, len(good_logs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = []
+            for result, stages in executor.map(functools.partial(run_recorded, segment), good_logs, chunksize=chunksize):
+                results.append(result)
+                RECORDER.merge(stages)
+    else:
+        results = [segment(log) for log in good_logs]
+
+    if normalized:
+        return SessionTables.concat(results)
+
+    # Empty FSM run gives correctly typed empty frames
+    empty_session_df, empty_action_df = ArraySessionFSM().generate_session_dataframe()
+    session_frames = [session_df for session_df, _ in results if not session_df.empty]
+    action_frames = [action_df for _, action_df in results if not action_df.empty]
+
+    session_df = pd.concat(session_frames, ignore_index=True) if session_frames else empty_session_df
+    action_df = pd.concat(action_frames, ignore_index=True) if action_frames else empty_action_df
+    return session_df, action_df
+
+def write_session_outputs(result, paths: dict, append: bool = False, table_rows: dict = None) -> dict:
+    """
+    Write segmentation results, appending to earlier outputs if ``append``.
+
+    Returns the running row counts of the tables, used to offset the integer
+    keys of the normalized tables on the next incremental run and to find the
+    action rows the rollups have not folded in yet.
+    """
+    table_rows = {"sessions": 0, "events": 0, "actions": 0, **(table_rows if append and table_rows else {})}
+
+    if isinstance(result, SessionTables):
+        result = result.offset(table_rows["sessions"], table_rows["events"])
+        result.to_csv(paths["sessions"], paths["events"], paths["actions"], append=append)
+        return {
+            "sessions": table_rows["sessions"] + len(result.sessions),
+            "events": table_rows["events"] + len(result.events),
+            "actions": table_rows["actions"] + len(result.actions),
+        }
 
-    log_files = get_json_files(LOG_DIR, LOG_TYPE)
-    logs, df_metrics = read_json_files(log_files)
+    session_df, action_df = result
+    mode, header = ("a", False) if append else ("w", True)
+    session_df.to_csv(paths["session_data"], mode=mode, header=header, index=False)
+    action_df.to_csv(paths["action_data"], mode=mode, header=header, index=False)
+    return {**table_rows, "actions": table_rows["actions"] + len(action_df)}
 
-    df_metrics.to_csv(f"{OUTPUT_DIR}/logs_metrics_{VERSION}.csv", index=False)
+def update_rollups(result, path, replace: bool = False) -> RollupCubes:
+    """Fold the newly segmented sessions into the stored rollup cubes."""
+    action_df = result.wide_actions() if isinstance(result, SessionTables) else result[1]
+    return RollupCubes.update(path, action_df, replace=replace)
 
-    # Save logs as pickle
-    with open(f"{OUTPUT_DIR}/logs_{VERSION}.pkl", "wb") as file:
-        pickle.dump(logs, file)
+def good_log_mask(df_metrics) -> np.ndarray:
+    """Files that are complete and come from the new app version, from the cached flags (no rescanning)."""
+    if df_metrics.empty:
+        return np.zeros(0, dtype=bool)
+    return (df_metrics["is_complete"] & df_metrics["is_new"]).to_numpy(dtype=bool)
 
-    # Good Logs
-    good_logs = [log for log in logs if is_session_complete(log)]
-    good_logs = [log for log in good_logs if is_session_new(log)]
+def load_ingested_logs(metrics_path, store_path):
+    """Load previous outputs as ``{filename: (log, session_info)}``."""
+    df_metrics = pd.read_csv(metrics_path, float_precision="round_trip", dtype={"device": str})
+    store = LogStore(store_path)
 
-    # Save good logs as pickle file
-    with open(f"{OUTPUT_DIR}/good_logs_{VERSION}.pkl", "wb") as file:
-        pickle.dump(good_logs, file)
+    # Appended metrics rows follow the ingestion order, store files the device order
+    metrics = {session_info["filename"]: session_info for session_info in df_metrics.to_dict("records")}
+    return {filename: (log, metrics[filename]) for filename, log in store.iter_logs()}
+
+def output_paths(tables: str = "wide") -> dict:
+    """Paths of every preprocessing output for a table layout (``wide`` or ``normalized``)."""
+    names = ("sessions", "events", "actions") if tables == "normalized" else ("session_data", "action_data")
+    return {
+        "metrics": f"{OUTPUT_DIR}/logs_metrics_{VERSION}.csv",
+        "store": f"{OUTPUT_DIR}/logs_{VERSION}",
+        "manifest": f"{OUTPUT_DIR}/ingest_manifest_{VERSION}.json",
+        "segment_state": f"{OUTPUT_DIR}/segment_state_{VERSION}.json",
+        "rollups": f"{OUTPUT_DIR}/rollups_{VERSION}",
+        "rollup_state": f"{OUTPUT_DIR}/rollup_state_{VERSION}.json",
+        "log_sketches": f"{OUTPUT_DIR}/sketches_{VERSION}/logs.json",
+        "table_sketches": f"{OUTPUT_DIR}/sketches_{VERSION}/tables.json",
+        "tables": {name: f"{OUTPUT_DIR}/{name}_{VERSION}.csv" for name in names},
+    }
+
+def update_log_sketches(paths: dict, df_metrics: pd.DataFrame, previous_files: int = None):
+    """
+    Fold per-file metrics into the daily log sketches.
+
+    With ``previous_files`` the rows are files just appended to the metrics
+    CSV and are merged into the stored sketches, provided these cover exactly
+    the ``previous_files`` earlier rows. Otherwise the sketches are rebuilt,
+    from ``df_metrics`` or, if it only holds the appended rows, from the whole CSV.
+    """
+    append = previous_files is not None
+    sketches = DailySketches.load(paths["log_sketches"]) if append else DailySketches()
+    if append and sketches.state.get("files") != previous_files:
+        df_metrics = pd.read_csv(paths["metrics"], float_precision="round_trip", dtype={"device": str})
+        sketches = DailySketches()
+    elif append and df_metrics.empty:
+        return
+
+    sketches.update(log_sketches(df_metrics))
+    sketches.state["files"] = sketches.state.get("files", 0) + len(df_metrics)
+    sketches.save(paths["log_sketches"])
+
+def load_ingest_manifest(paths: dict, full: bool = False):
+    """The manifest of the previous ingestion, None if it must be redone from scratch."""
+    # Previous run is reused only if it was produced by the same FSM/output version
+    manifest = None if full else load_manifest(paths["manifest"], SessionFSM.VERSION, VERSION, METRICS_FORMAT)
+    if manifest and not all(os.path.exists(path) for path in (paths["metrics"], paths["store"])):
+        manifest = None
+    return manifest
+
+def store_parsed_logs(paths: dict, manifest, fingerprints: dict, parsed_logs: list, parsed_metrics: pd.DataFrame, removed_files=()) -> bool:
+    """
+    Add parsed log files to the LogStore, the metrics CSV and the log sketches, then record ``fingerprints`` as the manifest.
+
+    New files sorting after the files already stored for their device are
+    appended as new store partitions (one per device), anything else
+    (changed/removed/out-of-order files) rewrites the store from the cached
+    logs. The daily log sketches are updated the same way.
+
+    Returns:
+    - bool: Whether the files were appended.
+    """
+    known = manifest["files"] if manifest else {}
+    parsed_files = list(parsed_metrics["filename"]) if len(parsed_metrics) else []
+
+    # Devices are sharded, a new kiosk or a kiosk behind the others still appends
+    last_files = {}
+    for filename in known:
+        device = device_tag(filename)
+        last_files[device] = max(last_files.get(device, ""), filename)
+    appendable = (
+        manifest is not None
+        and not removed_files
+        and all(filename not in known and filename > last_files.get(device_tag(filename), "") for filename in parsed_files)
+    )
+
+    if appendable:
+        if parsed_files:
+            with stage("good_logs", rows=len(parsed_files)):
+                good = good_log_mask(parsed_metrics)
+            with stage("store", rows=sum(len(log) for log in parsed_logs)):
+                append_store(paths["store"], parsed_logs, parsed_files, good)
+                parsed_metrics.to_csv(paths["metrics"], mode="a", header=False, index=False)
+    else:
+        with stage("load_ingested"):
+            ingested = load_ingested_logs(paths["metrics"], paths["store"]) if manifest else {}
+            for log, session_info in zip(parsed_logs, parsed_metrics.to_dict("records")):
+                ingested[session_info["filename"]] = (log, session_info)
+            for filename in removed_files:
+                ingested.pop(filename, None)
+
+            filenames = sorted(ingested, key=lambda filename: (device_tag(filename), filename))
+            logs = [ingested[filename][0] for filename in filenames]
+            df_metrics = pd.DataFrame([ingested[filename][1] for filename in filenames])
+
+        with stage("good_logs", rows=len(filenames)):
+            good = good_log_mask(df_metrics)
+
+        with stage("store", rows=sum(len(log) for log in logs)):
+            df_metrics.to_csv(paths["metrics"], index=False)
+            write_store(paths["store"], logs, filenames, good)
+
+    with stage("log_sketches"):
+        if appendable:
+            update_log_sketches(paths, parsed_metrics, previous_files=len(known))
+        else:
+            update_log_sketches(paths, df_metrics)
+
+    save_manifest(paths["manifest"], fingerprints, SessionFSM.VERSION, VERSION, METRICS_FORMAT)
+    return appendable
+
+def ingest_logs(paths: dict, workers: int = 1, full: bool = False, log_dir=LOG_DIR) -> dict:
+    """
+    Parse and classify new or changed log files into the LogStore and the metrics CSV.
+
+    Classification (complete/new flags) is computed while parsing, see
+    ``store_parsed_logs`` for how the outputs are updated.
+
+    Returns:
+    - dict: Counts of log files and parsed files, and whether the run appended.
+    """
+    manifest = load_ingest_manifest(paths, full)
+
+    with stage("scan") as stats:
+        log_files = get_json_files(log_dir, LOG_TYPE)
+        fingerprints, new_files, changed_files, removed_files = diff_manifest(manifest, log_files)
+        stats.add_rows(len(log_files))
+
+    # Parse only new or changed files
+    parse_files = sorted(new_files + changed_files)
+    with stage("parse") as stats:
+        parsed_logs, parsed_metrics = read_json_files(parse_files, workers=workers)
+        stats.add_rows(sum(len(log) for log in parsed_logs))
+
+    appendable = store_parsed_logs(paths, manifest, fingerprints, parsed_logs, parsed_metrics, removed_files)
+    return {"log_files": len(log_files), "parsed_files": len(parse_files), "appended": appendable}
+
+def segment_store(paths: dict, tables: str = "wide", workers: int = 1, full: bool = False):
+    """
+    Segment the store partitions not segmented yet and append them to the session tables.
+
+    The segment state records the files of every segmented partition. When the
+    store was rewritten (a recorded partition changed), the table layout changed
+    or a table is missing, every partition is segmented again and the tables are
+    rewritten under a new ``generation``.
+
+    Returns the segmentation result (None if nothing was new) and whether it was appended.
+    """
+    normalized = tables == "normalized"
+    state = load_state(paths["segment_state"])
+    if (
+        full
+        or state.get("fsm_version") != SessionFSM.VERSION
+        or state.get("tables") != tables
+        or not all(os.path.exists(path) for path in paths["tables"].values())
+    ):
+        state = {"generation": state.get("generation", 0) + 1, "partitions": {}}
+        append = False
+    else:
+        append = True
+
+    store = LogStore(paths["store"])
+    files = {partition: store.partition_files(partition) for partition in store.partitions}
+    if append and any(files.get(partition) != recorded for partition, recorded in state["partitions"].items()):
+        state = {"generation": state["generation"] + 1, "partitions": {}}
+        append = False
+
+    partitions = [partition for partition in store.partitions if partition not in state["partitions"]]
+    if append and not partitions:
+        if not os.path.exists(paths["table_sketches"]):
+            with stage("table_sketches"):
+                rows = state["table_rows"]
+                update_table_sketches(paths, tables, None, state["generation"], rows, previous_rows=rows["actions"])
+        return None, append
+
+    with stage("segment") as stats:
+        result = segment_good_logs(store, partitions, workers=workers, normalized=normalized)
+        stats.add_rows(len(result.sessions) if normalized else len(result[0]))
+    with stage("write_tables"):
+        table_rows = write_session_outputs(result, paths["tables"], append=append, table_rows=state.get("table_rows"))
+    with stage("table_sketches"):
+        previous_rows = state.get("table_rows", {}).get("actions", 0) if append else None
+        update_table_sketches(paths, tables, result, state["generation"], table_rows, previous_rows)
+
+    save_state(paths["segment_state"], {
+        "fsm_version": SessionFSM.VERSION,
+        "tables": tables,
+        "generation": state["generation"],
+        "partitions": {**state["partitions"], **{partition: files[partition] for partition in partitions}},
+        "table_rows": table_rows,
+    })
+    return result, append
+
+def read_session_tables(paths: dict, tables: str):
+    """Every row of the written session tables, as wide session and action tables."""
+    read = functools.partial(pd.read_csv, float_precision="round_trip")
+    table_paths = paths["tables"]
+    if tables == "normalized":
+        session_tables = SessionTables(read(table_paths["sessions"]), read(table_paths["events"]), read(table_paths["actions"]))
+        return session_tables.wide_sessions(), session_tables.wide_actions()
+    return read(table_paths["session_data"]), read(table_paths["action_data"])
+
+def update_table_sketches(paths: dict, tables: str, result, generation: int, table_rows: dict, previous_rows: int = None):
+    """
+    Fold newly segmented sessions into the daily table sketches.
+
+    With ``previous_rows`` the result was appended to the tables and is merged
+    into the stored sketches, provided these were built from the same table
+    ``generation`` up to ``previous_rows`` actions. Otherwise the sketches are
+    rebuilt, from ``result`` or, if it only holds the appended rows, from the whole tables.
+    """
+    append = previous_rows is not None
+    sketches = DailySketches.load(paths["table_sketches"]) if append else DailySketches()
+    if append and sketches.state != {"generation": generation, "actions": previous_rows}:
+        session_df, action_df = read_session_tables(paths, tables)
+        sketches = DailySketches()
+    elif isinstance(result, SessionTables):
+        session_df, action_df = result.wide_sessions(), result.wide_actions()
+    else:
+        session_df, action_df = result
+
+    sketches.update(table_sketches(session_df, action_df))
+    sketches.state = {"generation": generation, "actions": table_rows["actions"]}
+    sketches.save(paths["table_sketches"])
+
+def read_action_rows(paths: dict, tables: str, start: int, stop: int) -> pd.DataFrame:
+    """Wide action rows ``start:stop`` of the written session tables."""
+    read = functools.partial(pd.read_csv, float_precision="round_trip")
+    skip = range(1, start + 1)
+    if tables == "normalized":
+        table_paths = paths["tables"]
+        actions = read(table_paths["actions"], skiprows=skip, nrows=stop - start)
+        return SessionTables(read(table_paths["sessions"]), read(table_paths["events"]), actions).wide_actions()
+    return read(paths["tables"]["action_data"], skiprows=skip, nrows=stop - start)
+
+def _action_count(result) -> int:
+    return len(result.actions) if isinstance(result, SessionTables) else len(result[1])
+
+def rollup_tables(paths: dict, tables: str = "wide", result=None):
+    """
+    Fold the action rows not rolled up yet into the rollup cubes.
+
+    ``result`` is the in-memory output of ``segment_store``, used instead of
+    reading the new rows back from the tables. The cubes are rebuilt
+    from every row when the tables were rewritten (new segment ``generation``).
+    """
+    segment_state = load_state(paths["segment_state"])
+    rollup_state = load_state(paths["rollup_state"])
+    generation = segment_state.get("generation")
+    total_rows = segment_state.get("table_rows", {}).get("actions", 0)
+
+    replace = rollup_state.get("generation") != generation or not os.path.exists(paths["rollups"])
+    start = 0 if replace else rollup_state.get("action_rows", 0)
+    if start == total_rows and not replace:
+        return None
+
+    with stage("rollups", rows=total_rows - start):
+        # The in-memory result is exactly the missing rows unless an earlier rollup run was skipped
+        if result is not None and total_rows - start == _action_count(result):
+            update_rollups(result, paths["rollups"], replace=replace)
+        else:
+            RollupCubes.update(paths["rollups"], read_action_rows(paths, tables, start, total_rows), replace=replace)
+
+    save_state(paths["rollup_state"], {"generation": generation, "action_rows": total_rows})
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Preprocess Panel6 interaction logs.")
+    parser.add_argument("--stage", choices=["all", "ingest", "segment", "rollups"], default="all",
+                        help="Run one step of the preprocessing (see panel6_stats.pipeline) instead of all of them")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used to parse log files")
+    parser.add_argument("--full", action="store_true", help="Ignore the ingestion manifest and reprocess every log file")
+    parser.add_argument("--tables", choices=["wide", "normalized"], default="wide",
+                        help="Write wide session/action data or normalized session/event/action tables")
+    parser.add_argument("--profile", metavar="STAGE",
+                        help="Run a stage (e.g. segment, SessionFSM.generate_session_dataframe) under cProfile and dump its statistics next to the run report")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    RECORDER.profile_stage = args.profile
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(f"{OUTPUT_DIR}/plots", exist_ok=True)
+    paths = output_paths(args.tables)
+    report_path = f"{OUTPUT_DIR}/run_report_{VERSION}.json" if args.stage == "all" else f"{OUTPUT_DIR}/run_report_{args.stage}_{VERSION}.json"
 
-    # Events Detection
-    good_sessions = np.concatenate(good_logs)[:,[0,3]]
-    df = pd.DataFrame(good_sessions, columns=["Action", "Timestamp"])
-    df["Timestamp"] = df["Timestamp"].astype(float)
+    run = {"stage": args.stage, "workers": args.workers, "tables": args.tables}
+    if args.stage in ("all", "ingest"):
+        run.update(ingest_logs(paths, workers=args.workers, full=args.full))
+        print(f"Processed {run['parsed_files']} new or changed of {run['log_files']} log files. Metrics saved to {paths['metrics']}")
 
-    session_fsm = SessionFSM(df)
-    session_df, action_df = session_fsm.generate_session_dataframe()
+    if args.stage in ("all", "segment"):
+        result, appended = segment_store(paths, args.tables, workers=args.workers, full=args.full)
+        print("No new partitions to segment" if result is None else f"Session tables {'appended' if appended else 'written'}: {', '.join(paths['tables'].values())}")
+        if args.stage == "all" and result is not None:
+            rollup_tables(paths, args.tables, result)
 
-    session_df.to_csv(f"{OUTPUT_DIR}/session_data_{VERSION}.csv", index=False)
-    action_df.to_csv(f"{OUTPUT_DIR}/action_data_{VERSION}.csv", index=False)
+    if args.stage == "rollups" or (args.stage == "all" and result is None):
+        rollup_tables(paths, args.tables)
 
-    print(f"Processed {len(log_files)} log files. Metrics saved to {OUTPUT_DIR}/logs_metrics.csv")
+    RECORDER.write_report(report_path, **run)
+    print(RECORDER.summary())
+    print(f"Run report saved to {report_path}")
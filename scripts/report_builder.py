@@ -0,0 +1,391 @@
+import os
+import json
+import html
+import shutil
+from string import Template
+import numpy as np
+import pandas as pd
+
+PAGE_SIZE = 500
+# Key columns paged presorted, a header click on any other column sorts the loaded page only
+SORTED_COLUMNS = ("duration", "ACTION_DURATION", "ACTION_TIMESTAMP")
+THUMBNAIL_WIDTH = 900
+
+PAGE_TEMPLATE = Template("""<html>
+<head>
+    <meta charset="utf-8">
+    <title>$title</title>
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            margin: 0;
+            padding: 0;
+            line-height: 1.25;
+            background-color: #f4f4f4;
+        }
+        .container {
+            width: 95%; /* Allow some margin on smaller screens */
+            max-width: 1920px; /* Keep it large for big screens */
+            margin: auto;
+            padding: 20px;
+            background: white;
+            box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);
+        }
+        h1, h2, h3 {
+            color: #333;
+        }
+        .tabs {
+            display: flex;
+            justify-content: space-around;
+            background: #0073e6;
+            border-radius: 5px 5px 0 0;
+            overflow: hidden;
+        }
+        .tab-button {
+            flex: 1;
+            padding: 5px;
+            text-align: center;
+            cursor: pointer;
+            background: #0073e6;
+            color: white;
+            font-size: 18px;
+            font-weight: bold;
+            border: none;
+            outline: none;
+            transition: background 0.3s;
+        }
+        .tab-button:hover, .tab-button.active {
+            background: #005bb5;
+        }
+        .tab-content {
+            display: none;
+            padding: 20px;
+            background: white;
+            border: 1px solid #ddd;
+            border-top: none;
+            border-radius: 0 0 5px 5px;
+        }
+        .tab-content.active {
+            display: block;
+        }
+        .explanation {
+            background: #f9f9f9;
+            padding: 15px;
+            border-left: 5px solid #0073e6;
+            margin-bottom: 10px;
+        }
+        img {
+            width: 100%;
+            max-width: 900px;
+            display: block;
+            margin: 20px auto;
+            border-radius: 5px;
+        }
+        table.paged {
+            border-collapse: collapse;
+            width: 100%;
+            font-size: 13px;
+        }
+        table.paged th, table.paged td {
+            border: 1px solid #ddd;
+            padding: 3px 6px;
+            text-align: left;
+        }
+        table.paged th {
+            background: #f0f0f0;
+            cursor: pointer;
+        }
+        .pager {
+            margin: 10px 0;
+        }
+    </style>
+    <script>
+        // Table pages are small scripts calling reportPage, so they load from file:// too
+        var reportTables = {};
+
+        function reportPage(name, order, page, rows) {
+            var table = reportTables[name];
+            table.pages[order] = table.pages[order] || {};
+            table.pages[order][page] = rows;
+            if (table.order === order && table.page === page) {
+                renderTable(name);
+            }
+        }
+
+        function showPage(name, page) {
+            var table = reportTables[name];
+            table.page = Math.max(0, Math.min(page, table.n_pages - 1));
+            if ((table.pages[table.order] || {})[table.page]) {
+                renderTable(name);
+                return;
+            }
+            var script = document.createElement("script");
+            script.src = table.path + (table.order ? "/" + table.order : "") + "/page-" + String(table.page).padStart(5, "0") + ".js";
+            document.head.appendChild(script);
+        }
+
+        // Presorted columns switch to the first page of their order, other columns sort the loaded page
+        function sortTable(name, column) {
+            var table = reportTables[name];
+            table.ascending = table.sortColumn === column ? !table.ascending : true;
+            table.sortColumn = column;
+            if (table.sorted.indexOf(column) >= 0) {
+                table.order = "by-" + column + (table.ascending ? "-asc" : "-desc");
+                showPage(name, 0);
+            } else {
+                table.order = "";
+                showPage(name, table.page);
+            }
+        }
+
+        function renderTable(name) {
+            var table = reportTables[name];
+            var rows = ((table.pages[table.order] || {})[table.page] || []).slice();
+            if (table.sortColumn !== null && table.order === "") {
+                var column = table.sortColumn, sign = table.ascending ? 1 : -1;
+                rows.sort(function (a, b) {
+                    if (a[column] === b[column]) return 0;
+                    if (a[column] === null) return 1;
+                    if (b[column] === null) return -1;
+                    return a[column] < b[column] ? -sign : sign;
+                });
+            }
+            var header = table.columns.map(function (column, index) {
+                var arrow = table.sortColumn === index ? (table.ascending ? " &#9650;" : " &#9660;") : "";
+                return "<th onclick=\\"sortTable('" + name + "', " + index + ")\\">" + column + arrow + "</th>";
+            }).join("");
+            var body = rows.map(function (row) {
+                return "<tr>" + row.map(function (value) {
+                    return "<td>" + (value === null ? "" : String(value).replace(/&/g, "&amp;").replace(/</g, "&lt;")) + "</td>";
+                }).join("") + "</tr>";
+            }).join("");
+            document.getElementById(name + "-table").innerHTML = "<tr>" + header + "</tr>" + body;
+            document.getElementById(name + "-pager").innerText =
+                "Page " + (table.page + 1) + " of " + table.n_pages + " (" + table.n_rows + " rows)";
+        }
+
+        function openTab(evt, tabName) {
+            var i, tabcontent = document.getElementsByClassName("tab-content");
+            for (i = 0; i < tabcontent.length; i++) {
+                tabcontent[i].style.display = "none";
+            }
+            var tabbuttons = document.getElementsByClassName("tab-button");
+            for (i = 0; i < tabbuttons.length; i++) {
+                tabbuttons[i].className = tabbuttons[i].className.replace(" active", "");
+            }
+            document.getElementById(tabName).style.display = "block";
+            evt.currentTarget.className += " active";
+
+            // Tables load their first page when their tab is opened
+            var tables = document.getElementById(tabName).getElementsByClassName("paged");
+            for (i = 0; i < tables.length; i++) {
+                var name = tables[i].dataset.table;
+                if (reportTables[name].page === null) {
+                    showPage(name, 0);
+                }
+            }
+        }
+
+        document.addEventListener("DOMContentLoaded", function () {
+            document.getElementsByClassName("tab-button")[0].click();
+        });
+$tables
+    </script>
+</head>
+<body>
+    <div class="container">
+        <h1>$title</h1>
+
+        <div class="tabs">
+$buttons
+        </div>
+$sections
+    </div>
+</body>
+</html>
+""")
+
+def _json_value(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, np.floating):
+        return round(float(value), 6)
+    if isinstance(value, float):
+        return round(value, 6)
+    return value if isinstance(value, (int, bool, str)) else str(value)
+
+def _sort_order(column: pd.Series, ascending: bool) -> np.ndarray:
+    """Stable row order of a column, missing values last; mixed types are compared as text."""
+    try:
+        ordered = column.sort_values(ascending=ascending, kind="stable", na_position="last")
+    except TypeError:
+        ordered = column.where(column.isna(), column.astype(str)).sort_values(ascending=ascending, kind="stable", na_position="last")
+    return column.index.get_indexer(ordered.index)
+
+def _write_pages(values: np.ndarray, directory, name: str, order: str, page_size: int, n_pages: int):
+    """Write the ``page-NNNNN.js`` chunks of one row order, leaving unchanged pages untouched."""
+    os.makedirs(directory, exist_ok=True)
+    for page in range(n_pages):
+        rows = [[_json_value(value) for value in row] for row in values[page * page_size:(page + 1) * page_size]]
+        content = f"reportPage({json.dumps(name)}, {json.dumps(order)}, {page}, {json.dumps(rows, separators=(',', ':'))});\n"
+        path = os.path.join(directory, f"page-{page:05d}.js")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                if file.read() == content:
+                    continue
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+
+    # Drop pages left over from a larger table
+    for entry in os.listdir(directory):
+        if entry.startswith("page-") and entry.endswith(".js") and int(entry[5:10]) >= n_pages:
+            os.remove(os.path.join(directory, entry))
+
+def _sort_columns(df: pd.DataFrame, sort_columns=None) -> list:
+    """Columns to presort, by default the ``SORTED_COLUMNS`` the table has."""
+    return [column for column in df.columns if column in SORTED_COLUMNS] if sort_columns is None else list(sort_columns)
+
+def write_table_pages(df: pd.DataFrame, directory, page_size: int = PAGE_SIZE, sort_columns=None) -> dict:
+    """
+    Split a table into ``page-NNNNN.js`` chunks of ``page_size`` rows.
+
+    Each chunk holds the rows as a JSON array and is only loaded by the report
+    when its page is shown. The table is also paged sorted by each of
+    ``sort_columns`` (by default those in ``SORTED_COLUMNS``), in
+    ``by-<column>-asc/`` and ``by-<column>-desc/``, so sorting by these
+    orders the whole table; every presorted column adds two copies of the
+    table. Pages whose content did not change are not rewritten.
+
+    Returns:
+    - dict: Table metadata (escaped column names, presorted column positions, row and page counts) embedded in the report page.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.basename(os.path.normpath(directory))
+    n_pages = max(1, -(-len(df) // page_size))
+    values = df.to_numpy(dtype=object)
+    sorted_indices = [df.columns.get_loc(column) for column in _sort_columns(df, sort_columns)]
+
+    _write_pages(values, directory, name, "", page_size, n_pages)
+    orders = set()
+    for index in sorted_indices:
+        column = df.iloc[:, index].reset_index(drop=True)
+        for ascending in (True, False):
+            order = f"by-{index}-{'asc' if ascending else 'desc'}"
+            _write_pages(values[_sort_order(column, ascending)], os.path.join(directory, order), name, order, page_size, n_pages)
+            orders.add(order)
+
+    # Drop sorted copies of columns the table no longer has
+    for entry in os.listdir(directory):
+        if entry.startswith("by-") and entry not in orders:
+            shutil.rmtree(os.path.join(directory, entry))
+
+    # Column names are inserted into the header as HTML
+    return {"columns": [html.escape(str(column)) for column in df.columns], "sorted": sorted_indices, "n_rows": len(df), "n_pages": n_pages}
+
+def thumbnail(image_path, thumbnail_dir, width: int = THUMBNAIL_WIDTH) -> str:
+    """Downscaled copy of an image, regenerated only when the image is newer. Returns the thumbnail path."""
+    from PIL import Image
+
+    os.makedirs(thumbnail_dir, exist_ok=True)
+    thumbnail_path = os.path.join(thumbnail_dir, os.path.basename(image_path))
+    if os.path.exists(thumbnail_path) and os.path.getmtime(thumbnail_path) >= os.path.getmtime(image_path):
+        return thumbnail_path
+
+    with Image.open(image_path) as image:
+        image.thumbnail((width, width * image.height // max(image.width, 1)))
+        image.save(thumbnail_path, optimize=True)
+    return thumbnail_path
+
+class Report:
+    """
+    Tabbed HTML report with lazily loaded tables.
+
+    Summaries and text are written inline. Tables go to paged chunks in
+    ``<report name>_files/`` next to the page, so the page itself stays small
+    whatever the number of rows; each table shows one page at a time. A header
+    click on a presorted key column switches to the pages in that order,
+    other columns sort the loaded page. Images are shown as thumbnails linking
+    to the full-resolution file.
+    """
+
+    def __init__(self, path, title: str):
+        self.path = str(path)
+        self.title = title
+        self.files_dir = f"{os.path.splitext(self.path)[0]}_files"
+        self.tabs = []  # (tab id, label, html parts)
+        self.tables = {}
+
+    def _relative(self, path) -> str:
+        return os.path.relpath(path, os.path.dirname(os.path.abspath(self.path))).replace(os.sep, "/")
+
+    def tab(self, tab_id: str, label: str) -> "Report":
+        self.tabs.append((tab_id, label, []))
+        return self
+
+    def _add(self, content: str) -> "Report":
+        if not self.tabs:
+            self.tab("main", self.title)
+        self.tabs[-1][2].append(content)
+        return self
+
+    def heading(self, text: str) -> "Report":
+        return self._add(f"<h2>{html.escape(text)}</h2>")
+
+    def html(self, content: str) -> "Report":
+        """Raw HTML, e.g. explanations."""
+        return self._add(content)
+
+    def summary(self, items: dict) -> "Report":
+        """Precomputed aggregates as a bullet list of ``label: value``."""
+        rows = "\n".join(f"<li><b>{html.escape(str(label))}:</b> {html.escape(str(value))}</li>" for label, value in items.items())
+        return self._add(f"<ul>\n{rows}\n</ul>")
+
+    def image(self, image_path, width: int = THUMBNAIL_WIDTH) -> "Report":
+        """Thumbnail linking to the full image, skipped with a note if the image does not exist."""
+        if not os.path.exists(image_path):
+            return self._add(f"<p><i>{html.escape(os.path.basename(str(image_path)))} not generated yet.</i></p>")
+        thumbnail_path = thumbnail(image_path, os.path.join(self.files_dir, "thumbnails"), width)
+        return self._add(
+            f'<a href="{html.escape(self._relative(image_path))}">'
+            f'<img src="{html.escape(self._relative(thumbnail_path))}" loading="lazy"></a>'
+        )
+
+    def table(self, name: str, df: pd.DataFrame, page_size: int = PAGE_SIZE, sort_columns=None) -> "Report":
+        """A table paged into chunks, loaded when its tab is opened; ``sort_columns`` are presorted (see ``write_table_pages``)."""
+        directory = os.path.join(self.files_dir, name)
+        meta = write_table_pages(df, directory, page_size, sort_columns)
+        self.tables[name] = {**meta, "path": self._relative(directory), "pages": {}, "page": None, "order": "", "sortColumn": None, "ascending": True}
+        pager = (
+            f'<div class="pager"><button onclick="showPage(\'{name}\', reportTables[\'{name}\'].page - 1)">&lt;</button> '
+            f'<span id="{name}-pager"></span> '
+            f'<button onclick="showPage(\'{name}\', reportTables[\'{name}\'].page + 1)">&gt;</button></div>'
+        )
+        return self._add(f'{pager}\n<table class="paged" id="{name}-table" data-table="{name}"></table>')
+
+    def write(self) -> str:
+        buttons = "\n".join(
+            f'            <button class="tab-button" onclick="openTab(event, \'{tab_id}\')">{html.escape(label)}</button>'
+            for tab_id, label, _ in self.tabs
+        )
+        sections = "\n".join(
+            f'\n        <div id="{tab_id}" class="tab-content">\n' + "\n".join(parts) + "\n        </div>"
+            for tab_id, _, parts in self.tabs
+        )
+        tables = "\n".join(f"        reportTables[{json.dumps(name)}] = {json.dumps(meta)};" for name, meta in self.tables.items())
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(PAGE_TEMPLATE.substitute(title=html.escape(self.title), buttons=buttons, sections=sections, tables=tables))
+        return self.path
+
+def write_table_report(path, title: str, df: pd.DataFrame, page_size: int = PAGE_SIZE, sort_columns=None) -> str:
+    """Standalone page holding a single paged table, replacing a ``DataFrame.to_html`` dump."""
+    name = os.path.splitext(os.path.basename(str(path)))[0]
+    sort_columns = _sort_columns(df, sort_columns)
+    whole = f"{', '.join(map(str, sort_columns))} sort the whole table, other columns" if sort_columns else "Columns"
+    report = Report(path, title).tab(name, title).html(
+        f"<p>{len(df)} rows, {page_size} per page. Click a column header to sort: {html.escape(whole)} sort the page shown.</p>"
+    )
+    return report.table(name, df, page_size, sort_columns).write()
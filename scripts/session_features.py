@@ -0,0 +1,86 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from log_store import LogStore
+from preprocess_logs import output_paths, read_session_tables
+from panel6_stats.features import FEATURES, ENGAGEMENT_WEIGHTS, session_features, engagement_score
+
+# Define paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "../data")
+VERSION = "new"
+
+TOUCH_PREFIX = "touchDown"
+
+def session_touches(store: LogStore, sessions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Screen position of every touch of every session.
+
+    Session IDs are ``<file stem>:<start row>``; a session covers the rows of
+    its file from the start row until its end time.
+
+    Parameters:
+    - sessions (pandas.DataFrame): ``SESSION_ID`` and ``SESSION_END``, one row per session.
+
+    Returns:
+    - pandas.DataFrame: ``SESSION_ID``, ``X``, ``Y`` per touch.
+    """
+    offsets = store.offsets()
+    file_index = {os.path.splitext(filename)[0]: index for index, filename in enumerate(store.files)}
+    time = store.column("time")
+    is_touch = np.array([action.startswith(TOUCH_PREFIX) for action in store.vocab], dtype=bool)[store.column("action")]
+
+    starts, stops = [], []
+    for session_id, end_time in zip(sessions["SESSION_ID"].astype(str), sessions["SESSION_END"].to_numpy(dtype=np.float64)):
+        stem, start_row = session_id.rsplit(":", 1)
+        file = file_index[stem]
+        start = offsets[file] + int(start_row)
+        end = offsets[file + 1] if np.isnan(end_time) else start + np.searchsorted(time[start:offsets[file + 1]], end_time, side="right")
+        starts.append(start)
+        stops.append(end)
+
+    # Label each row with its session, then keep the touches
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(stops, dtype=np.int64) - starts
+    rows = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    session_of_row = np.repeat(np.arange(len(starts)), lengths)
+    touch = is_touch[rows]
+
+    return pd.DataFrame({
+        "SESSION_ID": sessions["SESSION_ID"].astype(str).to_numpy()[session_of_row[touch]],
+        "X": store.column("x")[rows[touch]],
+        "Y": store.column("y")[rows[touch]],
+    })
+
+def parse_weights(values) -> dict:
+    """``NAME=WEIGHT`` pairs into an engagement weight dict."""
+    weights = {}
+    for value in values:
+        name, weight = value.split("=", 1)
+        if name not in FEATURES:
+            raise ValueError(f"Unknown feature {name}, expected one of {', '.join(FEATURES)}")
+        weights[name] = float(weight)
+    return weights
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the per-session feature matrix and engagement score.")
+    parser.add_argument("--weights", nargs="+", metavar="FEATURE=WEIGHT",
+                        help="Engagement score weights, defaults to " + " ".join(f"{name}={weight:g}" for name, weight in ENGAGEMENT_WEIGHTS.items()))
+    parser.add_argument("--tables", choices=["wide", "normalized"], default="wide", help="Layout of the session tables written by preprocess_logs")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    events, actions = read_session_tables(output_paths(args.tables), args.tables)
+    actions = actions[["SESSION_ID", "ACTION", "ITEM_ID", "ACTION_DURATION"]]
+    store = LogStore(os.path.join(DATA_DIR, f"logs_{VERSION}"))
+
+    sessions = events.drop_duplicates("SESSION_ID")[["SESSION_ID", "SESSION_END"]]
+    features = session_features(events, actions, session_touches(store, sessions))
+    features["ENGAGEMENT"] = engagement_score(features, parse_weights(args.weights) if args.weights else None)
+
+    output_path = os.path.join(DATA_DIR, f"session_features_{VERSION}.csv")
+    features.to_csv(output_path)
+    print(f"{len(features)} sessions x {len(FEATURES)} features saved to {output_path}")
@@ -0,0 +1,59 @@
+import numpy as np
+
+START_LABEL = "Button_close_Instructions"
+END_LABEL = "Finish_virtualNavigation"
+NEW_VERSION_LABEL = "UI_ClosePanoPage"  # Only emitted by the new Panel6 version
+
+# Action categories relevant for classification
+OTHER, START, END, NEW_VERSION = 0, 1, 2, 3
+
+def action_category(action) -> int:
+    """Classification category of one action string (prefix match)."""
+    action = str(action)
+    if action.startswith(START_LABEL):
+        return START
+    if action.startswith(END_LABEL):
+        return END
+    if action.startswith(NEW_VERSION_LABEL):
+        return NEW_VERSION
+    return OTHER
+
+def _categories(actions) -> np.ndarray:
+    """Categorise an action column, classifying each distinct string only once."""
+    cache = {}
+    categories = np.empty(len(actions), dtype=np.int8)
+    for index, action in enumerate(actions):
+        category = cache.get(action)
+        if category is None:
+            category = cache[action] = action_category(action)
+        categories[index] = category
+    return categories
+
+def _flags(categories: np.ndarray) -> dict:
+    start_rows = np.flatnonzero(categories == START)
+    end_rows = np.flatnonzero(categories == END)
+    has_start, has_end = len(start_rows) > 0, len(end_rows) > 0
+
+    return {
+        "is_complete": bool(has_start and has_end),
+        "is_new": bool((categories == NEW_VERSION).any()),
+        "start_pos": int(start_rows[0]) if has_start else -1,
+        "end_pos": int(end_rows[-1]) if has_end else -1,
+        # Started but the last start is never followed by a finish
+        "is_truncated": bool(has_start and (not has_end or end_rows[-1] < start_rows[-1])),
+        # Finish seen before the first start
+        "is_out_of_order": bool(has_end and (not has_start or end_rows[0] < start_rows[0])),
+    }
+
+def classify_actions(actions) -> dict:
+    """
+    Compute all session flags of a log in a single pass over its action column.
+
+    Parameters:
+    - actions (sequence): Action strings of one log.
+
+    Returns:
+    - dict: ``is_complete``, ``is_new``, ``start_pos`` (first start, -1 if none),
+      ``end_pos`` (last finish, -1 if none), ``is_truncated`` and ``is_out_of_order``.
+    """
+    return _flags(_categories(actions))
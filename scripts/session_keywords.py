@@ -0,0 +1,131 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from plot_jobs import PlotJob, run_plot_jobs
+from preprocess_logs import output_paths
+from panel6_stats.keywords import session_term_matrix
+from panel6_stats.log_names import session_devices, session_days
+
+# Define paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "../data")
+ITEM_METADATA = os.path.join(SCRIPT_DIR, "../assets/Item_Popularity_Table.html")
+CLOUD_DIR = os.path.join(SCRIPT_DIR, "outputs/word_clouds")
+VERSION = "new"
+
+COHORTS = {"device": session_devices, "day": session_days}
+CLOUD_TERMS = 40  # Words drawn per cloud
+
+def plot_word_cloud(weights: pd.Series, title: str = None, output_dir=CLOUD_DIR, filename="word_cloud.png", overwrite=False,
+                    width: int = 800, height: int = 500, max_font: float = 48, min_font: float = 9):
+    """
+    Draw terms with a font size growing with their weight, largest first.
+
+    Each word is placed at the first free position along a spiral from the
+    centre; words that fit nowhere are left out.
+    """
+    os.makedirs(output_dir, exist_ok=True)  # Ensure output directory exists
+
+    if not overwrite and os.path.exists(os.path.join(output_dir, filename)):
+        print(f"Plot {filename} already exists. Skipping...")
+        return
+
+    fig = plt.figure(figsize=(width / 100, height / 100), dpi=100)
+    ax = fig.add_axes([0, 0, 1, 0.9 if title else 1])
+    ax.set_xlim(0, width)
+    ax.set_ylim(0, ax.get_position().height * height)
+    ax.set_axis_off()
+    if title:
+        fig.suptitle(title, fontsize=11)
+    renderer = fig.canvas.get_renderer()
+    area_height = ax.get_position().height * height
+
+    # Candidate centres along an Archimedean spiral, flattened to the aspect of the figure
+    turns = np.arange(0, 200, 0.1)
+    spiral_x = width / 2 + 2 * turns * np.cos(turns)
+    spiral_y = area_height / 2 + 2 * turns * np.sin(turns) * area_height / width
+
+    weights = weights.sort_values(ascending=False).head(CLOUD_TERMS)
+    sizes = min_font + (max_font - min_font) * np.sqrt(weights.to_numpy() / weights.max()) if len(weights) else []
+    colors = plt.cm.viridis(np.linspace(0, 0.85, max(len(weights), 1)))
+    boxes = np.zeros((0, 4))  # x0, y0, x1, y1 of the words placed so far
+
+    for term, size, color in zip(weights.index, sizes, colors):
+        text = ax.text(0, 0, term, fontsize=size, color=color, ha="center", va="center")
+        extent = text.get_window_extent(renderer)
+        half_w, half_h = extent.width / 2 + 2, extent.height / 2 + 1
+
+        inside = (spiral_x - half_w >= 0) & (spiral_x + half_w <= width) & (spiral_y - half_h >= 0) & (spiral_y + half_h <= area_height)
+        overlaps = (
+            (spiral_x[:, None] - half_w < boxes[:, 2]) & (spiral_x[:, None] + half_w > boxes[:, 0])
+            & (spiral_y[:, None] - half_h < boxes[:, 3]) & (spiral_y[:, None] + half_h > boxes[:, 1])
+        ).any(axis=1)
+        free = np.flatnonzero(inside & ~overlaps)
+        if not len(free):
+            text.remove()
+            continue
+        x, y = spiral_x[free[0]], spiral_y[free[0]]
+        text.set_position((x, y))
+        boxes = np.vstack([boxes, [x - half_w, y - half_h, x + half_w, y + half_h]])
+
+    # Save plot
+    save_path = os.path.join(output_dir, filename)
+    fig.savefig(save_path, dpi=150)
+
+    # Close the plot to free memory
+    plt.close(fig)
+    print(f"Plot saved to {save_path}")
+
+def cloud_filename(prefix: str, label) -> str:
+    """Figure name of a session or cohort; ':' of session IDs is not allowed in Windows filenames."""
+    return f"{prefix}_{str(label).replace(':', '_')}.png"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract keywords of every session from the titles of its exhibits and items, and draw word clouds.")
+    parser.add_argument("--metadata", default=ITEM_METADATA, help="Item metadata table (CSV, or HTML export) with Item ID and Title columns")
+    parser.add_argument("--top-k", type=int, default=10, help="Keywords kept per session and per cohort")
+    parser.add_argument("--cohorts", nargs="*", choices=list(COHORTS), default=list(COHORTS), help="Session groupings to extract keywords for")
+    parser.add_argument("--clouds", type=int, default=50,
+                        help="Number of sessions, those with the most distinct terms first, to draw word clouds for (-1 for every session)")
+    parser.add_argument("--tables", choices=["wide", "normalized"], default="wide", help="Layout of the session tables written by preprocess_logs")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used to render word clouds")
+    parser.add_argument("--overwrite", action="store_true", help="Render every word cloud even if its terms did not change")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    # Counts are cached next to the tables and rebuilt only when the tables or the metadata change
+    counts = session_term_matrix(output_paths(args.tables)["tables"], args.metadata, cache=os.path.join(DATA_DIR, f"session_terms_{VERSION}.npz"))
+    weights = counts.tfidf()
+
+    output_path = os.path.join(DATA_DIR, f"session_keywords_{VERSION}.csv")
+    weights.top_terms(args.top_k).to_csv(output_path, index=False)
+    print(f"{counts.shape[0]} sessions x {counts.shape[1]} terms, top {args.top_k} keywords saved to {output_path}")
+
+    jobs = []
+    cohort_keywords = []
+    for cohort in args.cohorts:
+        by_cohort = weights.group(COHORTS[cohort](weights.index).to_numpy())
+        cohort_keywords.append(by_cohort.top_terms(args.top_k).assign(BY=cohort))
+        jobs += [
+            PlotJob(plot_word_cloud, by_cohort.row(label), title=f"{cohort.capitalize()} {label}", output_dir=CLOUD_DIR, filename=cloud_filename(cohort, label))
+            for label in by_cohort.index
+        ]
+    if cohort_keywords:
+        output_path = os.path.join(DATA_DIR, f"cohort_keywords_{VERSION}.csv")
+        pd.concat(cohort_keywords, ignore_index=True)[["BY", "COHORT", "RANK", "TERM", "WEIGHT"]].to_csv(output_path, index=False)
+        print(f"Keywords per {', '.join(args.cohorts)} saved to {output_path}")
+
+    # Sessions with the richest vocabularies, each cloud only rendered again when its weights change
+    sizes = weights.row_sizes()
+    sizes = sizes[sizes > 0].sort_values(ascending=False, kind="stable")
+    selected = sizes.index if args.clouds < 0 else sizes.index[:args.clouds]
+    jobs += [
+        PlotJob(plot_word_cloud, weights.row(session_id), title=f"Session {session_id}", output_dir=CLOUD_DIR, filename=cloud_filename("session", session_id))
+        for session_id in selected
+    ]
+    rendered = run_plot_jobs(jobs, workers=args.workers, force=args.overwrite)
+    print(f"{len(rendered)} of {len(jobs)} word clouds rendered to {CLOUD_DIR}")
@@ -0,0 +1,51 @@
+import os
+import argparse
+import pandas as pd
+from preprocess_logs import output_paths, read_session_tables
+from panel6_stats.paths import PathMiner, mine_paths
+
+# Define paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "../data")
+VERSION = "new"
+
+def path_outputs(data_dir=DATA_DIR) -> dict:
+    """CSV written for each path statistic."""
+    return {name: os.path.join(data_dir, f"path_{name}_{VERSION}.csv") for name in ("transitions", "ngrams", "top_paths", "first_views")}
+
+def session_paths(tables: str = "wide", chunksize: int = 500_000, **kwargs) -> PathMiner:
+    """
+    Mine the navigation paths of the session tables.
+
+    The wide session table is read in chunks of ``chunksize`` rows; the
+    normalized tables are joined into it first, so they are read whole.
+    """
+    paths = output_paths(tables)
+    if tables == "wide":
+        return mine_paths(paths["tables"]["session_data"], chunksize=chunksize, **kwargs)
+    events, _ = read_session_tables(paths, tables)
+    return PathMiner(**kwargs).update(events)
+
+def write_path_outputs(miner: PathMiner, outputs: dict, top_k: int = 50):
+    """Write the transitions, the ``top_k`` n-grams of each length and paths, and first view against popularity."""
+    miner.transitions().reset_index().to_csv(outputs["transitions"], index=False)
+    pd.concat([miner.top_ngrams(top_k, n) for n in range(2, miner.max_n + 1)], ignore_index=True).to_csv(outputs["ngrams"], index=False)
+    miner.top_paths(top_k).to_csv(outputs["top_paths"], index=False)
+    miner.first_view_popularity().to_csv(outputs["first_views"])
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mine exhibit navigation paths: transitions, n-grams, common paths and first view against popularity.")
+    parser.add_argument("--tables", choices=["wide", "normalized"], default="wide", help="Layout of the session tables written by preprocess_logs")
+    parser.add_argument("--top-k", type=int, default=50, help="Paths kept, and n-grams kept per length")
+    parser.add_argument("--max-n", type=int, default=4, help="Longest n-gram counted")
+    parser.add_argument("--chunksize", type=int, default=500_000, help="Rows of the wide session table read at a time")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    miner = session_paths(args.tables, chunksize=args.chunksize, max_n=args.max_n)
+    outputs = path_outputs()
+    write_path_outputs(miner, outputs, args.top_k)
+    print(f"{miner.sessions} sessions over {len(miner.exhibits)} exhibits, paths saved to {', '.join(outputs.values())}")
+    print(f"Spearman correlation of first-view position and popularity: {miner.first_view_correlation():.3f}")
@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+from event_processor import parse_item_id
+
+SESSION_COLUMNS = ["SESSION_KEY", "SESSION_ID", "SESSION_START", "SESSION_END", "SESSION_DURATION"]
+EVENT_COLUMNS = ["EVENT_KEY", "SESSION_KEY", "TYPE", "EXHIBIT", "EXHIBIT_ID", "EVENT_START", "EVENT_END", "EVENT_DURATION", "ACTIONS_COUNT"]
+ACTION_COLUMNS = ["EVENT_KEY", "ACTION", "ITEM_ID", "ACTION_TIMESTAMP", "ACTION_DURATION"]
+
+# Column order of SessionFSM.generate_session_dataframe
+WIDE_SESSION_COLUMNS = [
+    "SESSION_ID", "SESSION_START", "SESSION_END", "SESSION_DURATION",
+    "TYPE", "EXHIBIT", "EXHIBIT_ID", "EVENT_START", "EVENT_END", "EVENT_DURATION", "ACTIONS_COUNT"
+]
+WIDE_ACTION_COLUMNS = WIDE_SESSION_COLUMNS + ["ACTION", "ITEM_ID", "ACTION_TIMESTAMP", "ACTION_DURATION"]
+
+class _Categories:
+    """Incremental string -> code dictionary used to fill categorical buffers."""
+
+    def __init__(self):
+        self.codes = {}
+
+    def code(self, value) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.codes)
+        return code
+
+    def categorical(self, codes) -> pd.Categorical:
+        return pd.Categorical.from_codes(codes, categories=pd.Index(list(self.codes), dtype=object))
+
+class SessionTables:
+    """
+    Normalized session output: one row per session, per event and per action.
+
+    ``events.SESSION_KEY`` references ``sessions.SESSION_KEY`` and
+    ``actions.EVENT_KEY`` references ``events.EVENT_KEY``. String columns are
+    categorical. ``wide_sessions``/``wide_actions`` rebuild the shape of
+    ``generate_session_dataframe`` on demand.
+    """
+
+    def __init__(self, sessions: pd.DataFrame, events: pd.DataFrame, actions: pd.DataFrame):
+        self.sessions = sessions
+        self.events = events
+        self.actions = actions
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def wide_sessions(self) -> pd.DataFrame:
+        """Events joined with their session, like ``session_data_*.csv``."""
+        wide = self.events.merge(self.sessions, on="SESSION_KEY", how="left", sort=False)
+        return wide[WIDE_SESSION_COLUMNS]
+
+    def wide_actions(self) -> pd.DataFrame:
+        """Actions joined with their event and session, like ``action_data_*.csv``."""
+        events = self.events.merge(self.sessions, on="SESSION_KEY", how="left", sort=False)
+        wide = self.actions.merge(events, on="EVENT_KEY", how="left", sort=False)
+        return wide[WIDE_ACTION_COLUMNS]
+
+    def offset(self, session_offset: int, event_offset: int) -> "SessionTables":
+        """Shift the integer keys, used when appending to tables written earlier."""
+        sessions = self.sessions.assign(SESSION_KEY=self.sessions["SESSION_KEY"] + session_offset)
+        events = self.events.assign(
+            EVENT_KEY=self.events["EVENT_KEY"] + event_offset,
+            SESSION_KEY=self.events["SESSION_KEY"] + session_offset
+        )
+        actions = self.actions.assign(EVENT_KEY=self.actions["EVENT_KEY"] + event_offset)
+        return SessionTables(sessions, events, actions)
+
+    @classmethod
+    def concat(cls, tables: list) -> "SessionTables":
+        """Concatenate tables, renumbering keys so they stay unique."""
+        shifted = []
+        session_offset = event_offset = 0
+        for table in tables:
+            shifted.append(table.offset(session_offset, event_offset))
+            session_offset += len(table.sessions)
+            event_offset += len(table.events)
+
+        if not shifted:
+            return build_session_tables([])
+
+        # union_categoricals keeps the categorical dtypes of the parts
+        frames = []
+        for name in ("sessions", "events", "actions"):
+            parts = [getattr(table, name) for table in shifted]
+            frame = pd.concat(parts, ignore_index=True)
+            for column in parts[0].columns:
+                if isinstance(parts[0][column].dtype, pd.CategoricalDtype):
+                    frame[column] = pd.api.types.union_categoricals([part[column] for part in parts])
+            frames.append(frame)
+        return cls(*frames)
+
+    def to_csv(self, session_path, event_path, action_path, append: bool = False):
+        mode, header = ("a", False) if append else ("w", True)
+        self.sessions.to_csv(session_path, mode=mode, header=header, index=False)
+        self.events.to_csv(event_path, mode=mode, header=header, index=False)
+        self.actions.to_csv(action_path, mode=mode, header=header, index=False)
+
+def _item_id(action, cache: dict):
+    item_id = cache.get(action, False)
+    if item_id is False:
+        item_id = cache[action] = parse_item_id(action)
+    return item_id
+
+def build_session_tables(sessions: list, session_ids=None, vocabulary=None) -> SessionTables:
+    """
+    Build normalized tables from SessionFSM ``sessions``.
+
+    Rows are counted first and every column is filled into a preallocated
+    NumPy buffer, without building intermediate lists of rows. ItemIDs are
+    looked up by action code in ``vocabulary`` (the ActionVocabulary of the
+    ArraySessionFSM that produced the sessions) when given, parsed otherwise.
+    """
+    if session_ids is None:
+        session_ids = range(len(sessions))
+    session_ids = list(session_ids)
+
+    n_sessions = len(sessions)
+    n_events = sum(len(session["events"]) for session in sessions)
+    n_actions = sum(len(event["actions"]) for session in sessions for event in session["events"])
+
+    session_start = np.empty(n_sessions)
+    session_end = np.empty(n_sessions)
+
+    event_session = np.empty(n_events, dtype=np.int64)
+    event_type = np.empty(n_events, dtype=np.int32)
+    event_exhibit = np.empty(n_events, dtype=np.int32)
+    event_exhibit_id = np.empty(n_events, dtype=np.int32)
+    event_start = np.empty(n_events)
+    event_end = np.empty(n_events)
+    event_count = np.empty(n_events, dtype=np.int64)
+
+    action_event = np.empty(n_actions, dtype=np.int64)
+    action_code = np.empty(n_actions, dtype=np.int32)
+    action_item = np.empty(n_actions, dtype=np.int32)
+    action_time = np.empty(n_actions)
+    action_duration = np.empty(n_actions)
+
+    types, exhibits, exhibit_ids = _Categories(), _Categories(), _Categories()
+    actions, items = _Categories(), _Categories()
+    item_table = vocabulary.item_id if vocabulary is not None else None
+    item_cache = {}
+
+    event_index = action_index = 0
+    for session_index, session in enumerate(sessions):
+        session_start[session_index] = session["start_time"]
+        session_end[session_index] = session["end_time"] if session["end_time"] is not None else np.nan
+
+        for event in session["events"]:
+            end_time = event["end_time"] if event["end_time"] is not None else np.nan
+            event_session[event_index] = session_index
+            event_type[event_index] = types.code(event["type"])
+            event_exhibit[event_index] = exhibits.code(event["exhibit"])
+            event_exhibit_id[event_index] = exhibit_ids.code(event["exhibit_id"])
+            event_start[event_index] = event["start_time"]
+            event_end[event_index] = end_time
+            event_count[event_index] = len(event["actions"])
+
+            n = len(event["actions"])
+            if n:
+                rows = slice(action_index, action_index + n)
+                action_event[rows] = event_index
+                action_time[rows] = [timestamp for _, timestamp in event["actions"]]
+                action_code[rows] = [actions.code(action) for action, _ in event["actions"]]
+                if item_table is not None:
+                    action_item[rows] = [items.code(item_id) for item_id in item_table[event["codes"]].tolist()]
+                else:
+                    action_item[rows] = [items.code(_item_id(action, item_cache)) for action, _ in event["actions"]]
+                # Each action lasts until the next one, the last until the end of the event
+                action_duration[rows] = np.diff(np.append(action_time[rows], end_time))
+                action_index += n
+
+            event_index += 1
+
+    # Same falsy-end semantics as generate_session_dataframe
+    session_duration = np.where(session_end != 0, session_end - session_start, np.nan)
+    event_duration = np.where(event_end != 0, event_end - event_start, np.nan)
+
+    df_sessions = pd.DataFrame({
+        "SESSION_KEY": np.arange(n_sessions, dtype=np.int64),
+        "SESSION_ID": pd.Categorical(pd.Index([str(session_id) for session_id in session_ids], dtype=object)),
+        "SESSION_START": session_start,
+        "SESSION_END": session_end,
+        "SESSION_DURATION": session_duration,
+    })
+
+    df_events = pd.DataFrame({
+        "EVENT_KEY": np.arange(n_events, dtype=np.int64),
+        "SESSION_KEY": event_session,
+        "TYPE": types.categorical(event_type),
+        "EXHIBIT": exhibits.categorical(event_exhibit),
+        "EXHIBIT_ID": exhibit_ids.categorical(event_exhibit_id),
+        "EVENT_START": event_start,
+        "EVENT_END": event_end,
+        "EVENT_DURATION": event_duration,
+        "ACTIONS_COUNT": event_count,
+    })
+
+    df_actions = pd.DataFrame({
+        "EVENT_KEY": action_event,
+        "ACTION": actions.categorical(action_code),
+        "ITEM_ID": items.categorical(action_item),
+        "ACTION_TIMESTAMP": action_time,
+        "ACTION_DURATION": action_duration,
+    })
+
+    return SessionTables(df_sessions, df_events, df_actions)
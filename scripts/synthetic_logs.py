@@ -0,0 +1,181 @@
+import os
+import json
+import argparse
+import numpy as np
+
+# Exhibits as they appear in the kiosk logs: (name, ExhibitID, ItemIDs of its content)
+EXHIBITS = [
+    ("Gate to Prisoner Compound", 89, range(2060, 2066)),
+    ("Concentration Camp Bergen-Belsen", 90, range(2066, 2072)),
+    ("Main Entrance", 91, range(2072, 2078)),
+    ("Star Camp", 92, range(2078, 2082)),
+    ("Women's Camp", 94, range(2108, 2112)),
+    ("Men's Camp", 95, range(2084, 2090)),
+    ("Workshops", 96, range(2090, 2094)),
+    ("Neutral's camp", 97, range(2130, 2134)),
+    ("Delousing baths", 98, range(2140, 2146)),
+    ("Crematorium", 99, range(2112, 2116)),
+    ("Kitchen", 100, range(2095, 2099)),
+    ("Special camp for Jews from Poland", 101, range(2099, 2104)),
+    ("Main camp street", 103, range(2146, 2155)),
+]
+CTRL_TYPES = ["TXT", "IMG", "AUD", "CTX"]
+SURVEY_BUTTONS = ["UI_SelectLanguageDeutsch_Button", "toggle_accept_survey", "Button_continue_surveySelection"]
+MAP_BUTTONS = ["UI_CenterCamera_Button", "Timeline", "SelectMapLocation"]
+
+# Screen regions of the kiosk UI (x range, y range)
+SCREEN = ((0, 1920), (0, 1080))
+CONTENT_PANEL = ((650, 1150), (690, 840))
+CLOSE_BUTTON = ((1300, 1335), (880, 900))
+HIDE_BUTTON = ((1300, 1340), (770, 800))
+MENU_BAR = ((40, 1880), (950, 1050))
+TOP_RIGHT = ((1740, 1840), (40, 220))
+
+class LogWriter:
+    """Accumulates the events of one log file with a running clock."""
+
+    def __init__(self, rng: np.random.Generator, start_time: float):
+        self.rng = rng
+        self.time = start_time
+        self.events = []
+
+    def wait(self, mean: float):
+        self.time += float(self.rng.exponential(mean)) + 0.05
+
+    def position(self, region=SCREEN):
+        (x_min, x_max), (y_min, y_max) = region
+        return float(self.rng.integers(x_min, x_max)), float(self.rng.integers(y_min, y_max))
+
+    def event(self, action: str, position):
+        self.events.append({"action": action, "positionScreen": f"({position[0]}, {position[1]})", "time": round(self.time, 2)})
+
+    def touch(self, action: str = None, region=SCREEN, finger: int = 0, wait: float = 3.0):
+        """A tap: touchDown, the UI action it triggered (if any) and touchUp."""
+        self.wait(wait)
+        position = self.position(region)
+        self.event(f"touchDown_{finger}", position)
+        if action is not None:
+            self.event(action, position)
+        self.time += 0.05 + float(self.rng.exponential(0.05))
+        self.event(f"touchUp_{finger}", position)
+
+    def explore(self, touches: int):
+        """Map navigation: pans, pinches and the occasional map button."""
+        for _ in range(touches):
+            if self.rng.random() < 0.1:
+                self.touch(self.rng.choice(MAP_BUTTONS), wait=2.0)
+            else:
+                self.touch(finger=int(self.rng.random() < 0.2), wait=1.5)
+
+def _session(log: LogWriter, n_exhibits: int, complete: bool, new_version: bool):
+    rng = log.rng
+
+    # Language and survey before the instructions
+    for action in SURVEY_BUTTONS:
+        log.touch(action, wait=4.0)
+    log.explore(int(rng.integers(2, 10)))
+    log.touch("Button_close_Instructions", TOP_RIGHT, wait=10.0)
+
+    stop_at = int(rng.integers(0, n_exhibits)) if not complete else n_exhibits
+    for index in range(n_exhibits):
+        if index == stop_at:
+            return  # Visitor walked away without finishing
+
+        log.explore(int(rng.integers(0, 6)))
+        name, exhibit_id, items = EXHIBITS[int(rng.integers(len(EXHIBITS)))]
+        if rng.random() < 0.4:
+            log.touch(f"MenuExhibitButton_{name}", MENU_BAR, wait=2.0)
+        log.touch(f"Exhibit_{name}", wait=3.0)
+
+        # Content opens a few seconds after the tap on the panorama
+        log.touch(wait=4.0, region=CONTENT_PANEL)
+        log.wait(5.0)
+        log.event(f"OpenContent_DB_ExhibitID_{exhibit_id}_Page_1", log.position(CONTENT_PANEL))
+
+        for _ in range(int(rng.poisson(3))):
+            roll = rng.random()
+            if roll < 0.6:
+                action = f"CTRL_{rng.choice(CTRL_TYPES)}_Medium_ItemID_{int(rng.choice(items))}"
+                log.touch(action, CONTENT_PANEL, wait=6.0)
+            elif roll < 0.75:
+                log.touch("UI_OpenZoomImage_Button", CONTENT_PANEL, wait=4.0)
+            elif roll < 0.85:
+                log.touch("HideContent_Button", HIDE_BUTTON, wait=2.0)
+            else:
+                log.touch(region=CONTENT_PANEL, wait=2.0)
+
+        # Older app versions have no close button on the content panel
+        if new_version:
+            log.touch("UI_ClosePanoPagePanelClose_Button", CLOSE_BUTTON, wait=3.0)
+
+    log.touch("Finish_virtualNavigation", TOP_RIGHT, wait=4.0)
+    log.touch("UI_NextPostSurvey_Button", TOP_RIGHT, wait=3.0)
+
+def generate_log(rng: np.random.Generator, sessions: int = 2, events_per_session: int = 6,
+                 complete: bool = True, new_version: bool = True, start_time: float = None) -> list:
+    """
+    Events of one synthetic ``Log_Interactions_*.json`` file.
+
+    Sessions follow the grammar SessionFSM expects and are separated by idle
+    periods. ``complete=False`` makes every session end without a Finish event,
+    ``new_version=False`` drops the ``UI_ClosePanoPage`` close events.
+    ``events_per_session`` is the mean number of exhibits visited.
+    """
+    log = LogWriter(rng, float(rng.uniform(100, 40000)) if start_time is None else start_time)
+    log.event("ClickMouseDown", log.position())
+    log.event("StartSession", log.position())
+
+    for index in range(sessions):
+        n_exhibits = max(1, int(rng.poisson(events_per_session)))
+        _session(log, n_exhibits, complete, new_version)
+        log.wait(120.0)
+
+    return log.events
+
+def generate_logs(output_dir, n_files: int, sessions: int = 2, events_per_session: int = 6,
+                  incomplete_share: float = 0.3, old_version_share: float = 0.2,
+                  seed: int = 0, start_epoch_ms: int = 1_735_689_600_000, devices: int = 1) -> list:
+    """
+    Write ``n_files`` synthetic logs named ``Log_Interactions_<DEVICE>_<epoch-ms>.json``.
+
+    Files are spread round-robin over ``devices`` kiosks tagged ``BB``, ``BC``, ``BD``...
+
+    Returns:
+    - list: Paths of the written files, in filename order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    epoch_ms = start_epoch_ms
+    tags = [f"B{chr(ord('B') + index)}" for index in range(devices)]
+    for index in range(n_files):
+        epoch_ms += int(rng.integers(600_000, 7_200_000))
+        events = generate_log(
+            rng,
+            sessions=sessions,
+            events_per_session=events_per_session,
+            complete=rng.random() >= incomplete_share,
+            new_version=rng.random() >= old_version_share,
+        )
+        path = os.path.join(output_dir, f"Log_Interactions_{tags[index % devices]}_{epoch_ms}.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(events, file, indent=4)
+        paths.append(path)
+    return sorted(paths)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Write synthetic Panel6 interaction logs.")
+    parser.add_argument("output_dir", help="Directory receiving the log files")
+    parser.add_argument("--files", type=int, default=100, help="Number of log files")
+    parser.add_argument("--sessions", type=int, default=2, help="Sessions per log file")
+    parser.add_argument("--events", type=int, default=6, help="Mean exhibits visited per session")
+    parser.add_argument("--incomplete", type=float, default=0.3, help="Share of logs without a Finish event")
+    parser.add_argument("--old-version", type=float, default=0.2, help="Share of logs from the app version without UI_ClosePanoPage")
+    parser.add_argument("--devices", type=int, default=1, help="Number of kiosks the files are spread over")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    paths = generate_logs(args.output_dir, args.files, args.sessions, args.events, args.incomplete, args.old_version, args.seed, devices=args.devices)
+    print(f"Wrote {len(paths)} synthetic logs to {args.output_dir}")
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+# Action and event names as logged by the Panel6 app (see SessionFSM)
+CTRL_PREFIX = "CTRL_"
+IMAGE_ZOOM = "UI_OpenZoomImage_Button"
+EXPLORATION_TYPE = "MAP"
+EXHIBIT_TYPE = "CONTENT"
+
+FEATURES = [
+    "SESSION_DURATION",   # Seconds from start to finish
+    "EXPLORATION_TIME",   # Seconds on the map (MAP events)
+    "EXHIBIT_TIME",       # Seconds in exhibits (CONTENT events)
+    "EXPLORATION_RATIO",  # Exploration share of exploration + exhibit time
+    "CONTENT_VIEWS",      # Number of CONTENT events
+    "CTRL_COUNT",         # Content control actions (CTRL_*)
+    "ZOOM_COUNT",         # Image zooms
+    "ITEMS",              # Distinct items interacted with
+    "DWELL_PER_ITEM",     # Seconds of item actions per distinct item
+    "TOUCH_COUNT",        # Touches on the screen
+    "SPATIAL_SPREAD",     # Radius of gyration of the touches (pixels)
+]
+
+# Default engagement score: weights of the standardized features
+ENGAGEMENT_WEIGHTS = {
+    "SESSION_DURATION": 1.0,
+    "EXHIBIT_TIME": 1.0,
+    "CONTENT_VIEWS": 1.0,
+    "CTRL_COUNT": 0.5,
+    "ZOOM_COUNT": 0.5,
+    "DWELL_PER_ITEM": 0.5,
+    "TOUCH_COUNT": 0.5,
+    "SPATIAL_SPREAD": 0.25,
+}
+
+def _session_sums(codes, n_sessions, weights=None) -> np.ndarray:
+    return np.bincount(codes, weights=weights, minlength=n_sessions)
+
+def session_features(events: pd.DataFrame, actions: pd.DataFrame, touches: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Per-session feature matrix.
+
+    Every feature is a ``np.bincount`` over integer session codes, so the
+    tables are scanned once regardless of the number of sessions.
+
+    Parameters:
+    - events (pandas.DataFrame): Wide session table (``session_data_*.csv`` layout).
+    - actions (pandas.DataFrame): Wide action table (``action_data_*.csv`` layout).
+    - touches (pandas.DataFrame, optional): ``SESSION_ID``, ``X``, ``Y`` of every touch.
+      Touch features are NaN without it.
+
+    Returns:
+    - pandas.DataFrame: One float32 row per session, indexed by ``SESSION_ID``, columns ``FEATURES``.
+    """
+    session_ids = pd.Index(pd.unique(events["SESSION_ID"].astype(str)), name="SESSION_ID")
+    n = len(session_ids)
+    features = dict.fromkeys(FEATURES)
+
+    # Events
+    event_session = session_ids.get_indexer(events["SESSION_ID"].astype(str))
+    event_type = events["TYPE"].astype(str).to_numpy()
+    event_duration = np.nan_to_num(events["EVENT_DURATION"].to_numpy(dtype=np.float64))
+    first_event = np.unique(event_session, return_index=True)[1]
+
+    features["SESSION_DURATION"] = events["SESSION_DURATION"].to_numpy(dtype=np.float64)[first_event]
+    features["EXPLORATION_TIME"] = _session_sums(event_session, n, event_duration * (event_type == EXPLORATION_TYPE))
+    features["EXHIBIT_TIME"] = _session_sums(event_session, n, event_duration * (event_type == EXHIBIT_TYPE))
+    engaged_time = features["EXPLORATION_TIME"] + features["EXHIBIT_TIME"]
+    features["EXPLORATION_RATIO"] = np.divide(features["EXPLORATION_TIME"], engaged_time, out=np.full(n, np.nan), where=engaged_time > 0)
+    features["CONTENT_VIEWS"] = _session_sums(event_session, n, event_type == EXHIBIT_TYPE)
+
+    # Actions, classified once per distinct action string
+    action_session = session_ids.get_indexer(actions["SESSION_ID"].astype(str))
+    action_codes, action_names = pd.factorize(actions["ACTION"].astype(str))
+    action_names = pd.Index(action_names)
+    is_ctrl = np.asarray(action_names.str.startswith(CTRL_PREFIX), dtype=bool)[action_codes]
+    is_zoom = np.asarray(action_names == IMAGE_ZOOM, dtype=bool)[action_codes]
+    features["CTRL_COUNT"] = _session_sums(action_session, n, is_ctrl)
+    features["ZOOM_COUNT"] = _session_sums(action_session, n, is_zoom)
+
+    has_item = actions["ITEM_ID"].notna().to_numpy()
+    item_codes = pd.factorize(actions["ITEM_ID"])[0]
+    distinct = np.unique(np.stack([action_session[has_item], item_codes[has_item]]), axis=1)
+    features["ITEMS"] = _session_sums(distinct[0], n).astype(np.float64)
+    item_time = _session_sums(action_session[has_item], n, np.nan_to_num(actions["ACTION_DURATION"].to_numpy(dtype=np.float64)[has_item]))
+    features["DWELL_PER_ITEM"] = np.divide(item_time, features["ITEMS"], out=np.full(n, np.nan), where=features["ITEMS"] > 0)
+
+    # Touches
+    if touches is None:
+        features["TOUCH_COUNT"] = features["SPATIAL_SPREAD"] = np.full(n, np.nan)
+    else:
+        touch_session = session_ids.get_indexer(touches["SESSION_ID"].astype(str))
+        x = touches["X"].to_numpy(dtype=np.float64)
+        y = touches["Y"].to_numpy(dtype=np.float64)
+        count = _session_sums(touch_session, n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_x = _session_sums(touch_session, n, x) / count
+            mean_y = _session_sums(touch_session, n, y) / count
+            variance = _session_sums(touch_session, n, x * x + y * y) / count - mean_x ** 2 - mean_y ** 2
+        features["TOUCH_COUNT"] = count
+        features["SPATIAL_SPREAD"] = np.sqrt(np.clip(variance, 0, None))
+
+    return pd.DataFrame({name: np.asarray(values, dtype=np.float32) for name, values in features.items()}, index=session_ids)
+
+def engagement_score(features: pd.DataFrame, weights: dict = None) -> pd.Series:
+    """
+    Weighted sum of standardized features (z-scores over the given sessions).
+
+    Missing feature values count as average. ``weights`` maps feature names to
+    weights and defaults to ``ENGAGEMENT_WEIGHTS``.
+    """
+    weights = ENGAGEMENT_WEIGHTS if weights is None else weights
+    selected = features[list(weights)].astype(np.float64)
+    std = selected.std(ddof=0).replace(0, np.nan)
+    z_scores = ((selected - selected.mean()) / std).fillna(0.0)
+    score = z_scores.to_numpy() @ np.array(list(weights.values()), dtype=np.float64)
+    return pd.Series(score.astype(np.float32), index=features.index, name="ENGAGEMENT")
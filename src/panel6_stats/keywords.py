@@ -0,0 +1,292 @@
+import os
+import re
+import html
+import hashlib
+import numpy as np
+import pandas as pd
+from panel6_stats.paths import EXHIBIT_PREFIXES
+
+# Bump when the term extraction changes, cached matrices of another format are rebuilt
+FORMAT = 1
+
+# Words of at least three letters; digits split words, so years and dates never become terms
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{3,}")
+
+# Titles are English, German or Hungarian, and item titles carry the collection tag "BBMemo2024"
+STOPWORDS = frozenset("""
+    the and for with from into after before under over about this that these those its his her their our
+    der die das den dem des ein eine einer eines einem einen und oder mit von vom für auf aus bei zum zur nach
+    über unter vor im ins als auch nicht sich sie ihr ihre
+    egy és az hogy nem ban ben után alatt között mint van volt meg
+    bbmemo
+""".split())
+
+def load_item_titles(path) -> pd.Series:
+    """
+    Item titles from an item metadata table.
+
+    Accepts a CSV with ``ITEM_ID`` (or ``Item ID``) and ``Title`` columns, or
+    the HTML export of such a table (``assets/Item_Popularity_Table.html``).
+
+    Returns:
+    - pandas.Series: Title per item, indexed by the numeric item ID.
+    """
+    if str(path).endswith((".html", ".htm")):
+        with open(path, "r", encoding="utf-8") as file:
+            text = file.read()
+        header = [html.unescape(cell.strip()) for cell in re.findall(r"<th>(.*?)</th>", text, re.S)]
+        rows = [
+            [html.unescape(cell.strip()) for cell in re.findall(r"<td>(.*?)</td>", row, re.S)]
+            for row in re.findall(r"<tr>(.*?)</tr>", text, re.S)
+        ]
+        table = pd.DataFrame([row for row in rows if len(row) == len(header)], columns=header)
+    else:
+        table = pd.read_csv(path, dtype=str)
+
+    table = table.rename(columns={"Item ID": "ITEM_ID", "Title": "TITLE"})
+    table.columns = table.columns.str.upper()
+    ids = pd.to_numeric(table["ITEM_ID"], errors="coerce")
+    table = table[ids.notna()]
+    return pd.Series(table["TITLE"].to_numpy(), index=ids[ids.notna()].astype(np.int64).to_numpy(), name="TITLE").sort_index()
+
+def tokenize(text) -> list:
+    """Lower-case terms of a title, without stopwords."""
+    return [term for term in TOKEN_PATTERN.findall(str(text).lower()) if term not in STOPWORDS]
+
+def _document_terms(texts: list):
+    """Sorted vocabulary and the terms of each text as CSR arrays ``(terms, indptr, codes, counts)``."""
+    tokens = [tokenize(text) for text in texts]
+    terms = np.array(sorted({term for document in tokens for term in document}), dtype=str)
+    lengths = np.array([len(document) for document in tokens], dtype=np.int64)
+    flat = np.array([term for document in tokens for term in document], dtype=str)
+
+    # A term repeated in a text becomes one entry with its count
+    document = np.repeat(np.arange(len(texts)), lengths)
+    codes = np.searchsorted(terms, flat) if len(flat) else np.zeros(0, dtype=np.int64)
+    keys, counts = np.unique(document * len(terms) + codes, return_counts=True)
+    document, codes = keys // max(len(terms), 1), keys % max(len(terms), 1)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(document, minlength=len(texts)))]).astype(np.int64)
+    return terms, indptr, codes.astype(np.int64), counts.astype(np.float64)
+
+def _rank_within(rows: np.ndarray, values: np.ndarray, indptr: np.ndarray):
+    """Entry order by row, then by descending value, and the rank of each entry within its row."""
+    order = np.lexsort((-values, rows))
+    rank = np.arange(len(order)) - indptr[rows[order]]
+    return order, rank
+
+class TermMatrix:
+    """
+    Sparse row x term matrix in CSR layout.
+
+    Row ``r`` holds the terms ``terms[indices[indptr[r]:indptr[r + 1]]]`` with
+    weights ``data[indptr[r]:indptr[r + 1]]``; rows are labelled by ``index``
+    (session IDs, or cohorts after ``group``). Every operation works on the
+    flat arrays at once, with no loop over rows.
+    """
+
+    def __init__(self, index, terms, indptr, indices, data, name: str = "SESSION_ID", key: str = ""):
+        self.index = np.asarray(index)
+        self.terms = np.asarray(terms, dtype=str)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.name = name
+        self.key = key  # Signature of the inputs the matrix was built from
+        self._positions = None  # Row label -> row, built on first use
+
+    @classmethod
+    def build(cls, events: pd.DataFrame, actions: pd.DataFrame, item_titles: pd.Series) -> "TermMatrix":
+        """
+        Term counts of every session from the exhibits and items it touched.
+
+        Each event on an exhibit adds the terms of the exhibit name, each
+        action on an item the terms of the item title. Titles are tokenized
+        once per distinct exhibit or item; the session x document counts are
+        then expanded to terms in one pass. Items without a title are ignored.
+
+        Parameters:
+        - events (pandas.DataFrame): ``SESSION_ID`` and ``EXHIBIT``, one row per event.
+        - actions (pandas.DataFrame): ``SESSION_ID`` and ``ITEM_ID``, one row per action.
+        - item_titles (pandas.Series): Title per numeric item ID, see ``load_item_titles``.
+        """
+        codes, sessions = pd.factorize(pd.concat([events["SESSION_ID"], actions["SESSION_ID"]], ignore_index=True))
+        event_sessions, action_sessions = codes[:len(events)], codes[len(events):]
+
+        # Documents: items by ID, then exhibits by name
+        item_ids = item_titles.index.to_numpy(dtype=np.int64)
+        # Map and menu events on the same exhibit share one document; names are cleaned per distinct value
+        exhibit_codes, names = pd.factorize(events["EXHIBIT"])
+        exhibits, exhibit_docs = np.unique(pd.Series(names).astype(str).str.replace(EXHIBIT_PREFIXES, "", regex=True).to_numpy(), return_inverse=True)
+        has_exhibit = exhibit_codes >= 0
+        terms, doc_indptr, doc_terms, doc_counts = _document_terms([*item_titles.tolist(), *exhibits.tolist()])
+        n_docs = len(item_ids) + len(exhibits)
+
+        item_codes, items = pd.factorize(actions["ITEM_ID"])
+        item = pd.to_numeric(pd.Series(items), errors="coerce").to_numpy(dtype=np.float64)
+        position = np.searchsorted(item_ids, np.nan_to_num(item, nan=-1).astype(np.int64))
+        titled = (position < len(item_ids)) & (item_ids[np.minimum(position, len(item_ids) - 1)] == item) if len(item_ids) else np.zeros(len(item), dtype=bool)
+        known = (item_codes >= 0) & titled[item_codes]
+
+        pair_sessions = np.concatenate([action_sessions[known], event_sessions[has_exhibit]])
+        pair_docs = np.concatenate([position[item_codes[known]], len(item_ids) + exhibit_docs[exhibit_codes[has_exhibit]]])
+        pairs, pair_counts = np.unique(pair_sessions * n_docs + pair_docs, return_counts=True)
+        pair_sessions, pair_docs = pairs // max(n_docs, 1), pairs % max(n_docs, 1)
+
+        # Expand every (session, document) pair to the document's terms
+        lengths = doc_indptr[pair_docs + 1] - doc_indptr[pair_docs]
+        entries = np.arange(lengths.sum()) + np.repeat(doc_indptr[pair_docs] - (np.cumsum(lengths) - lengths), lengths)
+        rows = np.repeat(pair_sessions, lengths)
+        values = np.repeat(pair_counts, lengths) * doc_counts[entries]
+
+        keys, inverse = np.unique(rows * len(terms) + doc_terms[entries], return_inverse=True)
+        rows = keys // max(len(terms), 1)
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(sessions)))])
+        return cls(sessions.to_numpy(dtype=object), terms, indptr, keys % max(len(terms), 1), np.bincount(inverse, weights=values))
+
+    @property
+    def shape(self) -> tuple:
+        return len(self.index), len(self.terms)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _rows(self) -> np.ndarray:
+        """Row of every stored entry."""
+        return np.repeat(np.arange(len(self.index)), np.diff(self.indptr))
+
+    def _with_data(self, data: np.ndarray) -> "TermMatrix":
+        return TermMatrix(self.index, self.terms, self.indptr, self.indices, data, name=self.name, key=self.key)
+
+    def tfidf(self, sublinear: bool = True) -> "TermMatrix":
+        """
+        TF-IDF weights with the rows as documents, each row scaled to unit length.
+
+        ``tf`` is ``1 + log(count)`` when ``sublinear`` (a term seen on ten
+        items does not outweigh ten distinct terms), ``idf`` is the smoothed
+        ``log((1 + n) / (1 + df)) + 1``.
+        """
+        document_frequency = np.bincount(self.indices, minlength=len(self.terms))
+        idf = np.log((1 + len(self.index)) / (1 + document_frequency)) + 1
+        tf = 1 + np.log(self.data) if sublinear else self.data
+        weights = tf * idf[self.indices]
+
+        norms = np.sqrt(np.bincount(self._rows(), weights=weights ** 2, minlength=len(self.index)))
+        return self._with_data(weights / np.repeat(np.where(norms > 0, norms, 1), np.diff(self.indptr)))
+
+    def group(self, labels, name: str = "COHORT", mean: bool = True) -> "TermMatrix":
+        """
+        Rows summed (or averaged when ``mean``) per label.
+
+        Averaging unit-length TF-IDF rows gives the centroid of a cohort, so
+        large and small cohorts are compared on the same scale.
+
+        Parameters:
+        - labels: One label per row, or a ``pandas.Series`` indexed by row label. Rows without a label are left out.
+        """
+        if isinstance(labels, pd.Series):
+            labels = labels.reindex(self.index)
+        codes, groups = pd.factorize(pd.Series(np.asarray(labels, dtype=object)), sort=True)
+        entry_codes = codes[self._rows()]
+        labelled = entry_codes >= 0
+
+        keys, inverse = np.unique(entry_codes[labelled] * len(self.terms) + self.indices[labelled], return_inverse=True)
+        data = np.bincount(inverse, weights=self.data[labelled])
+        rows = keys // max(len(self.terms), 1)
+        if mean:
+            data = data / np.bincount(codes[codes >= 0], minlength=len(groups))[rows]
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(groups)))])
+        return TermMatrix(groups.to_numpy(dtype=object), self.terms, indptr, keys % max(len(self.terms), 1), data, name=name, key=self.key)
+
+    def top_terms(self, k: int = 10) -> pd.DataFrame:
+        """
+        The ``k`` highest weighted terms of every row.
+
+        Returns:
+        - pandas.DataFrame: ``<name>``, ``RANK`` (from 1), ``TERM`` and ``WEIGHT``, rows in matrix order.
+        """
+        order, rank = _rank_within(self._rows(), self.data, self.indptr)
+        keep = rank < k
+        order = order[keep]
+        return pd.DataFrame({
+            self.name: self.index[self._rows()[order]],
+            "RANK": rank[keep] + 1,
+            "TERM": self.terms[self.indices[order]],
+            "WEIGHT": self.data[order],
+        })
+
+    def row(self, label) -> pd.Series:
+        """Weights of one row, indexed by term, highest first."""
+        if self._positions is None:
+            self._positions = pd.Index(self.index)
+        position = self._positions.get_loc(label)
+        start, stop = self.indptr[position], self.indptr[position + 1]
+        return pd.Series(self.data[start:stop], index=self.terms[self.indices[start:stop]]).sort_values(ascending=False)
+
+    def row_sizes(self) -> pd.Series:
+        """Number of distinct terms per row."""
+        return pd.Series(np.diff(self.indptr), index=self.index)
+
+    def save(self, path):
+        """Save the matrix as a compressed ``.npz``."""
+        np.savez_compressed(
+            path,
+            settings=np.array([FORMAT, self.name, self.key], dtype=str),
+            index=self.index.astype(str),
+            terms=self.terms,
+            indptr=self.indptr,
+            indices=self.indices,
+            data=self.data,
+        )
+
+    @classmethod
+    def load(cls, path) -> "TermMatrix":
+        with np.load(path) as data:
+            _, name, key = data["settings"].tolist()
+            return cls(data["index"].astype(object), data["terms"], data["indptr"], data["indices"], data["data"], name=name, key=key)
+
+def input_signature(*paths) -> str:
+    """Signature of input files by name, size and mtime, and of the extraction format."""
+    digest = hashlib.sha1(f"keywords{FORMAT}".encode())
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def read_session_terms(tables: dict) -> tuple:
+    """
+    Exhibit names per event and ItemIDs per action, with their ``SESSION_ID``, as strings.
+
+    ``tables`` maps table names to CSV paths: the wide ``session_data`` and
+    ``action_data`` pair, or the normalized ``sessions``, ``events`` and
+    ``actions`` tables, which are joined on their keys.
+    """
+    read = lambda name, columns: pd.read_csv(tables[name], usecols=columns, dtype=str)
+    if "session_data" in tables:
+        return read("session_data", ["SESSION_ID", "EXHIBIT"]), read("action_data", ["SESSION_ID", "ITEM_ID"])
+
+    sessions = read("sessions", ["SESSION_KEY", "SESSION_ID"])
+    events = read("events", ["EVENT_KEY", "SESSION_KEY", "EXHIBIT"]).merge(sessions, on="SESSION_KEY", how="left", sort=False)
+    actions = read("actions", ["EVENT_KEY", "ITEM_ID"]).merge(events[["EVENT_KEY", "SESSION_ID"]], on="EVENT_KEY", how="left", sort=False)
+    return events[["SESSION_ID", "EXHIBIT"]], actions[["SESSION_ID", "ITEM_ID"]]
+
+def session_term_matrix(tables: dict, metadata, cache=None) -> TermMatrix:
+    """
+    Session x term counts of the session tables (see ``read_session_terms`` for ``tables``).
+
+    With ``cache``, the matrix is saved there and reused, without reading the
+    tables, for as long as the tables and the item metadata are unchanged.
+    """
+    key = input_signature(*tables.values(), metadata)
+    if cache is not None and os.path.exists(cache):
+        matrix = TermMatrix.load(cache)
+        if matrix.key == key:
+            return matrix
+
+    events, actions = read_session_terms(tables)
+    matrix = TermMatrix.build(events, actions, load_item_titles(metadata))
+    matrix.key = key
+
+    if cache is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(cache)), exist_ok=True)
+        matrix.save(cache)
+    return matrix
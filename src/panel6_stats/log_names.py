@@ -0,0 +1,31 @@
+import re
+import pandas as pd
+
+# Kiosk tag before the epoch of a log file stem or session ID, e.g. ``BB`` in ``Log_Interactions_BB_1732835511436:20``
+DEVICE_PATTERN = r"_([A-Za-z0-9]+)_\d{13}(?::|\.json|$)"
+UNTAGGED = "untagged"
+
+def session_epochs(session_ids) -> pd.Series:
+    """
+    Epoch in ms of the source log file of each session, from its filename tag.
+
+    Session IDs look like ``Log_Interactions_BB_1732835511436:20``; IDs without
+    an epoch (e.g. legacy integer IDs) map to NaN.
+    """
+    session_ids = pd.Series(session_ids, dtype=object)
+    epochs = session_ids.astype(str).str.extract(r"_(\d{13})(?::|$)", expand=False)
+    return pd.to_numeric(epochs)
+
+def device_tag(name: str) -> str:
+    """Device (kiosk) tag of a log filename or session ID, ``UNTAGGED`` if it has none."""
+    match = re.search(DEVICE_PATTERN, str(name))
+    return match.group(1) if match else UNTAGGED
+
+def session_devices(session_ids) -> pd.Series:
+    """Device tag of each log filename or session ID (``UNTAGGED`` without one)."""
+    session_ids = pd.Series(session_ids, dtype=object)
+    return session_ids.astype(str).str.extract(DEVICE_PATTERN, expand=False).fillna(UNTAGGED)
+
+def session_days(session_ids) -> pd.Series:
+    """Calendar day of each session, taken from the epoch-ms tag of its source log file (NaN without a tag)."""
+    return pd.to_datetime(session_epochs(session_ids), unit="ms").dt.strftime("%Y-%m-%d")
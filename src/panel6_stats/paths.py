@@ -0,0 +1,345 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+# Exhibit events are logged either from the map (Exhibit_*) or from the menu (MenuExhibitButton_*)
+EXHIBIT_PREFIXES = r"^(?:Exhibit_|MenuExhibitButton_)"
+PATH_EVENT_TYPE = "CONTENT"
+
+def exhibit_paths(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Exhibit sequence of every session from a wide session table (``session_data_*.csv`` layout).
+
+    Repeated events on the same exhibit are collapsed into one step.
+
+    Returns:
+    - pandas.DataFrame: ``SESSION_ID`` and ``EXHIBIT`` per path step, in session order.
+    """
+    steps = events.loc[(events["TYPE"] == PATH_EVENT_TYPE) & events["EXHIBIT"].notna(), ["SESSION_ID", "EXHIBIT"]]
+    session = steps["SESSION_ID"].astype(str).to_numpy()
+    exhibit = steps["EXHIBIT"].astype(str).str.replace(EXHIBIT_PREFIXES, "", regex=True).to_numpy()
+
+    keep = np.ones(len(steps), dtype=bool)
+    keep[1:] = (session[1:] != session[:-1]) | (exhibit[1:] != exhibit[:-1])
+    return pd.DataFrame({"SESSION_ID": session[keep], "EXHIBIT": exhibit[keep]})
+
+class PathMiner:
+    """
+    Navigation path statistics, updated chunk by chunk.
+
+    Keeps, for all sessions seen so far:
+
+    - sparse exhibit-to-exhibit transition counts (sorted ``from * n + to`` keys and counts)
+    - n-gram counts for ``n`` in ``2..max_n``, at most ``2 * max_ngrams`` of them
+    - a prefix trie of session paths (truncated to ``max_depth`` steps, at most ``max_nodes``
+      nodes) with the number of sessions through and ending at each node
+    - per exhibit: sessions visiting it, sessions starting with it and summed first-visit position
+
+    Memory depends on the number of exhibits and on the caps, not on the number
+    of sessions, and queries only read these aggregates.
+
+    The caps are enforced while counting: once the n-gram dict exceeds
+    ``2 * max_ngrams`` entries, only those counted more often than the
+    ``max_ngrams + 1``-th largest count are kept; once a path would not fit
+    into ``max_nodes`` nodes, the trie is cut to the nodes with more support
+    than its ``max_nodes // 2 + 1``-th largest support (a subtree, as a node
+    never has more support than its parent). An n-gram or path seen again
+    after being pruned is counted from zero, so counts are lower bounds,
+    short of the true count by at most ``ngram_error`` and ``trie_error``,
+    the summed cut-off counts. Both stay 0, and every count exact, while the
+    caps are not reached.
+    """
+
+    def __init__(self, max_n: int = 4, max_ngrams: int = 100_000, max_depth: int = 12, max_nodes: int = 1_000_000):
+        if max_nodes < 2 * (max_depth + 1):
+            raise ValueError(f"max_nodes ({max_nodes}) must be at least 2 * (max_depth + 1) = {2 * (max_depth + 1)}")
+        self.max_n = max_n
+        self.max_ngrams = max_ngrams
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+
+        self.exhibits = []
+        self.codes = {}
+        self.sessions = 0
+
+        self._transition_width = 0  # Number of exhibits the transition keys are encoded with
+        self.transition_keys = np.zeros(0, dtype=np.int64)
+        self.transition_counts = np.zeros(0, dtype=np.int64)
+        self.ngrams = {}
+        self.ngram_error = 0  # Upper bound on the undercount of any n-gram
+
+        # Trie as flat arrays, node 0 is the root (the empty path)
+        self.children = {}  # (parent node, exhibit code) -> node
+        self.parent = [-1]
+        self.step = [-1]
+        self.support = [0]
+        self.terminal = [0]
+        self.depth = [0]
+        self.trie_error = 0  # Upper bound on the undercount of any node's support and terminal count
+        self._arrays = None  # NumPy copies of the trie lists, rebuilt after updates
+
+        self.visits = []
+        self.first_views = []
+        self.first_position_sum = []
+
+    def _encode(self, exhibits) -> np.ndarray:
+        for exhibit in pd.unique(exhibits):
+            if exhibit not in self.codes:
+                self.codes[exhibit] = len(self.exhibits)
+                self.exhibits.append(exhibit)
+                self.visits.append(0)
+                self.first_views.append(0)
+                self.first_position_sum.append(0)
+        return np.fromiter((self.codes[exhibit] for exhibit in exhibits), dtype=np.int64, count=len(exhibits))
+
+    def update(self, events: pd.DataFrame) -> "PathMiner":
+        """Add the sessions of a wide session table. A session must not be split across updates."""
+        return self.update_paths(exhibit_paths(events))
+
+    def update_paths(self, paths: pd.DataFrame) -> "PathMiner":
+        """Add sessions from ``exhibit_paths`` output."""
+        if paths.empty:
+            return self
+        session = paths["SESSION_ID"].to_numpy()
+        codes = self._encode(paths["EXHIBIT"].to_numpy())
+        starts = np.flatnonzero(np.concatenate([[True], session[1:] != session[:-1]]))
+
+        # Transitions: consecutive steps of the same session
+        same_session = np.ones(len(codes) - 1, dtype=bool)
+        same_session[starts[1:] - 1] = False
+        self._add_transitions(codes[:-1][same_session] * len(self.exhibits) + codes[1:][same_session], len(self.exhibits))
+
+        for path in np.split(codes, starts[1:]):
+            self._add_path(path.tolist())
+        self.sessions += len(starts)
+        self._arrays = None
+        return self
+
+    def _add_transitions(self, keys: np.ndarray, n_exhibits: int):
+        # Re-key the stored pairs if new exhibits widened the matrix
+        stored_from, stored_to = np.divmod(self.transition_keys, max(self._transition_width, 1))
+        self._transition_width = n_exhibits
+        keys = np.concatenate([stored_from * n_exhibits + stored_to, keys])
+        counts = np.concatenate([self.transition_counts, np.ones(len(keys) - len(self.transition_counts), dtype=np.int64)])
+        self.transition_keys, inverse = np.unique(keys, return_inverse=True)
+        self.transition_counts = np.bincount(inverse, weights=counts, minlength=len(self.transition_keys)).astype(np.int64)
+
+    def _add_path(self, path: list):
+        seen = set()
+        for position, code in enumerate(path):
+            if code not in seen:
+                seen.add(code)
+                self.visits[code] += 1
+                self.first_position_sum[code] += position
+        self.first_views[path[0]] += 1
+
+        for n in range(2, self.max_n + 1):
+            for index in range(len(path) - n + 1):
+                gram = tuple(path[index:index + n])
+                count = self.ngrams.get(gram)
+                if count is None and len(self.ngrams) >= 2 * self.max_ngrams:
+                    self._prune_ngrams()
+                self.ngrams[gram] = (count or 0) + 1
+
+        # Make room for the whole path first, so that pruning never renumbers the nodes being walked
+        if len(self.parent) + min(len(path), self.max_depth) > self.max_nodes:
+            self._prune_trie()
+        node = 0
+        self.support[0] += 1
+        for code in path[:self.max_depth]:
+            child = self.children.get((node, code))
+            if child is None:
+                child = self.children[(node, code)] = len(self.parent)
+                self.parent.append(node)
+                self.step.append(code)
+                self.support.append(0)
+                self.terminal.append(0)
+                self.depth.append(self.depth[node] + 1)
+            node = child
+            self.support[node] += 1
+        self.terminal[node] += 1
+
+    def _trie_arrays(self) -> dict:
+        if self._arrays is None:
+            self._arrays = {
+                name: np.asarray(getattr(self, name), dtype=np.int64)
+                for name in ("parent", "support", "terminal", "depth")
+            }
+        return self._arrays
+
+    def _prune_ngrams(self):
+        """Keep the n-grams counted more often than the ``max_ngrams + 1``-th largest count."""
+        counts = np.fromiter(self.ngrams.values(), dtype=np.int64, count=len(self.ngrams))
+        cut = int(np.partition(counts, len(counts) - self.max_ngrams - 1)[len(counts) - self.max_ngrams - 1])
+        self.ngrams = {gram: count for gram, count in self.ngrams.items() if count > cut}
+        self.ngram_error += cut
+
+    def _prune_trie(self):
+        """Keep the root and the nodes with more support than the ``max_nodes // 2 + 1``-th largest."""
+        support = np.asarray(self.support, dtype=np.int64)
+        keep_count = self.max_nodes // 2
+        cut = int(np.partition(support, len(support) - keep_count - 1)[len(support) - keep_count - 1])
+        keep = support > cut
+        keep[0] = True
+
+        # Kept nodes keep their order, so parents still come before their children
+        renumber = np.cumsum(keep) - 1
+        parent = np.asarray(self.parent, dtype=np.int64)[keep]
+        parent[1:] = renumber[parent[1:]]
+        self.parent = parent.tolist()
+        for name in ("step", "support", "terminal", "depth"):
+            setattr(self, name, np.asarray(getattr(self, name), dtype=np.int64)[keep].tolist())
+        self.children = {(parent, step): node for node, (parent, step) in enumerate(zip(self.parent, self.step)) if node > 0}
+        self.trie_error += cut
+        self._arrays = None
+
+    def _path(self, node: int) -> tuple:
+        steps = []
+        while node > 0:
+            steps.append(self.exhibits[self.step[node]])
+            node = self.parent[node]
+        return tuple(reversed(steps))
+
+    def transitions(self) -> pd.Series:
+        """Non-zero transition counts indexed by ``(FROM, TO)`` exhibit."""
+        width = max(self._transition_width, 1)
+        from_codes, to_codes = np.divmod(self.transition_keys, width)
+        names = np.asarray(self.exhibits, dtype=object)
+        index = pd.MultiIndex.from_arrays([names[from_codes], names[to_codes]], names=["FROM", "TO"])
+        return pd.Series(self.transition_counts, index=index, name="COUNT")
+
+    def transition_matrix(self, normalize: bool = False) -> pd.DataFrame:
+        """Dense exhibit x exhibit matrix, rows optionally normalized to transition probabilities."""
+        matrix = self.transitions().unstack(fill_value=0).reindex(index=self.exhibits, columns=self.exhibits, fill_value=0)
+        if normalize:
+            matrix = matrix.div(matrix.sum(axis=1).replace(0, np.nan), axis=0).fillna(0.0)
+        return matrix
+
+    def top_ngrams(self, k: int = 10, n: int = None) -> pd.DataFrame:
+        """Most frequent n-grams, of length ``n`` or of any length."""
+        grams = self.ngrams.items() if n is None else ((gram, count) for gram, count in self.ngrams.items() if len(gram) == n)
+        top = heapq.nlargest(k, grams, key=lambda item: item[1])
+        return pd.DataFrame({
+            "PATH": [" > ".join(self.exhibits[code] for code in gram) for gram, _ in top],
+            "LENGTH": [len(gram) for gram, _ in top],
+            "COUNT": [count for _, count in top],
+        })
+
+    def compressed_nodes(self) -> np.ndarray:
+        """
+        Nodes of the compressed trie.
+
+        A chain of nodes with the same support is the same set of sessions, so
+        only its deepest node is kept: a node is kept when none of its children
+        has its full support.
+        """
+        arrays = self._trie_arrays()
+        parent = arrays["parent"][1:]
+        support = arrays["support"]
+        absorbed = np.zeros(len(support), dtype=bool)
+        absorbed[parent[support[1:] == support[parent]]] = True
+        absorbed[0] = True
+        return np.flatnonzero(~absorbed)
+
+    def top_paths(self, k: int = 10, min_length: int = 2, complete: bool = False) -> pd.DataFrame:
+        """
+        Most common navigation paths from the session start.
+
+        With ``complete`` only whole session paths are ranked (by the number of
+        sessions ending there), otherwise maximal common prefixes by support.
+        """
+        arrays = self._trie_arrays()
+        counts = arrays["terminal" if complete else "support"]
+        depth = arrays["depth"]
+        nodes = np.flatnonzero(counts) if complete else self.compressed_nodes()
+        nodes = nodes[depth[nodes] >= min_length]
+
+        # Rank by count, then by length
+        order = np.lexsort((-depth[nodes], -counts[nodes]))[:k]
+        top = nodes[order]
+        return pd.DataFrame({
+            "PATH": [" > ".join(self._path(node)) for node in top.tolist()],
+            "LENGTH": depth[top],
+            "SESSIONS": counts[top],
+        })
+
+    def first_view_popularity(self) -> pd.DataFrame:
+        """
+        Is the content presented first also the most viewed?
+
+        Per exhibit: sessions opening it first, sessions viewing it at all and
+        its mean position of first view, with the ranks of both counts.
+        """
+        visits = np.asarray(self.visits, dtype=np.int64)
+        df = pd.DataFrame({
+            "FIRST_VIEWS": np.asarray(self.first_views, dtype=np.int64),
+            "SESSIONS": visits,
+            "MEAN_FIRST_POSITION": np.asarray(self.first_position_sum, dtype=np.float64) / np.maximum(visits, 1),
+        }, index=pd.Index(self.exhibits, name="EXHIBIT"))
+        df["FIRST_VIEW_RANK"] = df["FIRST_VIEWS"].rank(ascending=False, method="min").astype(np.int64)
+        df["POPULARITY_RANK"] = df["SESSIONS"].rank(ascending=False, method="min").astype(np.int64)
+        return df.sort_values("SESSIONS", ascending=False)
+
+    def first_view_correlation(self) -> float:
+        """Spearman correlation between mean first-view position and popularity (negative: earlier is more viewed)."""
+        df = self.first_view_popularity()
+        return df["MEAN_FIRST_POSITION"].rank().corr(df["SESSIONS"].rank())
+
+    def save(self, path):
+        """Save the aggregates as a compressed ``.npz``, without the sessions."""
+        grams = list(self.ngrams.items())
+        gram_codes = np.full((len(grams), self.max_n), -1, dtype=np.int64)
+        for row, (gram, _) in enumerate(grams):
+            gram_codes[row, :len(gram)] = gram
+        np.savez_compressed(
+            path,
+            settings=np.array([self.max_n, self.max_ngrams, self.max_depth, self.max_nodes, self.sessions, self._transition_width, self.ngram_error, self.trie_error]),
+            exhibits=np.asarray(self.exhibits, dtype=str),
+            transition_keys=self.transition_keys,
+            transition_counts=self.transition_counts,
+            gram_codes=gram_codes,
+            gram_counts=np.array([count for _, count in grams], dtype=np.int64),
+            trie=np.array([self.parent, self.step, self.support, self.terminal, self.depth], dtype=np.int64),
+            exhibit_stats=np.array([self.visits, self.first_views, self.first_position_sum], dtype=np.int64).reshape(3, -1),
+        )
+
+    @classmethod
+    def load(cls, path) -> "PathMiner":
+        with np.load(path) as data:
+            max_n, max_ngrams, max_depth, max_nodes, sessions, width, ngram_error, trie_error = data["settings"].tolist()
+            miner = cls(max_n, max_ngrams, max_depth, max_nodes)
+            miner.sessions, miner._transition_width = sessions, width
+            miner.ngram_error, miner.trie_error = ngram_error, trie_error
+            miner.exhibits = data["exhibits"].tolist()
+            miner.codes = {exhibit: code for code, exhibit in enumerate(miner.exhibits)}
+            miner.transition_keys = data["transition_keys"]
+            miner.transition_counts = data["transition_counts"]
+            miner.ngrams = {
+                tuple(code for code in codes if code >= 0): count
+                for codes, count in zip(data["gram_codes"].tolist(), data["gram_counts"].tolist())
+            }
+            miner.parent, miner.step, miner.support, miner.terminal, miner.depth = (row.tolist() for row in data["trie"])
+            miner.visits, miner.first_views, miner.first_position_sum = (row.tolist() for row in data["exhibit_stats"])
+        miner.children = {(parent, step): node for node, (parent, step) in enumerate(zip(miner.parent, miner.step)) if node > 0}
+        return miner
+
+def mine_paths(session_csv, chunksize: int = 500_000, **kwargs) -> PathMiner:
+    """
+    Mine a ``session_data_*.csv`` in chunks of rows.
+
+    The last session of each chunk is held back until the next chunk so that
+    no session is split, keeping memory bounded by ``chunksize``.
+    """
+    miner = PathMiner(**kwargs)
+    carry = None
+    for chunk in pd.read_csv(session_csv, usecols=["SESSION_ID", "TYPE", "EXHIBIT"], dtype=str, chunksize=chunksize):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        session_ids = chunk["SESSION_ID"].to_numpy()
+        other = np.flatnonzero(session_ids != session_ids[-1])
+        split = other[-1] + 1 if len(other) else 0
+        carry = chunk.iloc[split:]
+        miner.update(chunk.iloc[:split])
+    if carry is not None:
+        miner.update(carry)
+    return miner
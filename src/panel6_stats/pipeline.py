@@ -0,0 +1,343 @@
+import os
+import sys
+import glob
+import json
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+STATE_FILE = "data/pipeline_state.json"
+HASH_CHUNK_SIZE = 1 << 20
+
+class Stage:
+    """
+    One step of the pipeline: a script run from ``scripts/`` with declared inputs and outputs.
+
+    ``inputs`` and ``outputs`` are paths relative to the project root; inputs
+    may be directories (every file below them counts) or glob patterns. Code
+    the stage depends on is listed among its inputs, so editing it reruns the stage.
+    """
+
+    def __init__(self, name: str, script: str, inputs: list, outputs: list, args: list = None,
+                 description: str = "", parallel: bool = False):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.args = list(args or [])
+        self.description = description
+        self.parallel = parallel  # Script takes a --workers option
+
+    def command(self, workers: int = 1) -> list:
+        workers_args = ["--workers", str(workers)] if self.parallel else []
+        return [sys.executable, self.script, *self.args, *workers_args]
+
+def _scripts(*names) -> list:
+    return [f"scripts/{name}" for name in names]
+
+# Columns of the LogStore, without the footprint caches the plots stage writes next to them
+STORE = ["data/logs_new/vocab.json", "data/logs_new/part-*/files.json", "data/logs_new/part-*/*.npy"]
+
+# Session tables the segment stage writes for each --tables layout (see preprocess_logs.output_paths)
+TABLES = {
+    "wide": ["data/session_data_new.csv", "data/action_data_new.csv"],
+    "normalized": ["data/sessions_new.csv", "data/events_new.csv", "data/actions_new.csv"],
+}
+
+def pipeline_stages(tables: str = "wide") -> list:
+    """
+    The pipeline stages for a session table layout (``wide`` or ``normalized``).
+
+    The layout is passed to every stage reading the session tables and
+    decides the table paths the downstream stages depend on.
+    """
+    if tables not in TABLES:
+        raise ValueError(f"Unknown table layout {tables!r}. Known: {', '.join(TABLES)}")
+    table_paths = TABLES[tables]
+    layout_args = ["--tables", tables]
+
+    return [
+        Stage(
+            "ingest", "preprocess_logs.py", args=["--stage", "ingest"],
+            inputs=["data/logs/*Interactions*.json", *_scripts("preprocess_logs.py", "log_parser.py", "session_flags.py", "log_store.py", "ingest_manifest.py"),
+                    "src/panel6_stats/log_names.py", "src/panel6_stats/sketches.py"],
+            outputs=["data/logs_new", "data/logs_metrics_new.csv", "data/ingest_manifest_new.json", "data/sketches_new/logs.json"],
+            description="Parse new or changed log files, classify them (complete/new) and store their columns", parallel=True,
+        ),
+        Stage(
+            "segment", "preprocess_logs.py", args=["--stage", "segment", *layout_args],
+            inputs=[*STORE, *_scripts("preprocess_logs.py", "event_processor.py", "action_vocab.py", "session_tables.py"), "src/panel6_stats/sketches.py"],
+            outputs=[*table_paths, "data/segment_state_new.json", "data/sketches_new/tables.json"],
+            description="Segment the new store partitions into sessions and append them to the session tables", parallel=True,
+        ),
+        Stage(
+            "rollups", "preprocess_logs.py", args=["--stage", "rollups", *layout_args],
+            inputs=[*table_paths, "data/segment_state_new.json", *_scripts("preprocess_logs.py", "session_tables.py"), "src/panel6_stats/rollups.py", "src/panel6_stats/log_names.py"],
+            outputs=["data/rollups_new", "data/rollup_state_new.json"],
+            description="Fold the new action rows into the rollup cubes",
+        ),
+        Stage(
+            "gap_sweep", "gap_segments.py",
+            inputs=[*STORE, "scripts/gap_segments.py"],
+            outputs=["data/gap_threshold_sweep_new.csv"],
+            description="Sweep inactivity thresholds over the stored logs",
+        ),
+        Stage(
+            "features", "session_features.py", args=layout_args,
+            inputs=[*STORE, *table_paths, *_scripts("session_features.py", "preprocess_logs.py", "session_tables.py"), "src/panel6_stats/features.py"],
+            outputs=["data/session_features_new.csv"],
+            description="Per-session feature matrix and engagement score",
+        ),
+        Stage(
+            "keywords", "session_keywords.py", args=layout_args,
+            inputs=[*table_paths, "assets/Item_Popularity_Table.html", *_scripts("session_keywords.py", "plot_jobs.py", "preprocess_logs.py"), "src/panel6_stats/keywords.py"],
+            outputs=["data/session_terms_new.npz", "data/session_keywords_new.csv", "data/cohort_keywords_new.csv", "scripts/outputs/word_clouds"],
+            description="Keywords per session and cohort from exhibit and item titles, and their word clouds", parallel=True,
+        ),
+        Stage(
+            "paths", "session_paths.py", args=layout_args,
+            inputs=[*table_paths, *_scripts("session_paths.py", "preprocess_logs.py", "session_tables.py"), "src/panel6_stats/paths.py"],
+            outputs=["data/path_transitions_new.csv", "data/path_ngrams_new.csv", "data/path_top_paths_new.csv", "data/path_first_views_new.csv"],
+            description="Exhibit transitions, frequent n-grams, common paths and first view against popularity",
+        ),
+        Stage(
+            "plots", "generate_plots.py",
+            inputs=[*STORE, "data/logs_metrics_new.csv", "data/sketches_new/logs.json", *table_paths, "data/rollups_new",
+                    *_scripts("generate_plots.py", "heatmap.py", "plot_jobs.py", "report_builder.py"), "src/panel6_stats/session_store.py", "src/panel6_stats/sketches.py"],
+            outputs=["scripts/outputs/plots", "scripts/assets/time_metrics.csv", "data/session_metrics.html", "data/session_actions.html"],
+            description="Render the plots and table pages", parallel=True,
+        ),
+        Stage(
+            "report", "generate_report.py",
+            inputs=["data/logs_metrics_new.csv", "data/sketches_new", "scripts/outputs/plots", *_scripts("generate_report.py", "report_builder.py"),
+                    "src/panel6_stats/sketches.py"],
+            outputs=["scripts/outputs/logs_report.html"],
+            description="Build the tabbed HTML report",
+        ),
+    ]
+
+STAGES = pipeline_stages()
+
+def _inside(path: str, directory: str) -> bool:
+    return path == directory or path.startswith(directory.rstrip("/") + "/")
+
+def stage_dependencies(stages: list) -> dict:
+    """Stages each stage depends on: the producers of any of its inputs (an output is, contains or lies in the input)."""
+    dependencies = {}
+    for stage in stages:
+        dependencies[stage.name] = [
+            producer.name for producer in stages
+            if producer is not stage and any(
+                _inside(path, output) or _inside(output, path)
+                for path in stage.inputs for output in producer.outputs
+            )
+        ]
+    return dependencies
+
+def _expand(root: str, path: str) -> list:
+    """Files of an input path relative to ``root``: the file itself, every file below a directory, or glob matches."""
+    full = os.path.join(root, path)
+    if glob.has_magic(path):
+        return sorted(os.path.relpath(match, root) for match in glob.glob(full) if os.path.isfile(match))
+    if os.path.isdir(full):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), root)
+            for directory, _, names in os.walk(full)
+            for name in names if not name.endswith(".tmp")
+        )
+    return [path]
+
+def _file_hash(path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Pipeline:
+    """
+    Runs the stages in dependency order, skipping those whose inputs are unchanged.
+
+    A stage's key is the content hash of all its input files and its command.
+    It reruns when the key differs from the one recorded after its last
+    successful run or when one of its outputs is missing. File hashes are
+    cached by size and mtime, so unchanged files are never read again, and
+    outputs rewritten with identical content do not invalidate downstream
+    stages. Stages whose dependencies are done run concurrently, up to ``jobs`` at a time.
+    """
+
+    def __init__(self, root=".", stages: list = None, jobs: int = 2, workers: int = 1, tables: str = "wide"):
+        self.root = os.path.abspath(root)
+        self.stages = {stage.name: stage for stage in (stages or pipeline_stages(tables))}
+        self.dependencies = stage_dependencies(list(self.stages.values()))
+        self.jobs = jobs
+        self.workers = workers
+        self.state_path = os.path.join(self.root, STATE_FILE)
+        self.state = {"files": {}, "stages": {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as file:
+                self.state = json.load(file)
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(f"{self.state_path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(self.state, file, indent=1, sort_keys=True)
+        os.replace(f"{self.state_path}.tmp", self.state_path)
+
+    def _fingerprint(self, path: str):
+        """Content hash of a file, reusing the cached hash while size and mtime are unchanged."""
+        full = os.path.join(self.root, path)
+        if not os.path.isfile(full):
+            return None
+        stat = os.stat(full)
+        cached = self.state["files"].get(path)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha1"]
+        sha1 = _file_hash(full)
+        self.state["files"][path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": sha1}
+        return sha1
+
+    def stage_key(self, stage: Stage) -> str:
+        digest = hashlib.sha1(json.dumps([stage.script, stage.args]).encode())
+        for path in sorted({path for pattern in stage.inputs for path in _expand(self.root, pattern)}):
+            digest.update(f"{path}\0{self._fingerprint(path)}\n".encode())
+        return digest.hexdigest()
+
+    def stale_reason(self, stage: Stage, key: str) -> str:
+        """Why the stage has to run, or None if it is up to date."""
+        missing = [path for path in stage.outputs if not os.path.exists(os.path.join(self.root, path))]
+        if missing:
+            return f"missing {', '.join(missing)}"
+        if self.state["stages"].get(stage.name, {}).get("key") != key:
+            return "inputs changed"
+        return None
+
+    def selected(self, targets: list = None) -> list:
+        """Target stages and everything upstream of them, in declaration order."""
+        if not targets:
+            return list(self.stages)
+        unknown = set(targets) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}. Known: {', '.join(self.stages)}")
+        selected, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending += self.dependencies[name]
+        return [name for name in self.stages if name in selected]
+
+    def _run_stage(self, stage: Stage) -> subprocess.CompletedProcess:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.join(self.root, "src"), env.get("PYTHONPATH")]))
+        return subprocess.run(stage.command(self.workers), cwd=os.path.join(self.root, "scripts"), env=env, capture_output=True, text=True)
+
+    def run(self, targets: list = None, force: bool = False, dry_run: bool = False) -> dict:
+        """
+        Run the selected stages.
+
+        A stage is checked only once all of its dependencies have finished, so
+        it sees their fresh outputs. A failed stage skips everything downstream of it.
+
+        Returns:
+        - dict: Outcome per stage (``ran``, ``skipped``, ``failed``, ``blocked`` or, with ``dry_run``, ``stale``).
+        """
+        names = self.selected(targets)
+        outcome = {}
+        running = {}  # future -> (stage name, input key)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while len(outcome) < len(names):
+                progress = False
+                for name in names:
+                    dependencies = [dependency for dependency in self.dependencies[name] if dependency in names]
+                    if name in outcome or any(name == running_name for running_name, _ in running.values()):
+                        continue
+                    if not all(dependency in outcome for dependency in dependencies):
+                        continue
+                    progress = True
+
+                    stage = self.stages[name]
+                    if any(outcome[dependency] in ("failed", "blocked") for dependency in dependencies):
+                        outcome[name] = "blocked"
+                        print(f"[{name}] not run, a dependency failed")
+                        continue
+                    if dry_run and any(outcome[dependency] == "stale" for dependency in dependencies):
+                        outcome[name] = "stale"
+                        print(f"[{name}] would run after its dependencies")
+                        continue
+
+                    key = self.stage_key(stage)
+                    reason = "forced" if force else self.stale_reason(stage, key)
+                    if reason is None:
+                        outcome[name] = "skipped"
+                        print(f"[{name}] up to date")
+                    elif dry_run:
+                        outcome[name] = "stale"
+                        print(f"[{name}] would run: {reason}")
+                    else:
+                        print(f"[{name}] running ({reason}): {stage.description}")
+                        running[executor.submit(self._run_stage, stage)] = (name, key)
+
+                if not running:
+                    if not progress and len(outcome) < len(names):
+                        raise RuntimeError(f"Stages with circular dependencies: {', '.join(name for name in names if name not in outcome)}")
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = running.pop(future)
+                    result = future.result()
+                    output = (result.stdout + result.stderr).rstrip()
+                    if output:
+                        print("\n".join(f"[{name}] {line}" for line in output.splitlines()))
+                    if result.returncode == 0:
+                        self.state["stages"][name] = {"key": key}
+                        outcome[name] = "ran"
+                    else:
+                        outcome[name] = "failed"
+                        print(f"[{name}] failed with exit code {result.returncode}")
+                    self._save_state()
+
+        if not dry_run:
+            # Forget cached hashes of files that no longer exist
+            self.state["files"] = {path: entry for path, entry in self.state["files"].items() if os.path.exists(os.path.join(self.root, path))}
+            self._save_state()
+        return outcome
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Panel6 pipeline, rerunning only stages whose inputs changed.")
+    parser.add_argument("stages", nargs="*", help=f"Stages to bring up to date with their upstream stages (default: all of {', '.join(stage.name for stage in STAGES)})")
+    parser.add_argument("--root", default=".", help="Project root containing scripts/ and data/")
+    parser.add_argument("--jobs", type=int, default=2, help="Stages run at the same time")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used inside the parsing, segmentation and plotting stages")
+    parser.add_argument("--tables", choices=list(TABLES), default="wide",
+                        help="Session table layout written by the segment stage and read by the stages after it")
+    parser.add_argument("--force", action="store_true", help="Run the selected stages even if they are up to date")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages would run")
+    parser.add_argument("--list", action="store_true", help="List the stages with their inputs and outputs")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    pipeline = Pipeline(args.root, jobs=args.jobs, workers=args.workers, tables=args.tables)
+
+    if args.list:
+        for name, stage in pipeline.stages.items():
+            print(f"{name}: {stage.description}")
+            print(f"    after:   {', '.join(pipeline.dependencies[name]) or '-'}")
+            print(f"    inputs:  {', '.join(stage.inputs)}")
+            print(f"    outputs: {', '.join(stage.outputs)}")
+        return 0
+
+    try:
+        outcome = pipeline.run(args.stages, force=args.force, dry_run=args.dry_run)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    print(", ".join(f"{name}: {result}" for name, result in outcome.items()))
+    return 1 if any(result in ("failed", "blocked") for result in outcome.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import os
+import pandas as pd
+from panel6_stats.log_names import session_days, session_devices
+
+BASE_KEYS = ["SESSION_ID", "DAY", "EXHIBIT_ID", "ITEM_ID"]
+BASE_FILE = "base.csv"
+KEY_DTYPES = {"SESSION_ID": str, "DAY": str, "EXHIBIT_ID": str, "ITEM_ID": str}
+
+def _numeric_order(index: pd.Index) -> pd.Index:
+    """Sort key ordering numeric IDs stored as strings by value."""
+    return pd.to_numeric(index, errors="coerce")
+
+def _id_strings(column: pd.Series) -> pd.Series:
+    """IDs as strings, whether they were parsed as strings or read back from CSV as floats (``2064.0``)."""
+    column = column.astype(object)
+    numeric = column.map(lambda value: isinstance(value, float) and value.is_integer())
+    column = column.where(~numeric, column[numeric].map(lambda value: str(int(value))))
+    return column.map(str, na_action="ignore").where(column.notna(), None)
+
+class RollupCubes:
+    """
+    Pre-aggregated action metrics.
+
+    The base cube holds one row per (session, day, exhibit, item) with summed
+    action time, action count and the session duration. It is built in a
+    single grouped pass over the actions table and is small enough to keep.
+    Item, exhibit, session, day and device cubes are marginals of the base cube, so
+    they never rescan raw actions. Cubes are merged per session ID, which
+    makes incremental updates idempotent.
+    """
+
+    def __init__(self, base: pd.DataFrame):
+        self.base = base
+
+    @classmethod
+    def from_actions(cls, df: pd.DataFrame) -> "RollupCubes":
+        """Build the base cube from a wide actions table (``action_data_*.csv`` layout)."""
+        ids = {column: _id_strings(df[column]) for column in ("SESSION_ID", "EXHIBIT_ID", "ITEM_ID")}
+        df = df.assign(DAY=session_days(df["SESSION_ID"]).to_numpy(), **ids)
+        base = df.groupby(BASE_KEYS, dropna=False, observed=True, sort=False).agg(
+            ACTION_DURATION=("ACTION_DURATION", "sum"),
+            ACTION_COUNT=("ACTION", "count"),
+            SESSION_DURATION=("SESSION_DURATION", "first"),
+        ).reset_index()
+        return cls(base)
+
+    def merge(self, other: "RollupCubes") -> "RollupCubes":
+        """Combine with newer cubes, sessions present in ``other`` replace the ones here."""
+        kept = self.base[~self.base["SESSION_ID"].isin(other.base["SESSION_ID"])]
+        return RollupCubes(pd.concat([kept, other.base], ignore_index=True))
+
+    def items(self) -> pd.DataFrame:
+        """Total action time and action count per item."""
+        return self.base.dropna(subset=["ITEM_ID"]).groupby("ITEM_ID")[["ACTION_DURATION", "ACTION_COUNT"]].sum().sort_index(key=_numeric_order)
+
+    def exhibits(self) -> pd.DataFrame:
+        """Total action time, action count and distinct sessions per exhibit."""
+        return self.base.dropna(subset=["EXHIBIT_ID"]).groupby("EXHIBIT_ID").agg(
+            ACTION_DURATION=("ACTION_DURATION", "sum"),
+            ACTION_COUNT=("ACTION_COUNT", "sum"),
+            SESSIONS=("SESSION_ID", "nunique"),
+        ).sort_index(key=_numeric_order)
+
+    def sessions(self) -> pd.DataFrame:
+        """Day, duration, total action time and action count per session."""
+        return self.base.groupby("SESSION_ID", dropna=False).agg(
+            DAY=("DAY", "first"),
+            SESSION_DURATION=("SESSION_DURATION", "first"),
+            ACTION_DURATION=("ACTION_DURATION", "sum"),
+            ACTION_COUNT=("ACTION_COUNT", "sum"),
+        )
+
+    def devices(self) -> pd.DataFrame:
+        """Sessions, total session time and action count per device, from the kiosk tag of the session IDs."""
+        sessions = self.sessions()
+        return sessions.groupby(session_devices(sessions.index).to_numpy()).agg(
+            SESSIONS=("SESSION_DURATION", "size"),
+            SESSION_DURATION=("SESSION_DURATION", "sum"),
+            ACTION_COUNT=("ACTION_COUNT", "sum"),
+        ).rename_axis("DEVICE")
+
+    def days(self) -> pd.DataFrame:
+        """Sessions, total session time and action count per day."""
+        return self.sessions().groupby("DAY").agg(
+            SESSIONS=("SESSION_DURATION", "size"),
+            SESSION_DURATION=("SESSION_DURATION", "sum"),
+            ACTION_COUNT=("ACTION_COUNT", "sum"),
+        )
+
+    def time_metrics(self) -> pd.DataFrame:
+        """The ``time_metrics.csv`` table: time spent and interactions per item."""
+        items = self.items()
+        return pd.DataFrame({
+            "Total Time Spent (s)": items["ACTION_DURATION"],
+            "Number of Interactions": items["ACTION_COUNT"]
+        }).fillna(0)
+
+    def save(self, directory):
+        """Persist the base cube and its derived cubes as CSV."""
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f"{BASE_FILE}.tmp")
+        self.base.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(directory, BASE_FILE))
+
+        self.items().to_csv(os.path.join(directory, "items.csv"))
+        self.exhibits().to_csv(os.path.join(directory, "exhibits.csv"))
+        self.sessions().to_csv(os.path.join(directory, "sessions.csv"))
+        self.days().to_csv(os.path.join(directory, "days.csv"))
+        self.devices().to_csv(os.path.join(directory, "devices.csv"))
+
+    @classmethod
+    def load(cls, directory) -> "RollupCubes":
+        return cls(pd.read_csv(os.path.join(directory, BASE_FILE), dtype=KEY_DTYPES, float_precision="round_trip"))
+
+    @classmethod
+    def update(cls, directory, df: pd.DataFrame, replace: bool = False) -> "RollupCubes":
+        """Merge the actions of newly segmented sessions into the cubes stored in ``directory``."""
+        cubes = cls.from_actions(df)
+        if not replace and os.path.exists(os.path.join(directory, BASE_FILE)):
+            cubes = cls.load(directory).merge(cubes)
+        cubes.save(directory)
+        return cubes
@@ -0,0 +1,214 @@
+import os
+import numpy as np
+import pandas as pd
+from panel6_stats.log_names import session_epochs
+
+# Sessions without an epoch tag in their ID sort first and fall outside every time window
+NO_EPOCH = np.iinfo(np.int64).min
+
+def _int_ids(column: pd.Series):
+    """Numeric IDs (ExhibitID/ItemID, read as strings or floats) as int64 and the mask of rows having one."""
+    numeric = pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64)
+    valid = ~np.isnan(numeric)
+    return numeric[valid].astype(np.int64), valid
+
+def _epoch_ms(value) -> int:
+    return pd.Timestamp(value).value // 1_000_000
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+class _Postings:
+    """Compressed postings lists: sorted unique ``keys`` and the rows of each key in ``values[indptr[i]:indptr[i + 1]]``."""
+
+    def __init__(self, keys: np.ndarray, rows: np.ndarray, unique: bool = False):
+        order = np.lexsort((rows, keys))
+        keys, rows = keys[order], rows[order]
+        if unique and len(keys):
+            keep = np.ones(len(keys), dtype=bool)
+            keep[1:] = (keys[1:] != keys[:-1]) | (rows[1:] != rows[:-1])
+            keys, rows = keys[keep], rows[keep]
+
+        self.keys, starts = np.unique(keys, return_index=True)
+        self.indptr = _readonly(np.append(starts, len(keys)).astype(np.int64))
+        self.values = _readonly(rows.astype(np.int64))
+        self._empty = self.values[:0]
+
+    def get(self, key) -> np.ndarray:
+        """Rows of ``key`` in increasing order (a read-only view), empty if the key is unknown."""
+        position = np.searchsorted(self.keys, key)
+        if position == len(self.keys) or self.keys[position] != key:
+            return self._empty
+        return self.values[self.indptr[position]:self.indptr[position + 1]]
+
+    def counts(self) -> pd.Series:
+        return pd.Series(np.diff(self.indptr), index=self.keys)
+
+class SessionStore:
+    """
+    Session, event and action tables loaded once and indexed for queries.
+
+    Sessions are ordered in time: by the epoch tag of their log file, then by
+    ``SESSION_START`` within the file (log timestamps are relative to the app
+    start, so the file epoch is the only absolute clock). Events and actions
+    are grouped by session in that order, so row numbers are chronological
+    and the rows of a session or of a time window are one contiguous range.
+
+    Indexes:
+
+    - ``ExhibitID -> sessions`` and ``ExhibitID -> events`` postings
+    - ``ItemID -> actions`` postings
+    - session epochs (sorted) with event/action offsets per session
+    - actions by descending ``ACTION_DURATION``, built on first use
+
+    Queries return row positions as read-only NumPy views into the indexes;
+    ``sessions``, ``events`` and ``actions`` (or ``frame``) turn them into rows
+    only when needed. Time bounds accept anything ``pandas.Timestamp`` accepts
+    and select sessions whose log file started in ``[start, end)``.
+    """
+
+    def __init__(self, events: pd.DataFrame, actions: pd.DataFrame):
+        """
+        Parameters:
+        - events (pandas.DataFrame): Wide session table (``session_data_*.csv`` layout).
+        - actions (pandas.DataFrame): Wide action table (``action_data_*.csv`` layout).
+        """
+        sessions = events.groupby("SESSION_ID", sort=False).agg(
+            SESSION_START=("SESSION_START", "first"),
+            SESSION_END=("SESSION_END", "first"),
+            SESSION_DURATION=("SESSION_DURATION", "first"),
+        ).reset_index()
+        sessions["EPOCH_MS"] = session_epochs(sessions["SESSION_ID"]).fillna(NO_EPOCH).to_numpy(dtype=np.int64)
+        order = np.lexsort((sessions["SESSION_START"].to_numpy(), sessions["EPOCH_MS"].to_numpy()))
+        self.sessions = sessions.take(order).reset_index(drop=True)
+        self._ids = pd.Index(self.sessions["SESSION_ID"].astype(str))
+        self.epochs = _readonly(self.sessions["EPOCH_MS"].to_numpy(dtype=np.int64))
+
+        self.events, self.event_offsets, event_sessions = self._group(events, "EVENT_START")
+        self.actions, self.action_offsets, _ = self._group(actions, "ACTION_TIMESTAMP")
+
+        exhibits, valid = _int_ids(self.events["EXHIBIT_ID"])
+        event_rows = np.flatnonzero(valid)
+        self.exhibit_events = _Postings(exhibits, event_rows)
+        self.exhibit_sessions = _Postings(exhibits, event_sessions[event_rows], unique=True)
+
+        items, valid = _int_ids(self.actions["ITEM_ID"])
+        self.item_actions = _Postings(items, np.flatnonzero(valid))
+
+        self._rows = _readonly(np.arange(max(len(self.sessions), len(self.events), len(self.actions)), dtype=np.int64))
+        self._duration_order = None
+
+    def _group(self, df: pd.DataFrame, time_column: str):
+        """Rows of ``df`` grouped by session in session order, the row offsets of each session and the session of each row."""
+        session_rows = self._ids.get_indexer(df["SESSION_ID"].astype(str))
+        order = np.lexsort((df[time_column].to_numpy(), session_rows))
+        session_rows = session_rows[order]
+        offsets = _readonly(np.searchsorted(session_rows, np.arange(len(self.sessions) + 1)).astype(np.int64))
+        return df.take(order).reset_index(drop=True), offsets, session_rows
+
+    @classmethod
+    def load(cls, directory, version: str = "new") -> "SessionStore":
+        """
+        Load the session tables written by preprocess_logs to ``directory``.
+
+        Uses the wide tables (``session_data``/``action_data``) when present,
+        otherwise joins the normalized ``sessions``/``events``/``actions`` tables.
+        """
+        path = lambda name: os.path.join(str(directory), f"{name}_{version}.csv")
+        if os.path.exists(path("session_data")):
+            return cls(pd.read_csv(path("session_data")), pd.read_csv(path("action_data")))
+        return cls.from_normalized(pd.read_csv(path("sessions")), pd.read_csv(path("events")), pd.read_csv(path("actions")))
+
+    @classmethod
+    def from_normalized(cls, sessions: pd.DataFrame, events: pd.DataFrame, actions: pd.DataFrame) -> "SessionStore":
+        """Build the store from the normalized tables (``SESSION_KEY``/``EVENT_KEY`` references)."""
+        events = events.merge(sessions, on="SESSION_KEY", how="left", sort=False)
+        actions = actions.merge(events, on="EVENT_KEY", how="left", sort=False)
+        return cls(events, actions)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def _window(self, start, end):
+        """Session rows ``[lo, hi)`` whose log file started in ``[start, end)``."""
+        lo = 0 if start is None else int(np.searchsorted(self.epochs, _epoch_ms(start)))
+        hi = len(self.epochs) if end is None else int(np.searchsorted(self.epochs, _epoch_ms(end)))
+        return lo, max(lo, hi)
+
+    @staticmethod
+    def _between(rows: np.ndarray, lo: int, hi: int) -> np.ndarray:
+        return rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+
+    def _session_row(self, session_id) -> int:
+        try:
+            return self._ids.get_loc(str(session_id))
+        except KeyError:
+            return -1
+
+    def session_rows(self, session_ids) -> np.ndarray:
+        """Rows of the given session IDs, -1 for unknown IDs."""
+        return self._ids.get_indexer(pd.Index(np.atleast_1d(session_ids)).astype(str))
+
+    def sessions_between(self, start=None, end=None) -> np.ndarray:
+        """Sessions whose log file started in ``[start, end)``."""
+        lo, hi = self._window(start, end)
+        return self._rows[lo:hi]
+
+    def actions_between(self, start=None, end=None) -> np.ndarray:
+        """Actions of the sessions whose log file started in ``[start, end)``."""
+        lo, hi = self._window(start, end)
+        return self._rows[self.action_offsets[lo]:self.action_offsets[hi]]
+
+    def sessions_with_exhibit(self, exhibit_id, start=None, end=None) -> np.ndarray:
+        """Sessions that opened content of ``exhibit_id``, optionally within a time window."""
+        rows = self.exhibit_sessions.get(int(exhibit_id))
+        if start is None and end is None:
+            return rows
+        return self._between(rows, *self._window(start, end))
+
+    def events_with_exhibit(self, exhibit_id, start=None, end=None) -> np.ndarray:
+        """Content events of ``exhibit_id``, optionally within a time window."""
+        rows = self.exhibit_events.get(int(exhibit_id))
+        if start is None and end is None:
+            return rows
+        lo, hi = self._window(start, end)
+        return self._between(rows, self.event_offsets[lo], self.event_offsets[hi])
+
+    def actions_on_item(self, item_id, start=None, end=None) -> np.ndarray:
+        """Actions on ``item_id``, optionally within a time window."""
+        rows = self.item_actions.get(int(item_id))
+        if start is None and end is None:
+            return rows
+        lo, hi = self._window(start, end)
+        return self._between(rows, self.action_offsets[lo], self.action_offsets[hi])
+
+    def session_events(self, session_id) -> np.ndarray:
+        row = self._session_row(session_id)
+        return self._rows[:0] if row < 0 else self._rows[self.event_offsets[row]:self.event_offsets[row + 1]]
+
+    def session_actions(self, session_id) -> np.ndarray:
+        row = self._session_row(session_id)
+        return self._rows[:0] if row < 0 else self._rows[self.action_offsets[row]:self.action_offsets[row + 1]]
+
+    def visited(self, session_id, exhibit_id) -> bool:
+        """Whether a session opened content of ``exhibit_id``."""
+        row = self._session_row(session_id)
+        rows = self.exhibit_sessions.get(int(exhibit_id))
+        position = np.searchsorted(rows, row)
+        return bool(row >= 0 and position < len(rows) and rows[position] == row)
+
+    def actions_by_duration(self, with_item: bool = False) -> np.ndarray:
+        """Actions by descending ``ACTION_DURATION`` (ties in time order), only those on an item with ``with_item``."""
+        if self._duration_order is None:
+            durations = self.actions["ACTION_DURATION"].to_numpy(dtype=np.float64)
+            self._duration_order = _readonly(np.argsort(-durations, kind="stable"))
+        if not with_item:
+            return self._duration_order
+        has_item = np.zeros(len(self.actions), dtype=bool)
+        has_item[self.item_actions.values] = True
+        return self._duration_order[has_item[self._duration_order]]
+
+    def frame(self, table: str, rows) -> pd.DataFrame:
+        """Rows of ``sessions``, ``events`` or ``actions`` as a DataFrame."""
+        return getattr(self, table).iloc[rows]
@@ -0,0 +1,482 @@
+import os
+import copy
+import json
+import zlib
+import base64
+import numpy as np
+import pandas as pd
+from panel6_stats.rollups import _id_strings
+from panel6_stats.log_names import session_days, session_devices
+
+DURATION_BIN_SECONDS = 10  # Histogram resolution, thresholds on multiples of it are exact
+SHORT_SESSION_SECONDS = 1500  # Cut-off of the "filtered" report numbers and plots
+UNDATED = "undated"  # Day of files/sessions without an epoch tag
+
+class _Buckets:
+    """Counts (and optionally value sums) of consecutive integer keys starting at ``offset``."""
+
+    def __init__(self, with_sums: bool = False):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros(0, dtype=np.float64) if with_sums else None
+
+    def _extend(self, lo: int, hi: int):
+        """Grow the arrays so keys ``lo..hi`` fit."""
+        if not len(self.counts):
+            self.offset = lo
+        start = min(lo, self.offset)
+        stop = max(hi + 1, self.offset + len(self.counts))
+        before, after = self.offset - start, stop - self.offset - len(self.counts)
+        if before or after:
+            self.counts = np.pad(self.counts, (before, after))
+            if self.sums is not None:
+                self.sums = np.pad(self.sums, (before, after))
+            self.offset = start
+
+    def add(self, keys: np.ndarray, values: np.ndarray = None):
+        if not len(keys):
+            return
+        self._extend(int(keys.min()), int(keys.max()))
+        positions = keys - self.offset
+        self.counts += np.bincount(positions, minlength=len(self.counts))
+        if self.sums is not None:
+            self.sums += np.bincount(positions, weights=values, minlength=len(self.sums))
+
+    def merge(self, other: "_Buckets"):
+        if not len(other.counts):
+            return
+        self._extend(other.offset, other.offset + len(other.counts) - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + len(other.counts)] += other.counts
+        if self.sums is not None:
+            self.sums[start:start + len(other.sums)] += other.sums
+
+    def keys(self) -> np.ndarray:
+        return np.arange(self.offset, self.offset + len(self.counts))
+
+    def to_dict(self) -> dict:
+        # Only occupied keys are stored, a day's durations may span thousands of mostly empty bins
+        occupied = np.flatnonzero(self.counts)
+        state = {"keys": (occupied + self.offset).tolist(), "counts": self.counts[occupied].tolist()}
+        if self.sums is not None:
+            state["sums"] = self.sums[occupied].tolist()
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "_Buckets":
+        buckets = cls(with_sums="sums" in state)
+        keys = np.asarray(state["keys"], dtype=np.int64)
+        buckets.add(keys)
+        buckets.counts[keys - buckets.offset] = state["counts"]
+        if buckets.sums is not None:
+            buckets.sums[keys - buckets.offset] = state["sums"]
+        return buckets
+
+def _finite(values) -> np.ndarray:
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+    return values[np.isfinite(values)]
+
+class QuantileSketch:
+    """
+    Quantiles with a bounded relative error (a DDSketch).
+
+    Positive values fall into logarithmic buckets ``(gamma^(k-1), gamma^k]``
+    with ``gamma = (1 + a) / (1 - a)``, so any quantile is returned within a
+    relative error ``a`` of the true value. Values below ``min_value`` (zero
+    durations) are counted apart and reported as 0. Count, sum, min and max
+    are exact. Sketches with the same accuracy merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.buckets = _Buckets()
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values) -> "QuantileSketch":
+        values = _finite(values)
+        if not len(values):
+            return self
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        positive = values[values >= self.min_value]
+        self.zeros += len(values) - len(positive)
+        self.buckets.add(np.ceil(np.log(positive) / np.log(self.gamma)).astype(np.int64))
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if (other.relative_accuracy, other.min_value) != (self.relative_accuracy, self.min_value):
+            raise ValueError("Cannot merge quantile sketches with different accuracy")
+        self.buckets.merge(other.buckets)
+        self.zeros += other.zeros
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile ``q`` (0 to 1), NaN if the sketch is empty."""
+        if not self.count:
+            return np.nan
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            value = 0.0
+        else:
+            position = np.searchsorted(self.zeros + np.cumsum(self.buckets.counts), rank, side="right")
+            key = self.buckets.offset + min(position, len(self.buckets.counts) - 1)
+            value = 2 * self.gamma ** key / (self.gamma + 1)
+        return float(np.clip(value, self.min, self.max))
+
+    def quantiles(self, qs) -> pd.Series:
+        return pd.Series([self.quantile(q) for q in qs], index=list(qs))
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else np.nan
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "buckets": self.buckets.to_dict(),
+            "zeros": self.zeros,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "QuantileSketch":
+        sketch = cls(state["relative_accuracy"], state["min_value"])
+        sketch.buckets = _Buckets.from_dict(state["buckets"])
+        sketch.zeros = state["zeros"]
+        sketch.count = state["count"]
+        sketch.sum = state["sum"]
+        if sketch.count:
+            sketch.min, sketch.max = state["min"], state["max"]
+        return sketch
+
+class Histogram:
+    """
+    Fixed-width histogram with per-bin counts and value sums.
+
+    Bin ``k`` holds values in ``[k * width, (k + 1) * width)`` and bins are
+    created as values arrive, so the range is unbounded. Counts and means
+    below a multiple of ``width`` are exact. Histograms with the same width
+    merge by adding bins.
+    """
+
+    def __init__(self, width: float):
+        self.width = float(width)
+        self.buckets = _Buckets(with_sums=True)
+
+    def update(self, values) -> "Histogram":
+        values = _finite(values)
+        self.buckets.add(np.floor(values / self.width).astype(np.int64), values)
+        return self
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        if other.width != self.width:
+            raise ValueError(f"Cannot merge histograms of bin width {self.width} and {other.width}")
+        self.buckets.merge(other.buckets)
+        return self
+
+    def _below(self, upper) -> np.ndarray:
+        """Mask of the bins holding values below ``upper``, which must be a bin edge."""
+        keys = self.buckets.keys()
+        if upper is None:
+            return np.ones(len(keys), dtype=bool)
+        edge = upper / self.width
+        if edge != np.floor(edge):
+            raise ValueError(f"{upper} is not a multiple of the bin width {self.width}")
+        return keys < edge
+
+    def count(self, upper: float = None) -> int:
+        """Number of values, only those below ``upper`` if given."""
+        return int(self.buckets.counts[self._below(upper)].sum())
+
+    def mean(self, upper: float = None) -> float:
+        """Exact mean of the values, only those below ``upper`` if given."""
+        below = self._below(upper)
+        count = self.buckets.counts[below].sum()
+        return float(self.buckets.sums[below].sum() / count) if count else np.nan
+
+    def bins(self, bins: int = 25, upper: float = None):
+        """
+        Counts regrouped into at most ``bins`` equal bins spanning the occupied range.
+
+        Returns:
+        - numpy.ndarray: Bin edges, ``len(counts) + 1`` values.
+        - numpy.ndarray: Count of each bin.
+        """
+        counts = self.buckets.counts[self._below(upper)]
+        occupied = np.flatnonzero(counts)
+        if not len(occupied):
+            return np.zeros(1), np.zeros(0, dtype=np.int64)
+        counts = counts[occupied[0]:occupied[-1] + 1]
+        step = -(-len(counts) // bins)
+        counts = np.pad(counts, (0, -len(counts) % step)).reshape(-1, step).sum(axis=1)
+        edges = (self.buckets.offset + occupied[0] + step * np.arange(len(counts) + 1)) * self.width
+        return edges, counts
+
+    def to_dict(self) -> dict:
+        return {"width": self.width, "buckets": self.buckets.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "Histogram":
+        histogram = cls(state["width"])
+        histogram.buckets = _Buckets.from_dict(state["buckets"])
+        return histogram
+
+def _hash64(values) -> np.ndarray:
+    """Stable 64-bit hashes of IDs, the same whether they were read as strings or floats."""
+    ids = _id_strings(pd.Series(values, dtype=object)).dropna()
+    return pd.util.hash_pandas_object(ids, index=False).to_numpy(dtype=np.uint64)
+
+def _leading_zeros(words: np.ndarray) -> np.ndarray:
+    """Leading zero bits of each uint64."""
+    words = words.copy()
+    zeros = np.zeros(len(words), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (words >> np.uint64(64 - shift)) == 0
+        zeros[empty] += shift
+        words[empty] <<= np.uint64(shift)
+    zeros[words == 0] = 64
+    return zeros
+
+class DistinctCounter:
+    """
+    Approximate number of distinct IDs (a HyperLogLog).
+
+    ``2^precision`` one-byte registers (4 KB by default) give a standard
+    error of about ``1.04 / sqrt(2^precision)``, 1.6%. Small counts use
+    linear counting and are nearly exact. Counters merge by taking the
+    register-wise maximum, so IDs seen on several days count once.
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values) -> "DistinctCounter":
+        hashes = _hash64(values)
+        if not len(hashes):
+            return self
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rank = np.minimum(_leading_zeros(hashes << np.uint64(self.precision)), 64 - self.precision) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+        return self
+
+    def merge(self, other: "DistinctCounter") -> "DistinctCounter":
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge distinct counters of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            return int(round(m * np.log(m / empty)))
+        return int(round(raw))
+
+    def to_dict(self) -> dict:
+        # Registers of small shards are mostly zero and compress to a few hundred bytes
+        registers = base64.b64encode(zlib.compress(self.registers.tobytes())).decode("ascii")
+        return {"precision": self.precision, "registers": registers}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "DistinctCounter":
+        counter = cls(state["precision"])
+        counter.registers = np.frombuffer(zlib.decompress(base64.b64decode(state["registers"])), dtype=np.uint8).copy()
+        return counter
+
+class Counts:
+    """Named exact counters, merged by addition."""
+
+    def __init__(self, **counts):
+        self.counts = {name: int(value) for name, value in counts.items()}
+
+    def __getitem__(self, name) -> int:
+        return self.counts.get(name, 0)
+
+    def merge(self, other: "Counts") -> "Counts":
+        for name, value in other.counts.items():
+            self.counts[name] = self[name] + value
+        return self
+
+    def to_dict(self) -> dict:
+        return {"counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "Counts":
+        return cls(**state["counts"])
+
+SKETCH_TYPES = {cls.__name__: cls for cls in (QuantileSketch, Histogram, DistinctCounter, Counts)}
+
+class SketchSet:
+    """Named sketches of one shard (e.g. one day), merged name by name."""
+
+    def __init__(self, sketches: dict = None):
+        self.sketches = dict(sketches or {})
+
+    def __getitem__(self, name):
+        return self.sketches[name]
+
+    def __contains__(self, name):
+        return name in self.sketches
+
+    def __bool__(self):
+        return bool(self.sketches)
+
+    def merge(self, other: "SketchSet") -> "SketchSet":
+        for name, sketch in other.sketches.items():
+            if name in self.sketches:
+                self.sketches[name].merge(sketch)
+            else:
+                self.sketches[name] = copy.deepcopy(sketch)
+        return self
+
+    def to_dict(self) -> dict:
+        return {name: {"type": type(sketch).__name__, **sketch.to_dict()} for name, sketch in self.sketches.items()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "SketchSet":
+        return cls({name: SKETCH_TYPES[sketch["type"]].from_dict(sketch) for name, sketch in state.items()})
+
+class DailySketches:
+    """
+    Sketch sets per day and device, persisted as one JSON file.
+
+    Shards are keyed by ``(day, device)``, the day and kiosk tag of the log
+    files. Newly processed files are folded in with ``update``; ``total``
+    merges shards (all of them, or some days and/or devices) into the
+    sketches of the whole archive. ``state`` is free-form bookkeeping of the
+    writer, e.g. how many rows have been folded in, to tell whether the
+    sketches are up to date.
+    """
+
+    FORMAT = 2  # Files of another format load as empty sketches, which makes writers rebuild them
+
+    def __init__(self, shards: dict = None, state: dict = None):
+        self.shards = dict(shards or {})
+        self.state = dict(state or {})
+
+    @property
+    def days(self) -> list:
+        return sorted({day for day, _ in self.shards})
+
+    @property
+    def devices(self) -> list:
+        return sorted({device for _, device in self.shards})
+
+    def update(self, shards: dict) -> "DailySketches":
+        """Merge ``{(day, device): SketchSet}`` into the stored shards."""
+        for key, sketches in shards.items():
+            self.shards.setdefault(key, SketchSet()).merge(sketches)
+        return self
+
+    def total(self, days=None, devices=None) -> SketchSet:
+        """Sketches of the given days and devices (all by default) merged into one set."""
+        total = SketchSet()
+        for (day, device), sketches in sorted(self.shards.items()):
+            if (days is None or day in days) and (devices is None or device in devices):
+                total.merge(sketches)
+        return total
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        days = {}
+        for (day, device), sketches in sorted(self.shards.items()):
+            days.setdefault(day, {})[device] = sketches.to_dict()
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump({"format": self.FORMAT, "state": self.state, "days": days}, file)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path) -> "DailySketches":
+        """Stored sketches, empty if ``path`` does not exist or has another format."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as file:
+            state = json.load(file)
+        if state.get("format") != cls.FORMAT:
+            return cls()
+        shards = {
+            (day, device): SketchSet.from_dict(sketches)
+            for day, devices in state["days"].items()
+            for device, sketches in devices.items()
+        }
+        return cls(shards, state["state"])
+
+def _shards(ids) -> list:
+    """Day and device of each log filename or session ID, the ``groupby`` keys of the ``(day, device)`` shards."""
+    ids = pd.Series(ids, dtype=object).astype(str).str.replace(r"\.json$", "", regex=True)
+    return [session_days(ids).fillna(UNDATED).to_numpy(), session_devices(ids).to_numpy()]
+
+def log_sketches(df_metrics: pd.DataFrame) -> dict:
+    """
+    Sketches of the per-file metrics (``logs_metrics_*.csv`` rows), by day and device of the log file.
+
+    Returns:
+    - dict: ``{(day, device): SketchSet}`` with the duration quantiles and
+      histogram, the histograms of actions per file (all and under
+      ``SHORT_SESSION_SECONDS``) and the file counts by completeness/version.
+    """
+    if df_metrics.empty:
+        return {}
+    shards = {}
+    for shard, df in df_metrics.groupby(_shards(df_metrics["filename"]), sort=True):
+        duration = df["duration"].to_numpy(dtype=np.float64)
+        complete, new = df["is_complete"].astype(bool), df["is_new"].astype(bool)
+        shards[shard] = SketchSet({
+            "duration": QuantileSketch().update(duration),
+            "duration_histogram": Histogram(DURATION_BIN_SECONDS).update(duration),
+            "actions_histogram": Histogram(1).update(df["num_actions"]),
+            "short_actions_histogram": Histogram(1).update(df["num_actions"][duration < SHORT_SESSION_SECONDS]),
+            "files": Counts(
+                total=len(df), complete=complete.sum(), new=new.sum(), new_complete=(complete & new).sum()
+            ),
+        })
+    return shards
+
+def table_sketches(session_df: pd.DataFrame, action_df: pd.DataFrame) -> dict:
+    """
+    Sketches of segmented sessions, by day and device of their source log file.
+
+    ``session_df`` and ``action_df`` are wide tables (``session_data_*.csv``
+    and ``action_data_*.csv`` layouts).
+
+    Returns:
+    - dict: ``{(day, device): SketchSet}`` with session, event and action
+      duration quantiles, the session duration histogram and distinct
+      sessions, items and exhibits.
+    """
+    shard_events = dict(list(session_df.groupby(_shards(session_df["SESSION_ID"]), sort=False)))
+    shard_actions = dict(list(action_df.groupby(_shards(action_df["SESSION_ID"]), sort=False)))
+    shards = {}
+    for shard in sorted(set(shard_events) | set(shard_actions)):
+        events = shard_events.get(shard, session_df.iloc[:0])
+        actions = shard_actions.get(shard, action_df.iloc[:0])
+        sessions = events.drop_duplicates("SESSION_ID")
+        shards[shard] = SketchSet({
+            "session_duration": QuantileSketch().update(sessions["SESSION_DURATION"]),
+            "session_duration_histogram": Histogram(DURATION_BIN_SECONDS).update(sessions["SESSION_DURATION"]),
+            "event_duration": QuantileSketch().update(events["EVENT_DURATION"]),
+            "action_duration": QuantileSketch().update(actions["ACTION_DURATION"]),
+            "sessions": DistinctCounter().update(sessions["SESSION_ID"]),
+            "exhibits": DistinctCounter().update(events["EXHIBIT_ID"]),
+            "items": DistinctCounter().update(actions["ITEM_ID"]),
+        })
+    return shards
@@ -1,26 +1,23 @@
 import pandas as pd
 import matplotlib.pyplot as plt
+from panel6_stats.rollups import RollupCubes
 
 def time_metrics(df):
+    # df is an actions table or RollupCubes built from one
+    cubes = df if isinstance(df, RollupCubes) else RollupCubes.from_actions(df)
+    items = cubes.items()
+
     # Time per Item
-    time_per_item = df.groupby("ITEM_ID")["ACTION_DURATION"].sum().dropna()
-    time_per_item.plot(kind="bar", title="Total Time Spent per Item", xlabel="Item ID", ylabel="Time Spent (seconds)")
+    items["ACTION_DURATION"].plot(kind="bar", title="Total Time Spent per Item", xlabel="Item ID", ylabel="Time Spent (seconds)")
     plt.show()
 
     # Number of Interactions per Item
-    interactions_per_item = df.groupby("ITEM_ID")["ACTION"].count().dropna()
-    interactions_per_item.plot(kind="bar", title="Number of Interactions per Item", xlabel="Item ID", ylabel="Interaction Count")
+    items["ACTION_COUNT"].plot(kind="bar", title="Number of Interactions per Item", xlabel="Item ID", ylabel="Interaction Count")
     plt.show()
 
     # Overall Time per Session
-    session_durations = df.groupby("SESSION_ID")["SESSION_DURATION"].first()
-    session_durations.plot(kind="bar", title="Total Session Durations", xlabel="Session ID", ylabel="Duration (seconds)")
+    cubes.sessions()["SESSION_DURATION"].plot(kind="bar", title="Total Session Durations", xlabel="Session ID", ylabel="Duration (seconds)")
     plt.show()
 
     # Display numeric results in a table
-    result_df = pd.DataFrame({
-        "Total Time Spent (s)": time_per_item,
-        "Number of Interactions": interactions_per_item
-    }).fillna(0)
-
-    return result_df
\ No newline at end of file
+    return cubes.time_metrics()
\ No newline at end of file
@@ -0,0 +1,27 @@
+import os
+import sys
+import pytest
+
+# Scripts import each other as top-level modules and the package lives under src/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "scripts"), os.path.join(ROOT, "src")]
+
+@pytest.fixture(scope="session")
+def store(tmp_path_factory):
+    """LogStore written by the ingestion code from synthetic log files of two kiosks over a few days."""
+    from synthetic_logs import generate_logs
+    from log_store import LogStore, write_store
+    from preprocess_logs import process_log_file
+
+    directory = tmp_path_factory.mktemp("logs")
+    files = generate_logs(directory / "json", 40, sessions=3, events_per_session=4, seed=4, devices=2)
+    parsed = [process_log_file(path) for path in files]
+    good = [info["is_complete"] and info["is_new"] for _, info in parsed]
+    write_store(directory / "store", [columns for columns, _ in parsed], [info["filename"] for _, info in parsed], good)
+    return LogStore(directory / "store")
+
+@pytest.fixture(scope="session")
+def session_tables(store):
+    """Wide session and action tables of the good logs of ``store``, as preprocess_logs writes them."""
+    from preprocess_logs import segment_good_logs
+    return segment_good_logs(store)
@@ -0,0 +1,135 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from event_processor import SessionFSM, ArraySessionFSM, StreamingSessionFSM
+from action_vocab import ActionVocabulary
+from synthetic_logs import generate_log
+
+# Kiosk logs of the last pickle-based export, frozen as (action, x, y, time) object arrays; the pipeline no longer writes them
+LEGACY_LOGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "legacy_logs_new.pkl")
+
+def log_frame(events) -> pd.DataFrame:
+    """FSM input from ``(action, time)`` pairs or synthetic event dicts."""
+    if events and isinstance(events[0], dict):
+        events = [(event["action"], event["time"]) for event in events]
+    return pd.DataFrame({
+        "Action": pd.Series([action for action, _ in events], dtype=object),
+        "Timestamp": pd.Series([time for _, time in events], dtype=np.float64),
+    })
+
+def without_codes(sessions: list) -> list:
+    """ArraySessionFSM sessions without the action codes it keeps next to the actions."""
+    return [
+        {**session, "events": [{key: value for key, value in event.items() if key != "codes"} for event in session["events"]]}
+        for session in sessions
+    ]
+
+def assert_same_segmentation(df: pd.DataFrame):
+    reference = SessionFSM(df)
+    candidate = ArraySessionFSM(df)
+    assert without_codes(candidate.sessions) == reference.sessions
+
+    for expected, actual in zip(reference.generate_session_dataframe(), candidate.generate_session_dataframe()):
+        pd.testing.assert_frame_equal(actual, expected)
+
+    # The preprocessing path: action codes of a shared vocabulary
+    vocabulary = ActionVocabulary()
+    codes = vocabulary.encode(df["Action"].tolist())
+    coded = ArraySessionFSM(vocabulary=vocabulary)
+    coded.process_codes(codes, df["Timestamp"].to_numpy())
+    assert without_codes(coded.sessions) == reference.sessions
+
+    for expected, actual in zip(reference.generate_session_dataframe(), coded.generate_session_dataframe()):
+        pd.testing.assert_frame_equal(actual, expected)
+    return reference
+
+def legacy_logs() -> list:
+    with open(LEGACY_LOGS, "rb") as file:
+        logs = pickle.load(file)
+    return [log_frame([(row[0], float(row[3])) for row in log]) for log in logs]
+
+def test_legacy_logs():
+    sessions = 0
+    for df in legacy_logs():
+        sessions += len(assert_same_segmentation(df).sessions)
+    assert sessions > 0
+
+def test_store_logs(store):
+    vocabulary = ActionVocabulary(store.vocab)
+    sessions = 0
+    for (filename, log), (_, codes, times) in zip(store.iter_logs(), store.iter_codes()):
+        reference = assert_same_segmentation(log_frame(list(zip(log.action, log.time))))
+        sessions += len(reference.sessions)
+
+        # The segmentation path of preprocess_logs, on the store's own action codes
+        coded = ArraySessionFSM(vocabulary=vocabulary)
+        coded.process_codes(codes, times)
+        assert without_codes(coded.sessions) == reference.sessions, filename
+    assert sessions > 0
+
+@pytest.mark.parametrize("complete", [True, False], ids=["finish", "no-finish"])
+@pytest.mark.parametrize("new_version", [True, False], ids=["new-app", "old-app"])
+def test_synthetic_logs(complete, new_version):
+    rng = np.random.default_rng(6)
+    for _ in range(10):
+        events = generate_log(rng, sessions=3, events_per_session=4, complete=complete, new_version=new_version)
+        assert_same_segmentation(log_frame(events))
+
+START, END = SessionFSM.START_EVENT, SessionFSM.SESSION_END
+
+EDGE_CASES = {
+    "empty": [],
+    "back-to-back": [
+        (START, 1.0), ("Exhibit_Kitchen", 2.0), ("OpenContent_DB_ExhibitID_100_Page_1", 3.0),
+        ("CTRL_IMG_Medium_ItemID_2095", 4.0), ("UI_ClosePanoPagePanelClose_Button", 5.0), (END, 6.0),
+        (START, 6.0), ("touchDown_0", 6.5), ("MenuExhibitButton_Crematorium", 7.0), (END, 7.0),
+        (START, 7.0), (END, 7.0),
+    ],
+    "finish-before-start": [(END, 1.0), ("touchDown_0", 2.0), (START, 3.0), ("Timeline", 4.0), (END, 5.0)],
+    "start-while-active": [(START, 1.0), ("touchDown_0", 2.0), (START, 3.0), ("Exhibit_Star Camp", 4.0), (END, 5.0)],
+    "finish-in-content": [
+        (START, 1.0), ("Exhibit_Star Camp", 2.0), ("OpenContent_DB_ExhibitID_92_Page_1", 3.0),
+        ("UI_OpenZoomImage_Button", 4.0), (END, 5.0),
+    ],
+    "exhibit-change-without-content": [
+        (START, 1.0), ("Exhibit_Star Camp", 2.0), ("Exhibit_Kitchen", 3.0), ("MenuExhibitButton_Workshops", 4.0),
+        ("OpenContent_DB_Page_1", 5.0), ("CTRL_TXT_Medium", 6.0), ("UI_ClosePanoPagePanelClose_Button", 7.0), (END, 8.0),
+    ],
+    "no-finish": [(START, 1.0), ("Exhibit_Kitchen", 2.0), ("OpenContent_DB_ExhibitID_100_Page_1", 3.0)],
+}
+
+@pytest.mark.parametrize("events", EDGE_CASES.values(), ids=EDGE_CASES.keys())
+def test_edge_cases(events):
+    assert_same_segmentation(log_frame(events))
+
+def test_back_to_back_sessions_are_split():
+    reference = assert_same_segmentation(log_frame(EDGE_CASES["back-to-back"]))
+    assert [session["start_time"] for session in reference.sessions] == [1.0, 6.0, 7.0]
+    assert [session["start_index"] for session in reference.sessions] == [0, 6, 10]
+
+def test_streaming_matches_batch():
+    df = log_frame(generate_log(np.random.default_rng(8), sessions=4, events_per_session=3))
+    reference = SessionFSM(df)
+
+    streamer = StreamingSessionFSM()
+    closed = []
+    for start in range(0, len(df), 7):
+        batch = df.iloc[start:start + 7]
+        closed += streamer.feed_batch(batch["Action"].tolist(), batch["Timestamp"].tolist())
+    assert without_codes(closed) == reference.sessions
+
+def test_streaming_flush_is_eager():
+    streamer = StreamingSessionFSM()
+    assert streamer.feed(START, 1.0) == []
+    streamer.feed("Exhibit_Kitchen", 2.0)
+
+    # Flushing changes the state even if the result is dropped
+    streamer.flush()
+    assert streamer.current_session is None and streamer.fsm.current_state == "IDLE"
+    assert streamer.flush() == []
+
+    streamer.feed(START, 3.0)
+    abandoned = streamer.flush()
+    assert len(abandoned) == 1 and abandoned[0]["abandoned"] and abandoned[0]["end_time"] == 3.0
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from gap_segments import gap_segments, threshold_sweep, store_threshold_sweep, DEFAULT_THRESHOLDS, DURATION_BINS
+
+def reference_sweep(times, offsets, thresholds) -> pd.DataFrame:
+    """The sweep computed by segmenting the logs again for every threshold."""
+    rows = []
+    for threshold in np.sort(thresholds):
+        durations = gap_segments(times, offsets, threshold)["DURATION"].to_numpy()
+        rows.append([
+            threshold, len(durations), durations.sum(), durations.mean(), *np.percentile(durations, [50, 90]),
+            *np.histogram(durations, bins=DURATION_BINS)[0],
+        ])
+    labels = [f"DURATION_{low:g}-{high:g}s" for low, high in zip(DURATION_BINS[:-1], DURATION_BINS[1:])]
+    columns = ["THRESHOLD", "SESSIONS", "TOTAL_DURATION", "MEAN_DURATION", "MEDIAN_DURATION", "P90_DURATION", *labels]
+    return pd.DataFrame(rows, columns=columns).set_index("THRESHOLD")
+
+def clock(seed: int, size: int = 20000):
+    """Timestamps of several logs with bursts, long pauses and a clock reset."""
+    rng = np.random.default_rng(seed)
+    gaps = np.where(rng.random(size) < 0.05, rng.exponential(400, size), rng.exponential(8, size))
+    times = np.cumsum(gaps)
+    times[size // 2:] -= times[size // 2] + 100  # App restarted within a log
+    offsets = np.array([0, 3000, 3000, 11000, size])  # Includes an empty log
+    return times, offsets
+
+@pytest.mark.parametrize("thresholds", [DEFAULT_THRESHOLDS, np.arange(5, 600, 25.0)], ids=["default", "fine"])
+def test_sweep_matches_resegmenting(thresholds):
+    times, offsets = clock(1)
+    pd.testing.assert_frame_equal(threshold_sweep(times, offsets, thresholds), reference_sweep(times, offsets, thresholds), check_dtype=False, rtol=1e-9)
+
+def test_thresholds_equal_to_gaps():
+    # A gap equal to the threshold does not split
+    times, offsets = clock(2, size=500)
+    times = np.round(times, 1)
+    thresholds = np.unique(np.diff(times)[:40])
+    pd.testing.assert_frame_equal(threshold_sweep(times, offsets, thresholds), reference_sweep(times, offsets, thresholds), check_dtype=False, rtol=1e-9)
+
+def test_store_sweep(store):
+    for good_only in (False, True):
+        times, offsets = store.column("time", good_only), store.offsets(good_only)
+        pd.testing.assert_frame_equal(
+            store_threshold_sweep(store, good_only=good_only), reference_sweep(times, offsets, DEFAULT_THRESHOLDS), check_dtype=False, rtol=1e-9
+        )
+
+def test_empty_sweep():
+    sweep = threshold_sweep(np.zeros(0), np.zeros(1, dtype=np.int64))
+    assert (sweep["SESSIONS"] == 0).all() and sweep["MEDIAN_DURATION"].isna().all()
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from heatmap import TouchHeatmap, store_footprint, SCREEN_WIDTH, SCREEN_HEIGHT
+
+def reference_counts(x, y, width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT, bin_size: int = 1) -> np.ndarray:
+    """Counts of the on-screen touches by ``np.histogram2d`` over truncated pixel positions."""
+    x, y = np.asarray(x).astype(np.int64), np.asarray(y).astype(np.int64)
+    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    rows, cols = -(-height // bin_size), -(-width // bin_size)
+    counts, _, _ = np.histogram2d(y[inside], x[inside], bins=[rows, cols], range=[[0, rows * bin_size], [0, cols * bin_size]])
+    return counts.astype(np.int64)
+
+def touches(seed: int, size: int = 20000):
+    """Touches mostly on screen, some fractional and some out of bounds."""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(-50, SCREEN_WIDTH + 50, size)
+    y = rng.uniform(-50, SCREEN_HEIGHT + 50, size)
+    x[:100] = np.round(x[:100])
+    return x, y
+
+@pytest.mark.parametrize("bin_size", [1, 7, 40])
+def test_counts_match_histogram2d(bin_size):
+    x, y = touches(1)
+    heatmap = TouchHeatmap.from_points(x, y, bin_size=bin_size)
+    np.testing.assert_array_equal(heatmap.counts, reference_counts(x, y, bin_size=bin_size))
+
+    outside = ~((x.astype(np.int64) >= 0) & (x.astype(np.int64) < SCREEN_WIDTH) & (y.astype(np.int64) >= 0) & (y.astype(np.int64) < SCREEN_HEIGHT))
+    assert heatmap.out_of_bounds == outside.sum() and heatmap.total + heatmap.out_of_bounds == len(x)
+
+def test_merge_and_save_load(tmp_path):
+    (x1, y1), (x2, y2) = touches(2), touches(3)
+    merged = TouchHeatmap.from_points(x1, y1, bin_size=5).merge(TouchHeatmap.from_points(x2, y2, bin_size=5))
+    np.testing.assert_array_equal(merged.counts, reference_counts(np.concatenate([x1, x2]), np.concatenate([y1, y2]), bin_size=5))
+
+    merged.save(tmp_path / "heatmap.npz")
+    loaded = TouchHeatmap.load(tmp_path / "heatmap.npz")
+    np.testing.assert_array_equal(loaded.counts, merged.counts)
+    assert (loaded.out_of_bounds, loaded.out_of_bounds_box) == (merged.out_of_bounds, merged.out_of_bounds_box)
+
+    with pytest.raises(ValueError):
+        merged.merge(TouchHeatmap(bin_size=1))
+
+@pytest.mark.parametrize("good_only", [True, False])
+def test_store_footprint(store, good_only):
+    expected = reference_counts(store.column("x", good_only), store.column("y", good_only), bin_size=3)
+    np.testing.assert_array_equal(store_footprint(store, good_only, bin_size=3).counts, expected)
+
+    # Second run merges the per-partition caches
+    np.testing.assert_array_equal(store_footprint(store, good_only, bin_size=3).counts, expected)
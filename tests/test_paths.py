@@ -0,0 +1,179 @@
+import re
+from collections import Counter
+import numpy as np
+import pandas as pd
+import pytest
+from panel6_stats.paths import PathMiner, EXHIBIT_PREFIXES, mine_paths
+from session_paths import write_path_outputs
+
+EXHIBITS = ["Kitchen", "Main Entrance", "Men's Camp", "Star Camp", "Workshops"]
+
+def synthetic_events(seed: int, sessions: int = 400) -> pd.DataFrame:
+    """Wide session table rows: map events without exhibit, repeated exhibits from map and menu, sessions without content."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for session in range(sessions):
+        for _ in range(rng.integers(0, 12)):
+            if rng.random() < 0.3:
+                rows.append((f"S{session}", "MAP", None))
+            else:
+                prefix = "Exhibit_" if rng.random() < 0.7 else "MenuExhibitButton_"
+                rows.append((f"S{session}", "CONTENT", prefix + EXHIBITS[min(rng.geometric(0.45) - 1, len(EXHIBITS) - 1)]))
+    return pd.DataFrame(rows, columns=["SESSION_ID", "TYPE", "EXHIBIT"])
+
+def brute_paths(events: pd.DataFrame) -> list:
+    """Exhibit path of every session with content, by walking the rows one by one."""
+    paths = {}
+    for session, event_type, exhibit in zip(events["SESSION_ID"], events["TYPE"], events["EXHIBIT"]):
+        if event_type != "CONTENT" or pd.isna(exhibit):
+            continue
+        path = paths.setdefault(str(session), [])
+        name = re.sub(EXHIBIT_PREFIXES, "", str(exhibit))
+        if not path or path[-1] != name:
+            path.append(name)
+    return list(paths.values())
+
+def brute_ngrams(paths: list, n: int) -> Counter:
+    return Counter(tuple(path[index:index + n]) for path in paths for index in range(len(path) - n + 1))
+
+def brute_prefixes(paths: list, max_depth: int) -> Counter:
+    """Sessions through every path prefix, up to ``max_depth`` steps."""
+    return Counter(tuple(path[:depth]) for path in paths for depth in range(1, min(len(path), max_depth) + 1))
+
+def ngram_counts(miner: PathMiner) -> dict:
+    return {tuple(miner.exhibits[code] for code in gram): count for gram, count in miner.ngrams.items()}
+
+def trie_counts(miner: PathMiner) -> tuple:
+    """Support and terminal count of every trie node, by exhibit path."""
+    paths = [()]
+    for parent, step in zip(miner.parent[1:], miner.step[1:]):
+        paths.append(paths[parent] + (miner.exhibits[step],))
+    return dict(zip(paths[1:], miner.support[1:])), dict(zip(paths[1:], miner.terminal[1:]))
+
+def split_paths(df: pd.DataFrame, column: str) -> dict:
+    return {tuple(path.split(" > ")): count for path, count in zip(df["PATH"], df[column])}
+
+@pytest.fixture(scope="module", params=["synthetic", "store"])
+def events(request, session_tables):
+    return synthetic_events(1) if request.param == "synthetic" else session_tables[0]
+
+def test_counts_match_brute_force(events):
+    paths = brute_paths(events)
+    miner = PathMiner(max_n=4, max_depth=6).update(events)
+    assert miner.sessions == len(paths) and miner.ngram_error == miner.trie_error == 0
+
+    transitions = miner.transitions()
+    assert dict(zip(transitions.index, transitions)) == dict(brute_ngrams(paths, 2))
+    matrix = miner.transition_matrix(normalize=True)
+    np.testing.assert_allclose(matrix.sum(axis=1)[matrix.sum(axis=1) > 0], 1.0)
+
+    expected = {}
+    for n in range(2, 5):
+        expected.update(brute_ngrams(paths, n))
+        assert split_paths(miner.top_ngrams(len(miner.ngrams) + 1, n), "COUNT") == dict(brute_ngrams(paths, n))
+    assert ngram_counts(miner) == expected
+
+    support, terminal = trie_counts(miner)
+    assert support == dict(brute_prefixes(paths, 6))
+    assert {path: count for path, count in terminal.items() if count} == dict(Counter(tuple(path[:6]) for path in paths))
+
+def test_top_paths_match_brute_force(events):
+    paths = brute_paths(events)
+    miner = PathMiner(max_depth=6).update(events)
+
+    complete = Counter(tuple(path[:6]) for path in paths)
+    assert split_paths(miner.top_paths(len(complete) + 1, min_length=1, complete=True), "SESSIONS") == dict(complete)
+
+    # Maximal prefixes: no one step longer prefix is shared by all their sessions
+    prefixes = brute_prefixes(paths, 6)
+    maximal = {
+        prefix: count for prefix, count in prefixes.items()
+        if not any(longer[:-1] == prefix and longer_count == count for longer, longer_count in prefixes.items())
+    }
+    top = miner.top_paths(len(prefixes) + 1, min_length=1)
+    assert split_paths(top, "SESSIONS") == maximal
+
+    # Ranked by sessions, then by length
+    ranked = miner.top_paths(5, min_length=2)
+    assert list(zip(ranked["SESSIONS"], ranked["LENGTH"])) == sorted(
+        ((count, len(prefix)) for prefix, count in maximal.items() if len(prefix) >= 2), key=lambda item: (-item[0], -item[1])
+    )[:5]
+
+def test_first_view_popularity_matches_brute_force(events):
+    paths = brute_paths(events)
+    df = PathMiner().update(events).first_view_popularity()
+
+    visits = Counter(exhibit for path in paths for exhibit in set(path))
+    positions = {exhibit: np.mean([path.index(exhibit) for path in paths if exhibit in path]) for exhibit in visits}
+    assert df["SESSIONS"].to_dict() == dict(visits)
+    assert df["FIRST_VIEWS"].to_dict() == {exhibit: Counter(path[0] for path in paths)[exhibit] for exhibit in visits}
+    pd.testing.assert_series_equal(df["MEAN_FIRST_POSITION"], pd.Series(positions).reindex(df.index), check_names=False)
+    assert df["POPULARITY_RANK"].to_dict() == {exhibit: 1 + sum(other > count for other in visits.values()) for exhibit, count in visits.items()}
+
+@pytest.mark.parametrize("chunksize", [7, 100, 10 ** 6])
+def test_chunked_mining_matches_one_update(tmp_path, chunksize):
+    events = synthetic_events(2)
+    events.to_csv(tmp_path / "session_data.csv", index=False)
+    whole = PathMiner().update(events)
+    chunked = mine_paths(tmp_path / "session_data.csv", chunksize=chunksize)
+
+    assert chunked.sessions == whole.sessions
+    assert dict(zip(chunked.transitions().index, chunked.transitions())) == dict(zip(whole.transitions().index, whole.transitions()))
+    assert ngram_counts(chunked) == ngram_counts(whole) and trie_counts(chunked) == trie_counts(whole)
+
+@pytest.mark.parametrize("max_ngrams, max_nodes", [(5, 20), (20, 60), (100, 400)])
+def test_pruned_counts_are_bounded_lower_bounds(max_ngrams, max_nodes):
+    events = synthetic_events(3, sessions=2000)
+    paths = brute_paths(events)
+    miner = PathMiner(max_n=4, max_ngrams=max_ngrams, max_depth=6, max_nodes=max_nodes)
+    for chunk in np.array_split(events["SESSION_ID"].unique(), 20):
+        miner.update(events[events["SESSION_ID"].isin(chunk)])
+        assert len(miner.ngrams) <= 2 * max_ngrams and len(miner.parent) <= max_nodes
+    assert miner.ngram_error > 0 and miner.trie_error > 0
+
+    counts = ngram_counts(miner)
+    for n in range(2, 5):
+        for gram, count in brute_ngrams(paths, n).items():
+            assert count - miner.ngram_error <= counts.get(gram, 0) <= count
+
+    support, _ = trie_counts(miner)
+    for prefix, count in brute_prefixes(paths, 6).items():
+        assert count - miner.trie_error <= support.get(prefix, 0) <= count
+
+def test_save_load(tmp_path):
+    miner = PathMiner(max_ngrams=10, max_nodes=40, max_depth=6).update(synthetic_events(4))
+    miner.save(tmp_path / "paths.npz")
+    loaded = PathMiner.load(tmp_path / "paths.npz")
+    assert (loaded.ngram_error, loaded.trie_error, loaded.sessions) == (miner.ngram_error, miner.trie_error, miner.sessions)
+    assert ngram_counts(loaded) == ngram_counts(miner) and trie_counts(loaded) == trie_counts(miner)
+    pd.testing.assert_frame_equal(loaded.top_paths(), miner.top_paths())
+
+    # Counting goes on after loading
+    more = synthetic_events(5).assign(SESSION_ID=lambda df: "T" + df["SESSION_ID"])
+    assert trie_counts(loaded.update(more)) == trie_counts(miner.update(more))
+
+    with pytest.raises(ValueError):
+        PathMiner(max_depth=12, max_nodes=20)
+
+def test_written_outputs(tmp_path, events):
+    paths = brute_paths(events)
+    miner = PathMiner(max_depth=6).update(events)
+    outputs = {name: tmp_path / f"{name}.csv" for name in ("transitions", "ngrams", "top_paths", "first_views")}
+    write_path_outputs(miner, outputs, top_k=5)
+
+    transitions = pd.read_csv(outputs["transitions"])
+    assert {(row.FROM, row.TO): row.COUNT for row in transitions.itertuples()} == dict(brute_ngrams(paths, 2))
+
+    ngrams = pd.read_csv(outputs["ngrams"])
+    for n in range(2, 5):
+        written = ngrams[ngrams["LENGTH"] == n]
+        expected = brute_ngrams(paths, n)
+        assert all(expected[gram] == count for gram, count in split_paths(written, "COUNT").items())
+        assert sorted(written["COUNT"], reverse=True) == sorted(expected.values(), reverse=True)[:5]
+
+    top_paths = pd.read_csv(outputs["top_paths"])
+    prefixes = brute_prefixes(paths, 6)
+    assert len(top_paths) <= 5 and all(prefixes[path] == count for path, count in split_paths(top_paths, "SESSIONS").items())
+
+    first_views = pd.read_csv(outputs["first_views"], index_col="EXHIBIT")
+    assert first_views["FIRST_VIEWS"].to_dict() == {exhibit: Counter(path[0] for path in paths)[exhibit] for exhibit in first_views.index}
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from panel6_stats.session_store import SessionStore
+from panel6_stats.log_names import session_epochs
+from preprocess_logs import segment_good_logs
+
+WINDOWS = [(None, None), ("2025-01-01 12:00", None), (None, "2025-01-02"), ("2025-01-01 06:00", "2025-01-02 06:00"), ("2030-01-01", None)]
+
+@pytest.fixture(scope="module")
+def tables(session_tables):
+    return SessionStore(*session_tables), *session_tables
+
+def in_window(df: pd.DataFrame, start, end) -> pd.Series:
+    """Rows whose session's log file started in ``[start, end)``, by plain filtering."""
+    epochs = session_epochs(df["SESSION_ID"])
+    keep = epochs.notna()
+    if start is not None:
+        keep &= epochs >= pd.Timestamp(start).value // 1_000_000
+    if end is not None:
+        keep &= epochs < pd.Timestamp(end).value // 1_000_000
+    return keep.to_numpy()
+
+def records(df: pd.DataFrame, columns) -> list:
+    """Rows as sorted tuples, for comparing row sets regardless of order."""
+    return sorted(df[columns].astype(str).itertuples(index=False, name=None))
+
+ACTION_COLUMNS = ["SESSION_ID", "EVENT_START", "ACTION", "ITEM_ID", "ACTION_TIMESTAMP", "ACTION_DURATION"]
+
+@pytest.mark.parametrize("start, end", WINDOWS)
+def test_sessions_with_exhibit(tables, start, end):
+    sessions, events, _ = tables
+    for exhibit_id in events["EXHIBIT_ID"].dropna().unique():
+        expected = events[(events["EXHIBIT_ID"] == exhibit_id) & in_window(events, start, end)]["SESSION_ID"]
+        rows = sessions.sessions_with_exhibit(exhibit_id, start, end)
+        assert sorted(sessions.sessions["SESSION_ID"].iloc[rows]) == sorted(expected.unique())
+        assert np.all(np.diff(rows) > 0)
+
+        expected_events = events[(events["EXHIBIT_ID"] == exhibit_id) & in_window(events, start, end)]
+        assert records(sessions.frame("events", sessions.events_with_exhibit(exhibit_id, start, end)), ["SESSION_ID", "EVENT_START"]) == records(expected_events, ["SESSION_ID", "EVENT_START"])
+
+@pytest.mark.parametrize("start, end", WINDOWS)
+def test_actions_on_item(tables, start, end):
+    sessions, _, actions = tables
+    for item_id in actions["ITEM_ID"].dropna().unique():
+        expected = actions[(actions["ITEM_ID"] == item_id) & in_window(actions, start, end)]
+        found = sessions.frame("actions", sessions.actions_on_item(item_id, start, end))
+        assert records(found, ACTION_COLUMNS) == records(expected, ACTION_COLUMNS)
+    assert len(sessions.actions_on_item(999999)) == 0
+
+@pytest.mark.parametrize("start, end", WINDOWS)
+def test_actions_between(tables, start, end):
+    sessions, _, actions = tables
+    expected = actions[in_window(actions, start, end)]
+    found = sessions.frame("actions", sessions.actions_between(start, end))
+    assert records(found, ACTION_COLUMNS) == records(expected, ACTION_COLUMNS)
+
+    # Rows are chronological: the window is one contiguous range
+    rows = sessions.actions_between(start, end)
+    assert len(rows) == 0 or np.array_equal(rows, np.arange(rows[0], rows[0] + len(rows)))
+
+@pytest.mark.parametrize("with_item", [False, True])
+def test_actions_by_duration(tables, with_item):
+    sessions, _, actions = tables
+    expected = actions[actions["ITEM_ID"].notna()] if with_item else actions
+    found = sessions.frame("actions", sessions.actions_by_duration(with_item=with_item))
+
+    np.testing.assert_array_equal(found["ACTION_DURATION"].to_numpy(), expected["ACTION_DURATION"].sort_values(ascending=False).to_numpy())
+    assert records(found, ACTION_COLUMNS) == records(expected, ACTION_COLUMNS)
+
+def test_normalized_tables_give_the_same_store(store, tables):
+    sessions = tables[0]
+    normalized = segment_good_logs(store, normalized=True)
+    joined = SessionStore.from_normalized(normalized.sessions, normalized.events, normalized.actions)
+    assert list(joined.sessions["SESSION_ID"]) == list(sessions.sessions["SESSION_ID"])
+    assert records(joined.actions, ACTION_COLUMNS) == records(sessions.actions, ACTION_COLUMNS)
+    for item_id in sessions.item_actions.keys:
+        np.testing.assert_array_equal(joined.actions_on_item(item_id), sessions.actions_on_item(item_id))
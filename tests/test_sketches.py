@@ -0,0 +1,168 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from panel6_stats.sketches import (
+    QuantileSketch, Histogram, DistinctCounter, Counts, SketchSet, DailySketches, DURATION_BIN_SECONDS, log_sketches,
+)
+
+QUANTILES = [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1]
+
+def durations(seed: int, size: int = 5000) -> np.ndarray:
+    """Heavy-tailed durations with a share of zero-length ones, like session durations."""
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(mean=4, sigma=1.5, size=size)
+    values[rng.random(size) < 0.05] = 0.0
+    return values
+
+def metrics_frame(seed: int, files: int = 400) -> pd.DataFrame:
+    """``logs_metrics_*.csv`` rows of log files spread over three devices and a few days."""
+    rng = np.random.default_rng(seed)
+    epochs = 1733000000000 + np.sort(rng.integers(0, 5 * 86400000, files))
+    devices = rng.choice(["BB", "CC", "DD"], files)
+    return pd.DataFrame({
+        "filename": [f"Log_Interactions_{device}_{epoch}.json" for device, epoch in zip(devices, epochs)],
+        "num_actions": rng.integers(1, 400, files),
+        "is_complete": rng.random(files) < 0.7,
+        "is_new": rng.random(files) < 0.8,
+        "duration": durations(seed, files),
+    })
+
+def roundtrip(sketch):
+    """Copy of a sketch through its JSON state."""
+    return type(sketch).from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+def assert_close(actual, expected):
+    """Nested sketch states equal, floating-point sums up to rounding of the summation order."""
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key in expected:
+            assert_close(actual[key], expected[key])
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected)
+        for actual_value, expected_value in zip(actual, expected):
+            assert_close(actual_value, expected_value)
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected, rel=1e-12)
+    else:
+        assert actual == expected
+
+@pytest.mark.parametrize("accuracy", [0.01, 0.05])
+def test_quantile_relative_error(accuracy):
+    values = durations(1)
+    sketch = QuantileSketch(relative_accuracy=accuracy).update(values)
+    ordered = np.sort(values)
+    for q in QUANTILES:
+        expected = ordered[int(np.floor(q * (len(values) - 1)))]
+        assert sketch.quantile(q) == pytest.approx(expected, rel=accuracy, abs=sketch.min_value)
+
+    assert sketch.count == len(values) and sketch.mean() == pytest.approx(values.mean())
+    assert (sketch.min, sketch.max) == (values.min(), values.max())
+
+def test_quantile_empty_and_invalid_values():
+    sketch = QuantileSketch().update([np.nan, np.inf, "n/a"])
+    assert sketch.count == 0 and np.isnan(sketch.quantile(0.5)) and np.isnan(sketch.mean())
+    assert roundtrip(sketch).to_dict() == sketch.to_dict()
+
+def test_quantile_merge_and_roundtrip():
+    first, second = durations(2), durations(3)
+    merged = QuantileSketch().update(first).merge(QuantileSketch().update(second))
+    assert_close(merged.to_dict(), QuantileSketch().update(np.concatenate([first, second])).to_dict())
+
+    restored = roundtrip(merged)
+    assert restored.to_dict() == merged.to_dict()
+    assert restored.quantiles(QUANTILES).equals(merged.quantiles(QUANTILES))
+
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(relative_accuracy=0.05))
+
+@pytest.mark.parametrize("upper", [None, 10, 60, 1500, 10 ** 6])
+def test_histogram_mean_below_bin_edge_is_exact(upper):
+    values = durations(4)
+    histogram = Histogram(DURATION_BIN_SECONDS).update(values)
+    below = values if upper is None else values[values < upper]
+    assert histogram.count(upper) == len(below)
+    assert histogram.mean(upper) == pytest.approx(below.mean(), rel=1e-12)
+
+def test_histogram_mean_rejects_inner_bin_threshold():
+    histogram = Histogram(DURATION_BIN_SECONDS).update(durations(5))
+    with pytest.raises(ValueError):
+        histogram.mean(upper=15)
+    assert np.isnan(Histogram(DURATION_BIN_SECONDS).mean(upper=10))
+
+def test_histogram_merge_and_roundtrip():
+    first, second = durations(6), durations(7) + 5000
+    merged = Histogram(DURATION_BIN_SECONDS).update(first).merge(Histogram(DURATION_BIN_SECONDS).update(second))
+    assert_close(merged.to_dict(), Histogram(DURATION_BIN_SECONDS).update(np.concatenate([first, second])).to_dict())
+
+    restored = roundtrip(merged)
+    assert restored.to_dict() == merged.to_dict()
+    assert restored.mean(1500) == merged.mean(1500)
+    for restored_part, merged_part in zip(restored.bins(upper=1500), merged.bins(upper=1500)):
+        np.testing.assert_array_equal(restored_part, merged_part)
+
+    with pytest.raises(ValueError):
+        merged.merge(Histogram(1))
+
+@pytest.mark.parametrize("distinct", [10, 1000, 50000])
+def test_distinct_count_error(distinct):
+    # Repeated IDs, read back as strings or as floats, count once
+    ids = np.arange(distinct)
+    counter = DistinctCounter().update(ids).update(ids.astype(str)).update(ids.astype(np.float64))
+    standard_error = 1.04 / np.sqrt(len(counter.registers))
+    assert abs(counter.estimate() - distinct) <= max(1, 4 * standard_error * distinct)
+
+def test_distinct_merge_and_roundtrip():
+    first, second = np.arange(0, 30000), np.arange(20000, 50000)
+    merged = DistinctCounter().update(first).merge(DistinctCounter().update(second))
+    np.testing.assert_array_equal(merged.registers, DistinctCounter().update(np.arange(50000)).registers)
+
+    restored = roundtrip(merged)
+    np.testing.assert_array_equal(restored.registers, merged.registers)
+    assert restored.estimate() == merged.estimate()
+
+    with pytest.raises(ValueError):
+        merged.merge(DistinctCounter(precision=10))
+
+def test_counts_and_sketch_set_merge_and_roundtrip():
+    sketches = SketchSet({"files": Counts(total=3, complete=1), "duration": QuantileSketch().update([1.0, 2.0])})
+    other = SketchSet({"files": Counts(total=2, new=2), "actions": Histogram(1).update([3, 4])})
+    merged = SketchSet().merge(sketches).merge(other)
+    assert merged["files"].counts == {"total": 5, "complete": 1, "new": 2}
+    assert {"files", "duration", "actions"} <= set(merged.sketches)
+
+    # Merging copies sketches it did not have, the merged set does not alias its inputs
+    merged["actions"].update([5])
+    assert other["actions"].count() == 2
+
+    restored = SketchSet.from_dict(json.loads(json.dumps(merged.to_dict())))
+    assert restored.to_dict() == merged.to_dict()
+
+def test_daily_sketches_save_and_load(tmp_path):
+    sketches = DailySketches(log_sketches(metrics_frame(8)), state={"files": 400})
+    path = tmp_path / "logs.json"
+    sketches.save(path)
+
+    loaded = DailySketches.load(path)
+    assert loaded.state == {"files": 400} and loaded.days == sketches.days and loaded.devices == sketches.devices
+    assert loaded.total().to_dict() == sketches.total().to_dict()
+    assert loaded.total(devices=["BB"]).to_dict() == sketches.total(devices=["BB"]).to_dict()
+
+    # Another format loads empty, so that writers rebuild
+    path.write_text(json.dumps({"format": DailySketches.FORMAT - 1, "state": {}, "days": {}}))
+    assert not DailySketches.load(path).shards
+    assert not DailySketches.load(tmp_path / "missing.json").shards
+
+@pytest.mark.parametrize("batches", [2, 7])
+def test_incremental_update_matches_rebuild(batches):
+    df = metrics_frame(9)
+    rebuilt = DailySketches().update(log_sketches(df))
+
+    incremental = DailySketches()
+    for chunk in np.array_split(np.arange(len(df)), batches):
+        incremental.update(log_sketches(df.iloc[chunk]))
+
+    assert sorted(incremental.shards) == sorted(rebuilt.shards)
+    for key, sketches in rebuilt.shards.items():
+        assert_close(incremental.shards[key].to_dict(), sketches.to_dict())
+    assert_close(incremental.total().to_dict(), rebuilt.total().to_dict())